@@ -7,9 +7,13 @@ def cast(x) -> Any:
     return x
 
 class Parser:
+    # tokens can be a list or any iterator of tokens, like a MultiFileLexer. only the previous, current and next
+    # tokens are kept
     def __init__(self, tokens):
-        self.tokens = tokens
-        self.i = 0
+        self.tokens = iter(tokens)
+        self.previous_token = None
+        self.current_token = next(self.tokens, None)
+        self.next_token = next(self.tokens, None)
         self.in_block = False
 
     def parse(self):
@@ -26,25 +30,93 @@ class Parser:
         
         return []
 
+    # every node as a lisp like expression. statements inside blocks go on their own lines, indented by depth
     @staticmethod
-    def tree_to_str(head):
+    def tree_to_str(head, depth=0):
         if head is None:
             return "<error>"
 
-        if type(head) is Literal:
+        if type(head) is ListLiteral:
+            return f"[{', '.join([Parser.tree_to_str(item, depth) for item in head.lvalue])}]"
+
+        if type(head) is ConstLiteral:
+            if type(head.lvalue) is SILString:
+                return '"' + Parser.get_value(head.lvalue) + '"'
             return Parser.get_value(head.lvalue)
         
+        if type(head) is MapLiteral:
+            pairs = [f"{Parser.tree_to_str(key, depth)}: {Parser.tree_to_str(value, depth)}"
+                     for key, value in zip(head.lvalue, head.rvalue)]
+            return "{" + ", ".join(pairs) + "}"
+
         if type(head) is Variable:
             return head.lvalue
 
         if type(head) is BinaryExpression:
-            return f"({head.op} {Parser.tree_to_str(head.lvalue)} {Parser.tree_to_str(head.rvalue)})"
+            return f"({head.op} {Parser.tree_to_str(head.lvalue, depth)} {Parser.tree_to_str(head.rvalue, depth)})"
         
         if type(head) is Call:
-            return f"({Parser.tree_to_str(head.callee)} {', '.join([Parser.tree_to_str(arg) for arg in head.args])})"
+            args = ', '.join([Parser.tree_to_str(arg, depth) for arg in head.args])
+            return f"({Parser.tree_to_str(head.callee, depth)} {args})"
 
         if type(head) is Unary:
-            return f"({head.op} {Parser.tree_to_str(head.lvalue)})"
+            return f"({head.op} {Parser.tree_to_str(head.lvalue, depth)})"
+
+        if type(head) is ListAccess:
+            return f"(index {Parser.tree_to_str(head.lvalue, depth)} {Parser.tree_to_str(head.rvalue, depth)})"
+
+        if type(head) is Input:
+            return f"(input {Parser.tree_to_str(head.lvalue, depth)})"
+
+        if head.type == Statement.PRINT:
+            return f"(print {Parser.tree_to_str(head.expr, depth)})"
+
+        if head.type == Statement.FLAT:
+            return Parser.tree_to_str(head.expr, depth)
+
+        if type(head) is VarDecl:
+            return f"(var {head.name} {Parser.tree_to_str(head.expr, depth)})"
+
+        if type(head) is VarSet:
+            return f"(set {head.name} {Parser.tree_to_str(head.expr, depth)})"
+
+        if type(head) is ListSet:
+            lst = f"(index {Parser.tree_to_str(head.lst, depth)} {Parser.tree_to_str(head.index_expr, depth)})"
+            return f"(set {lst} {Parser.tree_to_str(head.expr, depth)})"
+
+        if type(head) is Block:
+            indent = "  " * (depth + 1)
+            stmts = "".join([f"\n{indent}{Parser.tree_to_str(stmt, depth + 1)}" for stmt in head.stmts])
+            return f"(block{stmts})"
+
+        # empty statements, like 'if a;', are ()
+        if type(head) is If:
+            stmt = Parser.tree_to_str(head.stmt, depth) if head.stmt is not None else "()"
+            string = f"(if {Parser.tree_to_str(head.expr, depth)} {stmt}"
+            if head.elseStmt is not None:
+                string += f" {Parser.tree_to_str(head.elseStmt, depth)}"
+            return string + ")"
+
+        if type(head) is While:
+            stmt = Parser.tree_to_str(head.stmt, depth) if head.stmt is not None else "()"
+            string = f"(while {Parser.tree_to_str(head.expr, depth)} {stmt}"
+            if head.final_stmt is not None:
+                string += f" {Parser.tree_to_str(head.final_stmt, depth)}"
+            return string + ")"
+
+        if type(head) is Function:
+            return f"(fun {head.name} ({', '.join(head.params)}) {Parser.tree_to_str(head.body, depth)})"
+
+        if type(head) is Return:
+            return f"(return {Parser.tree_to_str(head.expr, depth)})"
+
+        if type(head) is Stop:
+            return "(stop)"
+
+        if type(head) is Skip:
+            return "(skip)"
+
+        return f"<{head.type}>"
 
     @staticmethod
     def get_value(val):
@@ -59,6 +131,11 @@ class Parser:
         
         if type(val) is list:
             return "[" + ', '.join([Parser.get_value(item) for item in val]) + "]"
+
+        if type(val) is dict:
+            # string keys are kept as str
+            return "{" + ', '.join([f"{Parser.get_value(SILString(key) if type(key) is str else key)}: "
+                                    f"{Parser.get_value(item)}" for key, item in val.items()]) + "}"
         
         if type(val) is SILString:
             return val.get_string().encode('ascii', errors='replace').decode('ascii')
@@ -66,13 +143,24 @@ class Parser:
         return f"{val}"
 
     def previous(self):
-        return self.tokens[self.i - 1]
+        return self.previous_token
 
     def current(self):
-        return self.tokens[self.i]
+        # tokens that don't end with an EOF token get one, where the last token was
+        if self.current_token is None:
+            last = self.previous_token
+            self.current_token = Token(Token.EOF, "").set_error_fields(
+                last.line if last is not None else 1, last.char_index if last is not None else 0,
+                last.file if last is not None else None)
+        return self.current_token
 
     def advance(self):
-        self.i += 1
+        # the EOF token is never moved past, so code that runs out early always has a token to report the error on
+        if self.current_token is not None and self.current_token.type == Token.EOF:
+            return
+        self.previous_token = self.current_token
+        self.current_token = self.next_token
+        self.next_token = next(self.tokens, None)
 
     def match(self, token_type, lexeme=None):
         if self.is_end():
@@ -88,13 +176,13 @@ class Parser:
         return True
     
     def peek(self, token_type, lexeme=None):
-        if self.i + 1 >= len(self.tokens):
+        if self.next_token is None:
             return False
 
-        if self.tokens[self.i + 1].type != token_type:
+        if self.next_token.type != token_type:
             return False
 
-        if lexeme is not None and self.tokens[self.i + 1].lexeme != lexeme:
+        if lexeme is not None and self.next_token.lexeme != lexeme:
             return False
         
         return True
@@ -110,16 +198,19 @@ class Parser:
         self.advance()
 
     def report_error(self, message, packet):
-        Error.report_packet(message, packet)
+        # the program can't run once lexing has failed, and the tokens after a lexing error aren't worth reporting on
+        if not Error.lexing_failed:
+            Error.report_packet(message, packet)
         self.correct_error()
 
+    # nodes are given where they are even after an error, as the errors reported after it still point at them
     def set_error_fields(self, to, _from):
-        if not Error.error_occurred:
+        if to is not None and _from is not None:
             to.set_error_fields(_from.line, _from.char_index, _from.file)
         return to
 
     def is_end(self):
-        return self.i >= len(self.tokens) or self.current().type == Token.EOF
+        return self.current_token is None or self.current_token.type == Token.EOF
     
     def parse_statement(self):
         if self.match(Token.KEYWORD, "print"):
@@ -201,7 +292,7 @@ class Parser:
         current = self.current()
         self.advance()
 
-        expression = self.set_error_fields(Literal(None), current)
+        expression = self.set_error_fields(ConstLiteral(None), current)
         if not self.match(Token.SEMI_COLON):
             expression = self.parse_expression()
         self.consume(Token.SEMI_COLON)
@@ -266,14 +357,14 @@ class Parser:
 
         stmt = self.parse_statement()
         if stmt is None:
-            stmt = self.set_error_fields(Statement(Statement.FLAT, Literal(None)), current)
+            stmt = self.set_error_fields(Statement(Statement.FLAT, ConstLiteral(None)), current)
 
         stmts = []
         if init_stmt is not None:
             stmts.append(init_stmt)
         
         stmts.append(self.set_error_fields(
-            While(scnd_stmt if scnd_stmt else Literal(True), stmt, last_stmt), 
+            While(scnd_stmt if scnd_stmt else ConstLiteral(True), stmt, last_stmt), 
             scnd_stmt if scnd_stmt else current)
         )
 
@@ -354,7 +445,7 @@ class Parser:
             self.advance()
             expression = self.parse_expression()
         else:
-            expression = self.set_error_fields(Literal(None), current)
+            expression = self.set_error_fields(ConstLiteral(None), current)
 
         self.consume(Token.SEMI_COLON)
         return self.set_error_fields(VarDecl(id, expression), current)
@@ -393,7 +484,7 @@ class Parser:
             index_expr = self.parse_expression()
             self.consume(Token.CLOSED_SQUARE)
             if self.match(Token.OPEN_SQUARE):
-                lst = self.set_error_fields(ListAccess(id, index_expr), lst)
+                lst = self.set_error_fields(ListAccess(lst, index_expr), lst)
             else:
                 break
         
@@ -495,6 +586,22 @@ class Parser:
 
         return args
 
+    # a map literal, after its '{'
+    def parse_map(self):
+        keys = []
+        values = []
+        if not self.match(Token.CLOSED_CURLY):
+            while True:
+                keys.append(self.parse_expression())
+                self.consume(Token.COLON)
+                values.append(self.parse_expression())
+                if not self.match(Token.COMMA):
+                    break
+                self.advance()
+
+        self.consume(Token.CLOSED_CURLY)
+        return MapLiteral(keys, values)
+
     def parse_call(self):
         current = self.current()
 
@@ -546,29 +653,33 @@ class Parser:
 
         if self.match(Token.STRING):
             self.advance()
-            return Literal(SILString(lexeme))
+            return ConstLiteral(SILString(lexeme))
         
         if self.match(Token.NUMBER):
             self.advance()
-            return Literal(float(lexeme))
+            return ConstLiteral(float(lexeme) if "." in lexeme else int(lexeme))
         
         if self.match(Token.TRUE):
             self.advance()
-            return Literal(True)
+            return ConstLiteral(True)
         
         if self.match(Token.FALSE):
             self.advance()
-            return Literal(False)
+            return ConstLiteral(False)
         
         if self.match(Token.OPEN_SQUARE):
             self.advance()
             lst = self.parse_expr_list(Token.CLOSED_SQUARE)
             self.consume(Token.CLOSED_SQUARE)
-            return Literal(lst)
+            return ListLiteral(lst)
+
+        if self.match(Token.OPEN_CURLY):
+            self.advance()
+            return self.parse_map()
 
         if self.match(Token.NOVALUE):
             self.advance()
-            return Literal(None)
+            return ConstLiteral(None)
         
         if self.match(Token.OPEN_PAREN):
             self.advance()
@@ -1,7 +1,6 @@
 from tree_components import *
+import json
 import os
-import random
-import sys
 
 
 class Num(Callable):
@@ -11,8 +10,13 @@ class Num(Callable):
     def call(self, tree_walker, args, call):
         if type(args[0]) is not SILString:
             return None
+        string = args[0].get_string()
         try:
-            return float(args[0].get_string())
+            return int(string)
+        except ValueError:
+            pass
+        try:
+            return float(string)
         except ValueError:
             return None
 
@@ -24,11 +28,11 @@ class Length(Callable):
     def call(self, tree_walker, args, call):
         expr = args[0]
         try:
-            return float(len(expr))
-        except:
+            return len(expr)
+        except TypeError:
             Error.report_packet(f"Tried to get length of a non-list type '{tree_walker.type_to_str(type(expr))}'",
                                 call.args[0])
-            exit(1)
+            raise Error.failure()
 
 
 class Push(Callable):
@@ -43,13 +47,13 @@ class Push(Callable):
         if not tree_walker.is_list(lst):
             Error.report_packet(f"Tried to push to a non-list type '{tree_walker.type_to_str(type(lst))}'",
                                 call.args[0])
-            exit(1)
+            raise Error.failure()
 
         try:
             lst.append(expr)
         except SILStringNotChar:
             Error.report_packet("Tried to push a non-character onto a string", call.args[1])
-            exit(1)
+            raise Error.failure()
 
 
 class Pop(Callable):
@@ -63,20 +67,22 @@ class Pop(Callable):
         if not tree_walker.is_list(lst):
             Error.report_packet(f"Tried to pop from a non-list type '{tree_walker.type_to_str(type(lst))}'",
                                 call.args[0])
-            exit(1)
-        if type(index) is not float:
+            raise Error.failure()
+        if type(index) not in number_types:
             Error.report_packet(f"Cannot pop with non-numeric index of type '{tree_walker.type_to_str(type(lst))}'",
                                 call.args[1])
-            exit(1)
+            raise Error.failure()
 
         index = int(index)
 
         if index >= len(lst):
             Error.report_packet(f"Index out of bounds! Cannot pop item '{index}' from list of size '{len(lst)}'",
                                 call.args[1])
-            exit(1)
+            raise Error.failure()
 
-        return lst.pop(int(index))
+        if type(lst) is SILString:
+            return tree_walker.new_string(lst.get_buffer().pop(index))
+        return lst.pop(index)
 
 
 class Read(Callable):
@@ -86,17 +92,17 @@ class Read(Callable):
     def call(self, tree_walker, args, call):
         if type(args[0]) is not SILString:
             Error.report_packet("First argument of 'read' must be the path to a file as a string", call.args[0])
-            exit(1)
+            raise Error.failure()
 
         try:
             file = open(args[0].get_string(), "r")
         except FileNotFoundError:
             Error.report_packet(f"File '{args[0].get_string()}' couldn't be found", call.args[0])
-            exit(1)
+            raise Error.failure()
 
         contents = file.read()
         file.close()
-        return SILString(contents)
+        return tree_walker.new_string(contents)
 
 
 class Write(Callable):
@@ -106,12 +112,12 @@ class Write(Callable):
     def call(self, tree_walker, args, call):
         if type(args[0]) is not SILString:
             Error.report_packet("First argument of 'write' must be the path to a file as a string", call.args[0])
-            exit(1)
+            raise Error.failure()
 
         if type(args[1]) is not SILString:
             Error.report_packet("Second argument of 'write' must be a string of the new contents of the file",
                                 call.args[0])
-            exit(1)
+            raise Error.failure()
 
         file = open(args[0].get_string(), "wb")
         file.write(bytes([ord(x) for x in args[1].get_string()]))
@@ -125,7 +131,7 @@ class Exists(Callable):
     def call(self, tree_walker, args, call):
         if type(args[0]) is not SILString:
             Error.report_packet("First argument of 'exists' must be the path to a file as a string", call.args[0])
-            exit(1)
+            raise Error.failure()
 
         return os.path.isfile(args[0].get_string())
 
@@ -135,7 +141,7 @@ class Random(Callable):
         self.param_count = 0
 
     def call(self, tree_walker, args, call):
-        return float(random.random())
+        return tree_walker.random.random()
 
 
 class Seed(Callable):
@@ -143,7 +149,7 @@ class Seed(Callable):
         self.param_count = 1
 
     def call(self, tree_walker, args, call):
-        random.seed(args[0].get_string() if type(args[0]) is SILString else args[0])
+        tree_walker.random.seed(args[0].get_string() if type(args[0]) is SILString else args[0])
 
 
 class Round(Callable):
@@ -152,7 +158,7 @@ class Round(Callable):
 
     def call(self, tree_walker, args, call):
         try:
-            return float(round(args[0]))
+            return round(args[0])
         except TypeError:
             return None
 
@@ -162,11 +168,11 @@ class Exit(Callable):
         self.param_count = 1
 
     def call(self, tree_walker, args, call):
-        if type(args[0]) != float:
+        if type(args[0]) not in number_types:
             Error.report_packet(f"First argument of 'exit' must be type {tree_walker.type_to_str(float)}", call.args[0])
-            exit(1)
+            raise Error.failure()
 
-        exit(int(args[0]))
+        raise SilangExit(int(args[0]))
 
 
 class Arg(Callable):
@@ -174,12 +180,13 @@ class Arg(Callable):
         self.param_count = 1
 
     def call(self, tree_walker, args, call):
-        if type(args[0]) != float:
+        if type(args[0]) not in number_types:
             Error.report_packet(f"First argument of 'arg' must be type {tree_walker.type_to_str(float)}", call.args[0])
-            exit(1)
+            raise Error.failure()
 
+        # a new string every time, so changing it doesn't change what arg gives next
         try:
-            return sys.argv[int(args[0]) + 1]
+            return tree_walker.new_string(tree_walker.argv[int(args[0]) + 1])
         except IndexError:
             return None
 
@@ -189,20 +196,23 @@ class Type(Callable):
         self.param_count = 1
 
     def call(self, tree_walker, args, call):
-        if type(args[0]) == float:
-            return SILString("number")
+        if type(args[0]) in number_types:
+            return tree_walker.new_string("number")
 
         if type(args[0]) == SILString:
-            return SILString("string")
+            return tree_walker.new_string("string")
 
         if type(args[0]) == list:
-            return SILString("list")
+            return tree_walker.new_string("list")
+
+        if type(args[0]) == dict:
+            return tree_walker.new_string("map")
 
         if type(args[0]) == bool:
-            return SILString("bool")
+            return tree_walker.new_string("bool")
         
         if issubclass(type(args[0]), Callable):
-            return SILString("function")
+            return tree_walker.new_string("function")
 
         if args[0] == None:
             return None
@@ -216,17 +226,440 @@ class Char(Callable):
         if type(args[0]) == SILString:
             if len(args[0]) != 1:
                 Error.report_packet(f"Non-character string was passed to 'char': '{args[0]}'", call.args[0])
-                exit(1)
-            return float(ord(args[0].get_string()))
+                raise Error.failure()
+            return ord(args[0].get_string())
 
-        elif type(args[0]) == float:
-            return SILString(chr(int(args[0])))
+        elif type(args[0]) in number_types:
+            return tree_walker.new_string(chr(int(args[0])))
 
         else:
             Error.report_packet(
                 f"First argument of 'char' must either be of type '{tree_walker.type_to_str(float)}' or '{tree_walker.type_to_str(SILString)}'",
                 call.args[0])
-            exit(1)
+            raise Error.failure()
+
+
+class Keys(Callable):
+    def __init__(self):
+        self.param_count = 1
+
+    def call(self, tree_walker, args, call):
+        if type(args[0]) is not dict:
+            Error.report_packet(f"Tried to get the keys of a non-map type '{tree_walker.type_to_str(type(args[0]))}'",
+                                call.args[0])
+            raise Error.failure()
+
+        return [tree_walker.new_string(key) if type(key) is str else key for key in args[0]]
+
+
+class Has(Callable):
+    def __init__(self):
+        self.param_count = 2
+
+    def call(self, tree_walker, args, call):
+        if type(args[0]) is not dict:
+            Error.report_packet(f"Tried to look for a key in a non-map type '{tree_walker.type_to_str(type(args[0]))}'",
+                                call.args[0])
+            raise Error.failure()
+
+        return tree_walker.map_key(call.args[1], args[1]) in args[0]
+
+
+class Remove(Callable):
+    def __init__(self):
+        self.param_count = 2
+
+    def call(self, tree_walker, args, call):
+        if type(args[0]) is not dict:
+            Error.report_packet(f"Tried to remove a key from a non-map type '{tree_walker.type_to_str(type(args[0]))}'",
+                                call.args[0])
+            raise Error.failure()
+
+        # removing a key that isn't there gives novalue
+        return args[0].pop(tree_walker.map_key(call.args[1], args[1]), None)
+
+
+# json objects become maps, arrays lists and null novalue. strings are made by the engine running the program
+def from_json(value, new_string):
+    t = type(value)
+    if t is str:
+        return new_string(value)
+    if t is list:
+        return [new_string(item) if type(item) is str else from_json(item, new_string) for item in value]
+    if t is dict:
+        return {key: new_string(item) if type(item) is str else from_json(item, new_string)
+                for key, item in value.items()}
+    return value
+
+
+json_decoder = json.JSONDecoder()
+
+
+class NotJson(Exception):
+    def __init__(self, value, message=None):
+        self.value = value
+        self.message = message
+
+
+# the value as something the json module can write. parents are the lists and maps it is inside of
+def to_json(value, parents):
+    t = type(value)
+    if t is SILString:
+        return value.get_string()
+    if t is int:
+        return value
+    if t is float:
+        if value != value or value in (float("inf"), float("-inf")):
+            raise NotJson(value, f"Can't convert '{value}' to json")
+        # whole numbers are written without a '.0', the same as they are printed
+        return int(value) if value.is_integer() else value
+    if value is None or t is bool:
+        return value
+
+    if t is list or t is dict:
+        if id(value) in parents:
+            raise NotJson(value, "Can't convert a list or map that contains itself to json")
+        parents.add(id(value))
+        if t is list:
+            converted = [to_json(item, parents) for item in value]
+        else:
+            converted = {key if type(key) is str else str(to_json(key, parents)): to_json(item, parents)
+                         for key, item in value.items()}
+        parents.discard(id(value))
+        return converted
+
+    raise NotJson(value)
+
+
+def report_json_error(tree_walker, error: NotJson, expr):
+    message = error.message or f"Can't convert a value of type '{tree_walker.type_to_str(type(error.value))}' to json"
+    Error.report_packet(message, expr)
+    raise Error.failure()
+
+
+class JsonParse(Callable):
+    def __init__(self):
+        self.param_count = 1
+
+    def call(self, tree_walker, args, call):
+        if type(args[0]) is not SILString:
+            Error.report_packet("First argument of 'json_parse' must be a string of json", call.args[0])
+            raise Error.failure()
+
+        try:
+            return from_json(json_decoder.decode(args[0].get_string()), tree_walker.new_string)
+        except json.JSONDecodeError as e:
+            Error.report_packet(f"Invalid json: {e.msg} at line {e.lineno}:{e.colno}", call.args[0])
+            raise Error.failure()
+        except RecursionError:
+            Error.report_packet("Json is nested too deeply", call.args[0])
+            raise Error.failure()
+
+
+class JsonDump(Callable):
+    def __init__(self):
+        self.param_count = 1
+
+    def call(self, tree_walker, args, call):
+        try:
+            return tree_walker.new_string(json.dumps(to_json(args[0], set())))
+        except NotJson as e:
+            report_json_error(tree_walker, e, call.args[0])
+        except RecursionError:
+            Error.report_packet("Value is nested too deeply to convert to json", call.args[0])
+            raise Error.failure()
+
+
+class JsonStreamError(Exception):
+    def __init__(self, message, pos):
+        self.message = message
+        self.pos = pos
+
+
+# the values of a json file one at a time, reading only as much of the file as it needs to. a file of one array
+# gives each of its items, and any other file gives its one value. given keys, it goes into the objects at those keys
+# first, so an array inside of an object, like the items of {"items": [...]}, is read a piece at a time too
+class JsonStream:
+    chunk_size = 1 << 16
+
+    def __init__(self, file):
+        self.file = file
+        self.buffer = ""
+        self.pos = 0
+        # how much of the file was dropped from the start of the buffer, for the positions of errors
+        self.dropped = 0
+        self.ended = False
+
+    def read_more(self):
+        if self.ended:
+            return False
+        # a value that keeps needing more is read in bigger and bigger chunks, so it isn't decoded too many times
+        chunk = self.file.read(max(JsonStream.chunk_size, len(self.buffer) - self.pos))
+        if not chunk:
+            self.ended = True
+            return False
+
+        # what has already been read is dropped once it is most of the buffer
+        if self.pos > len(self.buffer) // 2:
+            self.dropped += self.pos
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        self.buffer += chunk
+        return True
+
+    # the next character that isn't whitespace, without moving past it, or '' at the end of the file
+    def peek(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\n\r":
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self.read_more():
+                return self.buffer[self.pos:self.pos + 1]
+
+    # decodes the value at pos. a number at the end of the buffer might carry on past it, so a value is only taken
+    # once what comes after it is something that can't be part of it
+    def decode(self):
+        while True:
+            try:
+                value, end = json_decoder.raw_decode(self.buffer, self.pos)
+                if self.ended or end < len(self.buffer) and self.buffer[end] in ",:]} \t\n\r":
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError as e:
+                if self.ended:
+                    raise JsonStreamError(e.msg, self.dropped + e.pos)
+            self.read_more()
+
+    # moves to the value at key in the object at pos. the values before it are decoded whole and dropped
+    def find(self, key):
+        if self.peek() != "{":
+            raise JsonStreamError(f"Expecting an object with the key '{key}'", self.dropped + self.pos)
+        self.pos += 1
+
+        while self.peek() == '"':
+            found = self.decode()
+            if self.peek() != ":":
+                raise JsonStreamError("Expecting ':' delimiter", self.dropped + self.pos)
+            self.pos += 1
+            if found == key:
+                return
+
+            self.peek()
+            self.decode()
+            if self.peek() != ",":
+                break
+            self.pos += 1
+
+        raise JsonStreamError(f"Key '{key}' isn't in the object", self.dropped + self.pos)
+
+    def values(self, keys=()):
+        for key in keys:
+            self.find(key)
+
+        if self.peek() != "[":
+            value = self.decode()
+            self.check_end(keys)
+            yield value
+            return
+
+        self.pos += 1
+        if self.peek() == "]":
+            self.pos += 1
+        else:
+            while True:
+                yield self.decode()
+                separator = self.peek()
+                self.pos += 1
+                if separator == "]":
+                    break
+                if separator != ",":
+                    raise JsonStreamError("Expecting ',' delimiter", self.dropped + self.pos - 1)
+                self.peek()
+
+        self.check_end(keys)
+
+    # the whole file is one value, but after a value found by its keys, the rest of the file isn't read
+    def check_end(self, keys):
+        if not keys and self.peek() != "":
+            raise JsonStreamError("Extra data", self.dropped + self.pos)
+
+
+class JsonEach(Callable):
+    def __init__(self):
+        self.param_count = 2
+
+    def call(self, tree_walker, args, call):
+        each_json(tree_walker, "json_each", args[0], (), args[1], call)
+
+
+class JsonEachIn(Callable):
+    def __init__(self):
+        self.param_count = 3
+
+    def call(self, tree_walker, args, call):
+        keys = args[1]
+        if type(keys) is SILString:
+            keys = [keys]
+        if type(keys) is not list or any(type(key) is not SILString for key in keys):
+            Error.report_packet("Second argument of 'json_each_in' must be a key as a string, or a list of keys",
+                                call.args[1])
+            raise Error.failure()
+
+        each_json(tree_walker, "json_each_in", args[0], [key.get_string() for key in keys], args[2], call)
+
+
+# calls function with every value JsonStream gives for a file, for json_each and json_each_in. the function is
+# their last argument
+def each_json(tree_walker, name, path, keys, function, call: Call):
+    if type(path) is not SILString:
+        Error.report_packet(f"First argument of '{name}' must be the path to a file as a string", call.args[0])
+        raise Error.failure()
+    if not issubclass(type(function), Callable) or function.param_count != 1:
+        position = "Second" if len(call.args) == 2 else "Third"
+        Error.report_packet(f"{position} argument of '{name}' must be a function taking one argument", call.args[-1])
+        raise Error.failure()
+
+    path = path.get_string()
+    try:
+        file = open(path, "r")
+    except FileNotFoundError:
+        Error.report_packet(f"File '{path}' couldn't be found", call.args[0])
+        raise Error.failure()
+
+    with file:
+        values = JsonStream(file).values(keys)
+        while True:
+            try:
+                value = from_json(next(values), tree_walker.new_string)
+            except StopIteration:
+                break
+            except JsonStreamError as e:
+                Error.report_packet(f"Invalid json in '{path}': {e.message} at character {e.pos}", call.args[0])
+                raise Error.failure()
+            except RecursionError:
+                Error.report_packet(f"Json in '{path}' is nested too deeply", call.args[0])
+                raise Error.failure()
+
+            function.call(tree_walker, [value], call)
+
+
+# native versions of the functions in base/*.sil, which replace them when those files are included.
+# they handle the usual arguments themselves, and give anything else to the silang version, so errors stay the same
+class Native(Callable):
+    def __init__(self, fallback: Callable):
+        self.fallback = fallback
+        self.name = fallback.name
+        self.param_count = fallback.param_count
+
+    def call(self, tree_walker, args, call):
+        result = self.native(tree_walker, *args)
+        if result is NotImplemented:
+            return self.fallback.call(tree_walker, args, call)
+        return result
+
+    def native(self, tree_walker, *args):
+        return NotImplemented
+
+
+class Copy(Native):
+    def native(self, tree_walker, lst):
+        if type(lst) is list:
+            return list(lst)
+        if type(lst) is SILString:
+            return [tree_walker.new_string(char) for char in lst.get_string()]
+        return NotImplemented
+
+
+class Contains(Native):
+    def native(self, tree_walker, lst, item):
+        if type(lst) is not list and type(lst) is not SILString:
+            return NotImplemented
+
+        for i in range(len(lst)):
+            if item == lst[i]:
+                return True
+        return False
+
+
+class IndexOf(Native):
+    def native(self, tree_walker, lst, item):
+        if type(lst) is not list and type(lst) is not SILString:
+            return NotImplemented
+
+        for i in range(len(lst)):
+            if item == lst[i]:
+                return i
+        return None
+
+
+class Split(Native):
+    def native(self, tree_walker, string, separator):
+        if type(string) is not SILString or type(separator) is not SILString:
+            return NotImplemented
+
+        string = string.get_string()
+        separator = separator.get_string()
+        if len(separator) != 1:
+            return [tree_walker.new_string(string)]
+        return [tree_walker.new_string(item) for item in string.split(separator)]
+
+
+# floor and ceil are round(n -/+ 0.5) in silang, and round rounds halves to even, so they do exactly that too
+def floor(n):
+    return round(n - 0.5)
+
+
+class Floor(Native):
+    def native(self, tree_walker, n):
+        if type(n) not in number_types:
+            return NotImplemented
+        return floor(n)
+
+
+class Ceil(Native):
+    def native(self, tree_walker, n):
+        if type(n) not in number_types:
+            return NotImplemented
+        return round(n + 0.5)
+
+
+class Mod(Native):
+    def native(self, tree_walker, a, b):
+        if type(a) not in number_types or type(b) not in number_types:
+            return NotImplemented
+        return a - floor(divide(a, b)) * b
+
+
+digits = {i: str(i) for i in range(10)}
+
+
+class Chr(Native):
+    def native(self, tree_walker, n):
+        if type(n) not in number_types:
+            return NotImplemented
+        if n in digits:
+            return tree_walker.new_string(digits[n])
+        return None
+
+
+class ToStr(Native):
+    def native(self, tree_walker, n):
+        if type(n) not in number_types:
+            return NotImplemented
+
+        string = ""
+        t = n
+        try:
+            while t > 0:
+                digit = t - floor(divide(t, 10)) * 10
+                if digit not in digits:
+                    # chr gives novalue here, so leave the error to the silang version
+                    return NotImplemented
+                string = digits[digit] + string
+                t = floor(divide(t, 10))
+        except (OverflowError, ValueError):
+            return NotImplemented
+
+        return tree_walker.new_string(string)
 
 
 # our exported functions
@@ -245,5 +678,35 @@ class Base:
         "exit": Exit,
         "arg": Arg,
         "char": Char,
-        "type": Type
+        "type": Type,
+        "keys": Keys,
+        "has": Has,
+        "remove": Remove,
+        "json_parse": JsonParse,
+        "json_dump": JsonDump,
+        "json_each": JsonEach,
+        "json_each_in": JsonEachIn,
+    }
+
+    # replacements for functions of the same name defined in the files of the standard library
+    natives = {
+        "copy": Copy,
+        "contains": Contains,
+        "indexof": IndexOf,
+        "split": Split,
+        "floor": Floor,
+        "ceil": Ceil,
+        "mod": Mod,
+        "chr": Chr,
+        "tostr": ToStr,
     }
+
+    library_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "base")
+
+    @staticmethod
+    def native_for(func, compiled: Callable):
+        if func.name not in Base.natives:
+            return compiled
+        if os.path.dirname(os.path.abspath(func.file)) != Base.library_path:
+            return compiled
+        return Base.natives[func.name](compiled)
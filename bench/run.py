@@ -0,0 +1,245 @@
+# runs the benchmarks in this folder, timing lexing, parsing and running separately, and writes the results as json.
+#
+#   python bench/run.py [--engine=walker,python] [--repeat=3] [--json-size=2] [--output=bench/results.json]
+#                       [--compare=old_results.json] [benchmark names...]
+#
+# every benchmark runs in its own process, so the peak memory is only for that benchmark
+import json
+import os
+import subprocess
+import sys
+import time
+
+bench_path = os.path.dirname(os.path.abspath(__file__))
+root_path = os.path.dirname(bench_path)
+sys.path.insert(0, root_path)
+
+from interpreter import load_engine, engine_names
+data_path = os.path.join(bench_path, "data")
+json_data_path = os.path.join(data_path, "employees.json")
+
+# how much slower a run has to be than the compared results to count as a regression
+regression_threshold = 1.1
+
+
+def benchmark_names():
+    return sorted(name[:-len(".sil")] for name in os.listdir(bench_path) if name.endswith(".sil"))
+
+
+# the number of operations a benchmark does, from a '// ops: n' comment at its top. the json benchmarks are
+# measured in bytes parsed, and say how many times they go through the file with a '// json passes: n' comment
+def benchmark_ops(name):
+    passes = 1
+    with open(os.path.join(bench_path, name + ".sil")) as file:
+        for line in file:
+            if line.startswith("// ops:"):
+                return int(line[len("// ops:"):])
+            if line.startswith("// json passes:"):
+                passes = int(line[len("// json passes:"):])
+
+    if name.startswith("json"):
+        return os.path.getsize(json_data_path) * passes
+    return None
+
+
+def generate_json(megabytes):
+    target = int(megabytes * 1024 * 1024)
+    if os.path.isfile(json_data_path) and abs(os.path.getsize(json_data_path) - target) < 1024:
+        return
+
+    os.makedirs(data_path, exist_ok=True)
+    employees = []
+    size = 0
+    while size < target:
+        i = len(employees)
+        employee = json.dumps({"name": f"employee{i}", "email": f"employee{i}@example.com", "age": 20 + i % 45,
+                               "active": i % 3 != 0, "skills": ["silang", "python"][:1 + i % 2]},
+                              separators=(",", ":"))
+        employees.append(employee)
+        size += len(employee) + 1
+
+    with open(json_data_path, "w") as file:
+        file.write('{"employees":[' + ",".join(employees) + "]}")
+
+
+# runs one benchmark in this process, and prints its timings as json
+def run_single(name, engine, natives):
+    os.chdir(root_path)
+
+    from lexer import MultiFileLexer
+    from _parser import Parser
+    from resolver import Resolver
+    from optimizer import Optimizer
+    from error import Error
+
+    times = {}
+    start = time.perf_counter()
+    tokens = MultiFileLexer(os.path.join("bench", name + ".sil")).tokens
+    times["lex"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    stmts = Optimizer().optimize(Parser(tokens).parse())
+    Resolver().resolve(stmts)
+    times["parse"] = time.perf_counter() - start
+
+    if Error.error_occurred:
+        exit(1)
+
+    walker = load_engine(engine)()
+    walker.natives = natives
+
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    start = time.perf_counter()
+    try:
+        walker.run(stmts)
+    finally:
+        times["run"] = time.perf_counter() - start
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    try:
+        import resource
+        # kilobytes on linux, bytes on mac
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        times["peak_memory_kb"] = peak // 1024 if sys.platform == "darwin" else peak
+    except ImportError:
+        times["peak_memory_kb"] = None
+
+    print(json.dumps(times))
+
+
+def run_benchmark(name, engine, natives, repeat):
+    best = None
+    for _ in range(repeat):
+        process = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--single", name, engine, str(natives)],
+            capture_output=True, text=True)
+        if process.returncode != 0:
+            print(f"'{name}' failed on engine '{engine}':\n{process.stderr}", file=sys.stderr)
+            return None
+
+        times = json.loads(process.stdout.strip().split("\n")[-1])
+        if best is None:
+            best = times
+        else:
+            for phase in ("lex", "parse", "run"):
+                best[phase] = min(best[phase], times[phase])
+            if times["peak_memory_kb"] is not None:
+                best["peak_memory_kb"] = max(best["peak_memory_kb"], times["peak_memory_kb"])
+
+    best["total"] = best["lex"] + best["parse"] + best["run"]
+    ops = benchmark_ops(name)
+    best["ops"] = ops
+    best["ops_per_sec"] = ops / best["run"] if ops is not None and best["run"] > 0 else None
+    return best
+
+
+def commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root_path, capture_output=True,
+                              text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def print_results(results, compared):
+    print(f"{'benchmark':<16}{'engine':<9}{'lex':>9}{'parse':>9}{'run':>9}{'ops/sec':>13}{'peak mem':>11}"
+          + ("   vs compared" if compared else ""))
+
+    regressions = []
+    for engine, benchmarks in results.items():
+        for name, times in benchmarks.items():
+            if times is None:
+                print(f"{name:<16}{engine:<9}  failed")
+                continue
+
+            ops_per_sec = f"{times['ops_per_sec']:.0f}" if times["ops_per_sec"] is not None else "-"
+            memory = f"{times['peak_memory_kb'] / 1024:.1f}MB" if times["peak_memory_kb"] is not None else "-"
+            line = (f"{name:<16}{engine:<9}{times['lex']:>8.3f}s{times['parse']:>8.3f}s{times['run']:>8.3f}s"
+                    f"{ops_per_sec:>13}{memory:>11}")
+
+            # ops per second still compares when a benchmark's size changes
+            old = compared.get(engine, {}).get(name) if compared else None
+            if old is not None and old["ops_per_sec"] and times["ops_per_sec"]:
+                ratio = old["ops_per_sec"] / times["ops_per_sec"]
+            elif old is not None and old["run"] > 0:
+                ratio = times["run"] / old["run"]
+            else:
+                ratio = None
+
+            if ratio is not None:
+                line += f"   {(ratio - 1) * 100:+.1f}%"
+                if ratio > regression_threshold:
+                    line += " REGRESSION"
+                    regressions.append((name, engine))
+            print(line)
+
+    return regressions
+
+
+def main(args):
+    if len(args) == 4 and args[0] == "--single":
+        run_single(args[1], args[2], args[3] == "True")
+        return
+
+    engines = ["walker"]
+    repeat = 3
+    json_size = 2
+    output = os.path.join(bench_path, "results.json")
+    compare = None
+    natives = True
+    names = []
+
+    for arg in args:
+        if arg.startswith("--engine="):
+            engines = arg[len("--engine="):].split(",")
+            for engine in engines:
+                if engine not in engine_names:
+                    print(f"Unknown engine '{engine}'. Available engines are: {', '.join(engine_names)}",
+                          file=sys.stderr)
+                    exit(1)
+        elif arg.startswith("--repeat="):
+            repeat = int(arg[len("--repeat="):])
+        elif arg.startswith("--json-size="):
+            json_size = float(arg[len("--json-size="):])
+        elif arg.startswith("--output="):
+            output = arg[len("--output="):]
+        elif arg.startswith("--compare="):
+            compare = arg[len("--compare="):]
+        elif arg == "--no-natives":
+            natives = False
+        elif arg.startswith("--"):
+            print(f"Unknown option '{arg}'", file=sys.stderr)
+            exit(1)
+        else:
+            names.append(arg)
+
+    available = benchmark_names()
+    for name in names:
+        if name not in available:
+            print(f"Unknown benchmark '{name}'. Available benchmarks are: {', '.join(available)}", file=sys.stderr)
+            exit(1)
+    names = names or available
+
+    if any(name.startswith("json") for name in names):
+        generate_json(json_size)
+
+    results = {engine: {name: run_benchmark(name, engine, natives, repeat) for name in names} for engine in engines}
+
+    compared = None
+    if compare is not None:
+        with open(compare) as file:
+            compared = json.load(file)["results"]
+    regressions = print_results(results, compared)
+
+    with open(output, "w") as file:
+        json.dump({"commit": commit(), "python": sys.version.split()[0], "natives": natives, "repeat": repeat,
+                   "results": results}, file, indent=2)
+
+    if regressions:
+        exit(1)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
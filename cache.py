@@ -0,0 +1,110 @@
+from _parser import *
+from lexer import MultiFileLexer, Lexer
+import gc
+import hashlib
+import os
+import pickle
+import sys
+import threading
+import zlib
+
+
+def cast(x) -> Any:
+    # used for the type checker
+    return x
+
+
+# the source of everything that decides what a parsed file looks like. a cached tree is only used by the same
+# version of these, so changing the interpreter never loads an old tree
+source_modules = ["tokens.py", "error.py", "lexer.py", "_parser.py", "tree_components.py", "environment.py",
+                  "cache.py"]
+
+
+def interpreter_version():
+    version = hashlib.sha256(f"{sys.version_info[0]}.{sys.version_info[1]}".encode())
+    folder = os.path.dirname(os.path.abspath(__file__))
+    for module in source_modules:
+        with open(os.path.join(folder, module), "rb") as file:
+            version.update(file.read())
+    return version.hexdigest()[:16]
+
+
+# parsed files are stored in a __silcache__ folder next to them, with the hash of the file they came from, so files
+# that haven't changed since the last run don't have to be lexed or parsed again
+class ParseCache:
+    folder = "__silcache__"
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.version = interpreter_version() if enabled else None
+
+    def cache_path(self, path):
+        directory, name = os.path.split(os.path.abspath(path))
+        return os.path.join(directory, ParseCache.folder, f"{name}.{self.version}.ast")
+
+    @staticmethod
+    def source_hash(lexer: Lexer):
+        return hashlib.sha256(lexer.string.encode("utf-8", errors="surrogatepass")).digest()
+
+    # the statements parsed from a file last time, or None if it has changed or was never cached
+    def load(self, lexer: Lexer):
+        if not self.enabled:
+            return None
+
+        # a tree is a lot of small objects, which would set off the garbage collector many times while loading
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            with open(self.cache_path(lexer.path), "rb") as file:
+                source_hash, path, stmts = pickle.loads(zlib.decompress(file.read()))
+        except Exception:
+            # a missing or broken cache file is just parsed again
+            return None
+        finally:
+            if collecting:
+                gc.enable()
+
+        # the tree keeps the path it was parsed from for its errors, so it has to be included the same way too
+        if source_hash != ParseCache.source_hash(lexer) or path != lexer.path:
+            return None
+        return stmts
+
+    def store(self, lexer: Lexer, stmts):
+        if not self.enabled:
+            return
+
+        path = self.cache_path(lexer.path)
+        # other threads might be writing it too
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            data = pickle.dumps((ParseCache.source_hash(lexer), lexer.path, stmts), pickle.HIGHEST_PROTOCOL)
+            with open(temp_path, "wb") as file:
+                # the fastest compression still makes it a lot smaller
+                file.write(zlib.compress(data, 1))
+            # other processes and threads might be loading it, so the finished file is swapped in all at once
+            os.replace(temp_path, path)
+        except (OSError, RecursionError, pickle.PicklingError):
+            # trees too deep to pickle, or folders that can't be written to, just aren't cached
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    # parses every file the lexer has, one at a time, using the cached statements of files that haven't changed.
+    # wrap is given the token stream of every file that does get parsed
+    def parse(self, lexer: MultiFileLexer, wrap=lambda tokens: tokens):
+        stmts = []
+        for file_lexer in lexer.lexers:
+            file_stmts = self.load(file_lexer)
+            if file_stmts is None:
+                file_stmts = Parser(wrap(file_lexer.stream())).parse()
+                if not Error.error_occurred:
+                    self.store(file_lexer, file_stmts)
+
+            stmts += file_stmts
+
+        if Error.error_occurred:
+            return []
+        return stmts
+
@@ -0,0 +1,494 @@
+from tree_walker import *
+import operator
+
+
+# the python implementations of the binary operators that only work on numbers. the rest of the checks
+# happen in TreeWalker.eval_binary, the same as for the tree walker
+number_operators = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": divide,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+class ClosureFunction(Callable):
+    def __init__(self, func: Function, body):
+        self.name = func.name
+        self.params = func.params
+        self.param_count = func.param_count
+        self.scope = func.scope
+        self.body = body
+
+        # the resolver gives unique parameters the first slots of the function's scope, in order
+        self.unique_params = len(set(self.params)) == len(self.params)
+
+    def call(self, tree_walker, args, call):
+        return tree_walker.call_closure(self, args, tree_walker.env)
+
+
+# turns the tree into nested python closures, once, so running the program doesn't have to dispatch on the type
+# of each node. statements compile to closures taking the environment and returning a signal like
+# TreeWalker.interpret, and expressions compile to closures taking the environment and returning the value
+class ClosureCompiler:
+    def __init__(self, engine):
+        self.engine = engine
+
+    def compile(self, stmts):
+        return [self.compile_stmt(stmt) for stmt in stmts]
+
+    def compile_stmt(self, stmt: Statement):
+        engine = self.engine
+
+        # empty statements inside blocks and ifs do nothing
+        if stmt is None:
+            return lambda env: None
+
+        if stmt.type == Statement.FLAT:
+            value = self.compile_expr(stmt.expr)
+
+            def flat(env):
+                value(env)
+            return flat
+
+        if stmt.type == Statement.PRINT:
+            value = self.compile_expr(stmt.expr)
+            get_value = Parser.get_value
+
+            def print_stmt(env):
+                print(get_value(value(env)), end="", file=engine.stdout)
+            return print_stmt
+
+        if stmt.type == Statement.VAR_DECL:
+            return self.compile_var_decl(cast(stmt))
+
+        if stmt.type == Statement.VAR_SET:
+            return self.compile_var_set(cast(stmt))
+
+        if stmt.type == Statement.LIST_SET:
+            return self.compile_list_set(cast(stmt))
+
+        if stmt.type == Statement.BLOCK:
+            return self.compile_block(cast(stmt))
+
+        if stmt.type == Statement.IF:
+            return self.compile_if(cast(stmt))
+
+        if stmt.type == Statement.WHILE:
+            return self.compile_while(cast(stmt))
+
+        if stmt.type == Statement.FUNCTION:
+            func = cast(stmt)
+            compiled = ClosureFunction(func, self.compile_sequence(func.body.stmts))
+
+            def declare_function(env):
+                engine.declare_function(func, compiled)
+            return declare_function
+
+        if stmt.type == Statement.RETURN:
+            return self.compile_return(cast(stmt))
+
+        if stmt.type == Statement.STOP or stmt.type == Statement.SKIP:
+            if not cast(stmt).in_loop:
+                def misplaced(env):
+                    raise stmt
+                return misplaced
+
+            signal = Signal.STOP if stmt.type == Statement.STOP else Signal.SKIP
+            return lambda env: signal
+
+        Error.report_packet(f"Unimplemented statement type '{stmt}'", stmt)
+        raise Error.failure()
+
+    # runs statements one after another in the same environment, stopping at the first signal
+    def compile_sequence(self, stmts):
+        compiled = [self.compile_stmt(stmt) for stmt in stmts]
+
+        if len(compiled) == 1:
+            return compiled[0]
+
+        def sequence(env):
+            for stmt in compiled:
+                signal = stmt(env)
+                if signal:
+                    return signal
+        return sequence
+
+    def compile_block(self, stmt: Block):
+        scope = stmt.scope
+        body = self.compile_sequence(stmt.stmts)
+
+        def block(env):
+            return body(SlotEnvironment(scope, env))
+        return block
+
+    def compile_if(self, stmt: If):
+        condition = self.compile_expr(stmt.expr)
+        then = self.compile_stmt(stmt.stmt)
+
+        if stmt.elseStmt is None:
+            def if_stmt(env):
+                if to_bool(condition(env)):
+                    return then(env)
+            return if_stmt
+
+        otherwise = self.compile_stmt(stmt.elseStmt)
+
+        def if_else(env):
+            if to_bool(condition(env)):
+                return then(env)
+            return otherwise(env)
+        return if_else
+
+    def compile_while(self, stmt: While):
+        condition = self.compile_expr(stmt.expr)
+        body = self.compile_stmt(stmt.stmt)
+        STOP = Signal.STOP
+        RETURN = Signal.RETURN
+
+        if stmt.final_stmt is None:
+            def while_stmt(env):
+                while True:
+                    if not to_bool(condition(env)):
+                        return
+
+                    signal = body(env)
+                    if signal:
+                        if signal == STOP:
+                            return
+                        if signal == RETURN:
+                            return signal
+            return while_stmt
+
+        final = self.compile_stmt(stmt.final_stmt)
+
+        def for_stmt(env):
+            while True:
+                if not to_bool(condition(env)):
+                    return
+
+                signal = body(env)
+                if signal:
+                    if signal == STOP:
+                        return
+                    if signal == RETURN:
+                        return signal
+
+                # the final statement isn't part of the loop, so its signals go to an outer one
+                signal = final(env)
+                if signal:
+                    return signal
+        return for_stmt
+
+    def compile_return(self, stmt: Return):
+        engine = self.engine
+        if not stmt.in_function:
+            def misplaced(env):
+                raise stmt
+            return misplaced
+
+        value = self.compile_expr(stmt.expr)
+        RETURN = Signal.RETURN
+
+        def return_stmt(env):
+            engine.return_value = value(env)
+            return RETURN
+        return return_stmt
+
+    def compile_var_decl(self, stmt: VarDecl):
+        engine = self.engine
+        value = self.compile_expr(stmt.expr)
+        name = stmt.name
+        slot = stmt.slot
+
+        if slot is None:
+            def declare_global(env):
+                try:
+                    env.declare_var(name, value(env))
+                except VarException:
+                    engine.report_redeclared(stmt)
+            return declare_global
+
+        def declare(env):
+            result = value(env)
+            values = env.values
+            if values[slot] is not UNDEFINED:
+                engine.report_redeclared(stmt)
+            values[slot] = result
+        return declare
+
+    def compile_var_set(self, stmt: VarSet):
+        engine = self.engine
+        value = self.compile_expr(stmt.expr)
+        name = stmt.name
+        slot = stmt.slot
+        depth = stmt.depth
+
+        def set_by_name(env, result):
+            try:
+                env.set_var(name, result)
+            except VarException:
+                engine.report_unset(stmt)
+
+        if slot is None:
+            def set_var(env):
+                set_by_name(env, value(env))
+            return set_var
+
+        if depth == 0:
+            def set_local(env):
+                result = value(env)
+                values = env.values
+                if values[slot] is not UNDEFINED:
+                    values[slot] = result
+                else:
+                    set_by_name(env, result)
+            return set_local
+
+        def set_outer(env):
+            result = value(env)
+            scope = env
+            for _ in range(depth):
+                scope = scope.parent
+            values = scope.values
+            if values[slot] is not UNDEFINED:
+                values[slot] = result
+            else:
+                set_by_name(env, result)
+        return set_outer
+
+    def compile_list_set(self, stmt: ListSet):
+        engine = self.engine
+        target = self.compile_expr(stmt.lst)
+        index_value = self.compile_expr(stmt.index_expr)
+        value = self.compile_expr(stmt.expr)
+
+        def list_set(env):
+            lst = target(env)
+            if type(lst) is not list and type(lst) is not SILString and type(lst) is not dict:
+                engine.report_not_settable(stmt, lst)
+            index = engine.list_set_index(stmt, lst, index_value(env))
+            engine.store_item(stmt, lst, index, value(env))
+        return list_set
+
+    def compile_expr(self, expr: Expression):
+        engine = self.engine
+
+        if expr.type == Expression.LITERAL:
+            constant = expr.lvalue
+            # strings can be changed in place, so each evaluation gets its own
+            if type(constant) is SILString:
+                return lambda env: constant.copy()
+            return lambda env: constant
+
+        if expr.type == Expression.LIST_LITERAL:
+            if expr.values is not None:
+                values = expr.values
+                return lambda env: values.copy()
+
+            items = [self.compile_expr(item) for item in expr.lvalue]
+
+            def list_literal(env):
+                return [item(env) for item in items]
+            return list_literal
+
+        if expr.type == Expression.MAP_LITERAL:
+            items = []
+            for key, value in zip(expr.lvalue, expr.rvalue):
+                items.append(self.compile_expr(key))
+                items.append(self.compile_expr(value))
+
+            def map_literal(env):
+                return engine.build_map(expr, [item(env) for item in items])
+            return map_literal
+
+        if expr.type == Expression.VARIABLE:
+            return self.compile_variable(cast(expr))
+
+        if expr.type == Expression.BINARY_EXPRESSION:
+            return self.compile_binary(cast(expr))
+
+        if expr.type == Expression.LIST_ACCESS:
+            target = self.compile_expr(expr.lvalue)
+            index_value = self.compile_expr(expr.rvalue)
+
+            def list_access(env):
+                lst = target(env)
+                if type(lst) is not list and type(lst) is not SILString and type(lst) is not dict:
+                    engine.report_not_indexable(expr, lst)
+
+                index = index_value(env)
+                if type(lst) is list and type(index) is int and index < len(lst):
+                    return lst[index]
+                return engine.index_list(expr, lst, index)
+            return list_access
+
+        if expr.type == Expression.CALL:
+            return self.compile_call(cast(expr))
+
+        if expr.type == Expression.UNARY:
+            value = self.compile_expr(expr.lvalue)
+
+            if expr.op == "-":
+                def negate(env):
+                    result = value(env)
+                    if type(result) not in number_types:
+                        engine.report_invert(expr)
+                    return -result
+                return negate
+
+            def not_expr(env):
+                return not to_bool(value(env))
+            return not_expr
+
+        if expr.type == Expression.INPUT:
+            value = self.compile_expr(expr.lvalue)
+
+            def input_expr(env):
+                return engine.eval_input(expr, value(env))
+            return input_expr
+
+    def compile_variable(self, expr: Variable):
+        engine = self.engine
+        name = expr.lvalue
+        slot = expr.slot
+        depth = expr.depth
+
+        def get_by_name(env):
+            try:
+                return env.get_var(name)
+            except VarException:
+                engine.report_undefined(expr)
+
+        if slot is None:
+            return get_by_name
+
+        # the slot is empty when its declaration hasn't run yet, then the variable is looked up by name
+        if depth == 0:
+            def get_local(env):
+                value = env.values[slot]
+                if value is not UNDEFINED:
+                    return value
+                return get_by_name(env)
+            return get_local
+
+        if depth == 1:
+            def get_enclosing(env):
+                value = env.parent.values[slot]
+                if value is not UNDEFINED:
+                    return value
+                return get_by_name(env)
+            return get_enclosing
+
+        def get_outer(env):
+            scope = env
+            for _ in range(depth):
+                scope = scope.parent
+            value = scope.values[slot]
+            if value is not UNDEFINED:
+                return value
+            return get_by_name(env)
+        return get_outer
+
+    def compile_call(self, expr: Call):
+        engine = self.engine
+        callee_value = self.compile_expr(expr.callee)
+        arg_values = [self.compile_expr(arg) for arg in expr.args]
+        arg_count = len(arg_values)
+
+        def call(env):
+            callee = callee_value(env)
+            if type(callee) is ClosureFunction and callee.param_count == arg_count:
+                return engine.call_closure(callee, [arg(env) for arg in arg_values], env)
+
+            engine.check_call(expr, callee)
+            args = [arg(env) for arg in arg_values]
+            engine.env = env
+            return callee.call(engine, args, expr)
+        return call
+
+    # operators only read their operands, so string literals are used as they are instead of copied
+    def compile_operand(self, expr: Expression):
+        if expr.type == Expression.LITERAL:
+            constant = expr.lvalue
+            return lambda env: constant
+        return self.compile_expr(expr)
+
+    def compile_binary(self, expr: BinaryExpression):
+        engine = self.engine
+        left = self.compile_operand(expr.lvalue)
+        right = self.compile_operand(expr.rvalue)
+
+        if expr.op == "and":
+            def and_expr(env):
+                return to_bool(right(env)) if to_bool(left(env)) else False
+            return and_expr
+
+        if expr.op == "or":
+            def or_expr(env):
+                return True if to_bool(left(env)) else to_bool(right(env))
+            return or_expr
+
+        if expr.op == "==":
+            def equal(env):
+                return left(env) == right(env)
+            return equal
+
+        if expr.op == "!=":
+            def not_equal(env):
+                return left(env) != right(env)
+            return not_equal
+
+        number_operator = number_operators[expr.op]
+
+        if expr.rvalue.type == Expression.LITERAL and type(expr.rvalue.lvalue) in number_types:
+            constant = expr.rvalue.lvalue
+
+            # two numbers are worked out now, unless that would be an error
+            if expr.lvalue.type == Expression.LITERAL and type(expr.lvalue.lvalue) in number_types:
+                try:
+                    folded = number_operator(expr.lvalue.lvalue, constant)
+                    return lambda env: folded
+                except ArithmeticError:
+                    pass
+
+            def binary_constant(env):
+                value = left(env)
+                if type(value) in number_types:
+                    return number_operator(value, constant)
+                return engine.eval_binary(expr, value, constant)
+            return binary_constant
+
+        def binary(env):
+            lvalue = left(env)
+            rvalue = right(env)
+            if type(lvalue) in number_types and type(rvalue) in number_types:
+                return number_operator(lvalue, rvalue)
+            return engine.eval_binary(expr, lvalue, rvalue)
+        return binary
+
+
+# runs the program by calling the closures the tree compiles into.
+# it is a tree walker underneath, so builtins and error messages are shared
+class ClosureEngine(TreeWalker):
+
+    def run(self, stmts):
+        compiled = ClosureCompiler(self).compile(stmts)
+        for stmt in compiled:
+            self.run_guarded(stmt, self.global_env)
+
+    def call_closure(self, func: ClosureFunction, args, env):
+        env = SlotEnvironment(func.scope, env)
+        if func.unique_params:
+            env.values[:func.param_count] = args
+        else:
+            for i, param in enumerate(func.params):
+                env.declare_var(param, args[i])
+
+        if func.body(env):
+            return self.return_value
+        return None
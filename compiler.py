@@ -0,0 +1,465 @@
+from tree_components import *
+from error import *
+
+
+def cast(x) -> Any:
+    # used for the type checker
+    return x
+
+
+# opcodes. every instruction takes up two slots in the code array: the opcode and its operand.
+# operands that aren't needed are just 0
+CONST = 0  # push constants[operand]
+GET_VAR = 1  # push the variable named names[operand], for variables the resolver left to be looked up by name
+SET_VAR = 2  # pop a value and set the variable named names[operand] to it
+DECLARE_VAR = 3  # pop a value and declare the global variable named names[operand]
+POP = 4
+PRINT = 5
+BUILD_LIST = 6  # pop operand values and push them as a new list
+INDEX = 7  # pop an index and a list, push the item
+CHECK_INDEXABLE = 8  # make sure the top of the stack can be indexed
+CHECK_SETTABLE = 9  # make sure the top of the stack can have an item set
+SET_INDEX = 10  # check and convert the index on top of the stack for a list set
+STORE_INDEX = 11  # pop a value, an index and a list, and set the list item
+CHECK_CALL = 12  # make sure the callee on top of the stack can be called with operand arguments
+CALL = 13  # pop operand arguments and a callee, push the return value
+INPUT = 14
+NEGATE = 15
+NOT = 16
+TO_BOOL = 17
+ADD = 18
+SUBTRACT = 19
+MULTIPLY = 20
+DIVIDE = 21
+EQUAL = 22
+NOT_EQUAL = 23
+LESS = 24
+LESS_EQUAL = 25
+GREATER = 26
+GREATER_EQUAL = 27
+JUMP = 28  # jump to operand
+JUMP_IF_FALSE = 29  # pop a value and jump to operand if it is falsy
+JUMP_IF_TRUE = 30  # pop a value and jump to operand if it is truthy
+EXIT_BLOCK = 31  # empty the slots of the blocks being left, the (start, end) offsets in constants[operand]
+FUNCTION = 32  # declare the function constants[operand] in the global scope
+RETURN = 33  # pop a value and return it from the current function
+RAISE = 34  # raise the statement constants[operand], used for misplaced return, stop and skip
+BUILD_MAP = 35  # pop operand keys and values, one after the other, and push them as a new map
+COPY = 36  # push a copy of the list or string constants[operand]
+# variables the resolver gave a slot live in the frame of their function, or of the main program, at an offset the
+# compiler works out. a slot that is still empty falls back to looking the variable up by name
+GET_LOCAL = 37  # push the variable at offset operand of the frame
+SET_LOCAL = 38  # pop a value and set the variable at offset operand of the frame to it
+DECLARE_LOCAL = 39  # pop a value and declare it at offset operand of the frame
+# outside of functions, a variable without a slot isn't in any scope but the global one
+GET_GLOBAL = 40  # push the global variable named names[operand]
+SET_GLOBAL = 41  # pop a value and set the global variable named names[operand] to it
+
+OP_NAMES = [
+    "CONST", "GET_VAR", "SET_VAR", "DECLARE_VAR", "POP", "PRINT", "BUILD_LIST", "INDEX", "CHECK_INDEXABLE",
+    "CHECK_SETTABLE", "SET_INDEX", "STORE_INDEX", "CHECK_CALL", "CALL", "INPUT", "NEGATE", "NOT", "TO_BOOL",
+    "ADD", "SUBTRACT", "MULTIPLY", "DIVIDE", "EQUAL", "NOT_EQUAL", "LESS", "LESS_EQUAL", "GREATER",
+    "GREATER_EQUAL", "JUMP", "JUMP_IF_FALSE", "JUMP_IF_TRUE", "EXIT_BLOCK", "FUNCTION", "RETURN", "RAISE",
+    "BUILD_MAP", "COPY", "GET_LOCAL", "SET_LOCAL", "DECLARE_LOCAL", "GET_GLOBAL", "SET_GLOBAL"
+]
+
+BINARY_OPS = {
+    "+": ADD,
+    "-": SUBTRACT,
+    "*": MULTIPLY,
+    "/": DIVIDE,
+    "==": EQUAL,
+    "!=": NOT_EQUAL,
+    "<": LESS,
+    "<=": LESS_EQUAL,
+    ">": GREATER,
+    ">=": GREATER_EQUAL,
+}
+
+
+# a compiled piece of code, either the main program or the body of a function
+class Chunk:
+    def __init__(self, name):
+        self.name = name
+        self.code = []
+        self.constants = []
+        self.names = []
+
+        # the tree node each instruction was compiled from, used for error reporting
+        self.nodes = []
+
+        self.name_indices = {}
+
+        # the variables of every block in the chunk share one frame. each block has its own offsets in it, after
+        # the offsets of the blocks around it, and frame_names has every offset of a name from the innermost block out
+        self.frame_size = 0
+        self.frame_names = {}
+
+        # the handlers the vm links the code into
+        self.linked = None
+
+    def emit(self, op, operand=0, node=None):
+        self.code.append(op)
+        self.code.append(operand)
+        self.nodes.append(node)
+        return len(self.code) - 2
+
+    # constants are never merged, so literals keep the identity they have in the tree
+    def add_constant(self, value):
+        self.constants.append(value)
+        return len(self.constants) - 1
+
+    def add_name(self, name):
+        if name not in self.name_indices:
+            self.name_indices[name] = len(self.names)
+            self.names.append(name)
+        return self.name_indices[name]
+
+    # gives the slots of a scope nested depth blocks deep offsets of their own in the frame, returning the first
+    def allocate(self, scope: Scope, depth):
+        base = self.frame_size
+        self.frame_size += len(scope.slots)
+        for name, slot in scope.slots.items():
+            offsets = self.frame_names.setdefault(name, [])
+            offsets.append((depth, base + slot))
+        return base
+
+    def finish(self):
+        self.frame_names = {name: tuple(offset for _, offset in sorted(offsets, key=lambda pair: -pair[0]))
+                            for name, offsets in self.frame_names.items()}
+
+    def patch(self, at, target):
+        self.code[at + 1] = target
+
+    def here(self):
+        return len(self.code)
+
+    def disassemble(self):
+        lines = [f"== {self.name} =="]
+        for pc in range(0, len(self.code), 2):
+            op, operand = self.code[pc], self.code[pc + 1]
+            line = f"{pc:>5} {OP_NAMES[op]:<16} {operand}"
+            if op in (CONST, FUNCTION, RAISE):
+                line += f" ({self.constants[operand].__class__.__name__})"
+            elif op in (GET_VAR, SET_VAR, DECLARE_VAR, GET_GLOBAL, SET_GLOBAL):
+                line += f" ({self.names[operand]})"
+            elif op == EXIT_BLOCK:
+                line += f" {self.constants[operand]}"
+            lines.append(line)
+        return "\n".join(lines)
+
+
+class CompiledFunction(Callable):
+    def __init__(self, func: Function, chunk: Chunk):
+        self.name = func.name
+        self.params = func.params
+        self.param_count = func.param_count
+        self.scope = func.scope
+        self.chunk = chunk
+
+        # the resolver gives unique parameters the first slots of the function's scope, in order. they are declared
+        # one by one when there are duplicates, so the error stays the same
+        self.unique_params = len(set(self.params)) == len(self.params)
+        # the empty slots of the frame after the parameters
+        self.locals = [UNDEFINED] * max(0, chunk.frame_size - self.param_count)
+
+    def call(self, tree_walker, args, call):
+        return tree_walker.call_compiled(self, args, tree_walker.env)
+
+
+# keeps track of where stop and skip need to jump to in a loop
+class LoopContext:
+    def __init__(self, depth):
+        # how many blocks deep the loop is, so stop and skip know which blocks they leave
+        self.depth = depth
+        self.stops = []
+        self.skips = []
+
+
+# lowers the tree from the parser into bytecode for the vm
+class Compiler:
+    def __init__(self):
+        self.chunk = None
+        self.loops = []
+        self.in_function = False
+
+        # the frame offset of the first slot of every scope we are in in the current chunk, innermost last
+        self.bases = []
+
+    def compile(self, stmts) -> Chunk:
+        self.chunk = Chunk("<main>")
+        for stmt in stmts:
+            self.compile_stmt(stmt)
+
+        self.chunk.emit(CONST, self.chunk.add_constant(None))
+        self.chunk.emit(RETURN)
+        self.chunk.finish()
+        return self.chunk
+
+    def compile_function(self, func: Function) -> CompiledFunction:
+        enclosing = (self.chunk, self.loops, self.in_function, self.bases)
+
+        self.chunk = Chunk(func.name)
+        self.loops = []
+        self.in_function = True
+
+        # the body block shares the scope the parameters are declared in, which starts the frame
+        self.bases = [self.chunk.allocate(func.scope, 0)]
+        for stmt in func.body.stmts:
+            self.compile_stmt(stmt)
+
+        self.chunk.emit(CONST, self.chunk.add_constant(None))
+        self.chunk.emit(RETURN)
+        self.chunk.finish()
+
+        compiled = CompiledFunction(func, self.chunk)
+        self.chunk, self.loops, self.in_function, self.bases = enclosing
+        return compiled
+
+    # the frame offset of a variable the resolver gave a (depth, slot)
+    def offset(self, node):
+        return self.bases[-1 - node.depth] + node.slot
+
+    # empties the slots of the blocks from the depth given in, and every block inside of them
+    def exit_blocks(self, depth):
+        start = self.bases[depth]
+        if start < self.chunk.frame_size:
+            self.chunk.emit(EXIT_BLOCK, self.chunk.add_constant((start, self.chunk.frame_size)))
+
+    def compile_stmt(self, stmt: Statement):
+        chunk = self.chunk
+
+        # empty statements inside blocks and ifs do nothing
+        if stmt is None:
+            return
+
+        if stmt.type == Statement.FLAT:
+            self.compile_expr(stmt.expr)
+            chunk.emit(POP)
+            return
+
+        if stmt.type == Statement.PRINT:
+            self.compile_expr(stmt.expr)
+            chunk.emit(PRINT)
+            return
+
+        if stmt.type == Statement.VAR_DECL:
+            self.compile_expr(stmt.expr)
+            # only declarations at the top of the program, outside of every block, don't have a slot
+            if stmt.slot is None:
+                chunk.emit(DECLARE_VAR, chunk.add_name(cast(stmt).name), stmt)
+            else:
+                chunk.emit(DECLARE_LOCAL, self.bases[-1] + stmt.slot, stmt)
+            return
+
+        if stmt.type == Statement.VAR_SET:
+            self.compile_expr(stmt.expr)
+            if stmt.slot is None:
+                chunk.emit(SET_VAR if self.in_function else SET_GLOBAL, chunk.add_name(cast(stmt).name), stmt)
+            else:
+                chunk.emit(SET_LOCAL, self.offset(stmt), stmt)
+            return
+
+        if stmt.type == Statement.LIST_SET:
+            self.compile_list_set(cast(stmt))
+            return
+
+        if stmt.type == Statement.IF:
+            self.compile_if(cast(stmt))
+            return
+
+        if stmt.type == Statement.WHILE:
+            self.compile_while(cast(stmt))
+            return
+
+        if stmt.type == Statement.BLOCK:
+            # the block's slots are already empty, since every block empties them again when it ends
+            self.bases.append(chunk.allocate(cast(stmt).scope, len(self.bases)))
+            for substmt in cast(stmt).stmts:
+                self.compile_stmt(substmt)
+            self.exit_blocks(len(self.bases) - 1)
+            self.bases.pop()
+            return
+
+        if stmt.type == Statement.FUNCTION:
+            chunk.emit(FUNCTION, chunk.add_constant(self.compile_function(cast(stmt))), stmt)
+            return
+
+        if stmt.type == Statement.RETURN:
+            if not self.in_function:
+                chunk.emit(RAISE, chunk.add_constant(stmt), stmt)
+                return
+
+            self.compile_expr(stmt.expr)
+            chunk.emit(RETURN)
+            return
+
+        if stmt.type == Statement.STOP or stmt.type == Statement.SKIP:
+            if len(self.loops) == 0:
+                chunk.emit(RAISE, chunk.add_constant(stmt), stmt)
+                return
+
+            loop = self.loops[-1]
+            if len(self.bases) > loop.depth:
+                self.exit_blocks(loop.depth)
+
+            jump = chunk.emit(JUMP)
+            if stmt.type == Statement.STOP:
+                loop.stops.append(jump)
+            else:
+                loop.skips.append(jump)
+            return
+
+        Error.report_packet(f"Unimplemented statement type '{stmt}'", stmt)
+        raise Error.failure()
+
+    def compile_list_set(self, stmt: ListSet):
+        chunk = self.chunk
+        self.compile_expr(stmt.lst)
+        chunk.emit(CHECK_SETTABLE, 0, stmt)
+        self.compile_expr(stmt.index_expr)
+        chunk.emit(SET_INDEX, 0, stmt)
+        self.compile_expr(stmt.expr)
+        chunk.emit(STORE_INDEX, 0, stmt)
+
+    def compile_if(self, stmt: If):
+        chunk = self.chunk
+        self.compile_expr(stmt.expr)
+        jump_else = chunk.emit(JUMP_IF_FALSE)
+        self.compile_stmt(stmt.stmt)
+
+        if stmt.elseStmt is None:
+            chunk.patch(jump_else, chunk.here())
+            return
+
+        jump_end = chunk.emit(JUMP)
+        chunk.patch(jump_else, chunk.here())
+        self.compile_stmt(stmt.elseStmt)
+        chunk.patch(jump_end, chunk.here())
+
+    # the condition is checked once before the loop, and again at the end of every time around it, so going around
+    # the loop only takes one jump
+    def compile_while(self, stmt: While):
+        chunk = self.chunk
+        forever = always_true(stmt.expr)
+        jump_end = None
+        if not forever:
+            self.compile_expr(stmt.expr)
+            jump_end = chunk.emit(JUMP_IF_FALSE)
+        start = chunk.here()
+
+        loop = LoopContext(len(self.bases))
+        self.loops.append(loop)
+        self.compile_stmt(stmt.stmt)
+        self.loops.pop()
+
+        for skip in loop.skips:
+            chunk.patch(skip, chunk.here())
+
+        self.compile_stmt(stmt.final_stmt)
+        if forever:
+            chunk.emit(JUMP, start)
+        else:
+            self.compile_expr(stmt.expr)
+            chunk.emit(JUMP_IF_TRUE, start)
+
+        if jump_end is not None:
+            chunk.patch(jump_end, chunk.here())
+        for stop in loop.stops:
+            chunk.patch(stop, chunk.here())
+
+    def compile_expr(self, expr: Expression):
+        chunk = self.chunk
+
+        if expr.type == Expression.LITERAL:
+            # strings can be changed in place, so each evaluation gets its own
+            op = COPY if type(expr.lvalue) is SILString else CONST
+            chunk.emit(op, chunk.add_constant(expr.lvalue))
+            return
+
+        if expr.type == Expression.LIST_LITERAL:
+            if expr.values is not None:
+                chunk.emit(COPY, chunk.add_constant(expr.values))
+                return
+
+            for item in expr.lvalue:
+                self.compile_expr(item)
+            chunk.emit(BUILD_LIST, len(expr.lvalue))
+            return
+
+        if expr.type == Expression.MAP_LITERAL:
+            for key, value in zip(expr.lvalue, expr.rvalue):
+                self.compile_expr(key)
+                self.compile_expr(value)
+            chunk.emit(BUILD_MAP, len(expr.lvalue), expr)
+            return
+
+        if expr.type == Expression.VARIABLE:
+            if expr.slot is None:
+                chunk.emit(GET_VAR if self.in_function else GET_GLOBAL, chunk.add_name(expr.lvalue), expr)
+            else:
+                chunk.emit(GET_LOCAL, self.offset(expr), expr)
+            return
+
+        if expr.type == Expression.BINARY_EXPRESSION:
+            self.compile_binary(cast(expr))
+            return
+
+        if expr.type == Expression.LIST_ACCESS:
+            self.compile_expr(expr.lvalue)
+            # a literal index can't have side effects, so the list check can wait until the index is evaluated
+            if expr.rvalue.type != Expression.LITERAL:
+                chunk.emit(CHECK_INDEXABLE, 0, expr)
+            self.compile_expr(expr.rvalue)
+            chunk.emit(INDEX, 0, expr)
+            return
+
+        if expr.type == Expression.CALL:
+            self.compile_call(cast(expr))
+            return
+
+        if expr.type == Expression.UNARY:
+            self.compile_expr(expr.lvalue)
+            chunk.emit(NEGATE if expr.op == "-" else NOT, 0, expr)
+            return
+
+        if expr.type == Expression.INPUT:
+            self.compile_expr(expr.lvalue)
+            chunk.emit(INPUT, 0, expr)
+            return
+
+    def compile_call(self, expr: Call):
+        chunk = self.chunk
+        self.compile_expr(expr.callee)
+
+        # the callee is checked before any arguments are evaluated, unless evaluating them can't do anything
+        if any(arg.type != Expression.LITERAL for arg in expr.args):
+            chunk.emit(CHECK_CALL, len(expr.args), expr)
+
+        for arg in expr.args:
+            self.compile_expr(arg)
+        chunk.emit(CALL, len(expr.args), expr)
+
+    # operators only read their operands, so string literals are used as they are instead of copied
+    def compile_operand(self, expr: Expression):
+        if expr.type == Expression.LITERAL:
+            self.chunk.emit(CONST, self.chunk.add_constant(expr.lvalue))
+            return
+        self.compile_expr(expr)
+
+    def compile_binary(self, expr: BinaryExpression):
+        chunk = self.chunk
+        self.compile_operand(expr.lvalue)
+
+        if expr.op == "and" or expr.op == "or":
+            short_circuit = chunk.emit(JUMP_IF_FALSE if expr.op == "and" else JUMP_IF_TRUE)
+            self.compile_operand(expr.rvalue)
+            chunk.emit(TO_BOOL)
+            jump_end = chunk.emit(JUMP)
+            chunk.patch(short_circuit, chunk.here())
+            chunk.emit(CONST, chunk.add_constant(expr.op == "or"))
+            chunk.patch(jump_end, chunk.here())
+            return
+
+        self.compile_operand(expr.rvalue)
+        chunk.emit(BINARY_OPS[expr.op], 0, expr)
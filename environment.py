@@ -30,3 +30,93 @@ class Environment:
             raise VarException()
 
         return self.parent.get_var(name)
+
+
+# marks a slot whose variable hasn't been declared yet
+UNDEFINED = object()
+
+
+# the variables declared directly in a block or function, worked out ahead of time by the resolver
+class Scope:
+    def __init__(self):
+        self.slots = {}
+
+    def declare(self, name):
+        if name not in self.slots:
+            self.slots[name] = len(self.slots)
+        return self.slots[name]
+
+
+# environment for a resolved scope. variables live in an array and are accessed by their slot,
+# but can still be looked up by name for variables that aren't known until runtime
+class SlotEnvironment:
+    def __init__(self, scope: Scope, parent):
+        self.parent = parent
+        self.scope = scope
+        self.slots = scope.slots
+        self.values = [UNDEFINED] * len(scope.slots)
+
+    def declare_slot(self, slot, value):
+        if self.values[slot] is not UNDEFINED:
+            raise VarException()
+
+        self.values[slot] = value
+
+    def declare_var(self, name, value):
+        self.declare_slot(self.slots[name], value)
+
+    def set_var(self, name, value):
+        if name in self.slots and self.values[self.slots[name]] is not UNDEFINED:
+            self.values[self.slots[name]] = value
+            return
+
+        if self.parent is None:
+            raise VarException()
+
+        self.parent.set_var(name, value)
+
+    def get_var(self, name):
+        if name in self.slots:
+            value = self.values[self.slots[name]]
+            if value is not UNDEFINED:
+                return value
+
+        if self.parent is None:
+            raise VarException()
+
+        return self.parent.get_var(name)
+
+
+# environment for a function, or the main program, in the vm. the variables of every block in it live in one array,
+# at offsets the compiler works out, so blocks don't need environments of their own. a block empties its offsets when
+# it ends, so only the blocks that are running have values to be found by name
+class FrameEnvironment:
+    def __init__(self, names, values, parent):
+        self.parent = parent
+        # every offset of each name, from the innermost block out
+        self.names = names
+        self.values = values
+
+    def set_var(self, name, value):
+        values = self.values
+        for offset in self.names.get(name, ()):
+            if values[offset] is not UNDEFINED:
+                values[offset] = value
+                return
+
+        if self.parent is None:
+            raise VarException()
+
+        self.parent.set_var(name, value)
+
+    def get_var(self, name):
+        values = self.values
+        for offset in self.names.get(name, ()):
+            value = values[offset]
+            if value is not UNDEFINED:
+                return value
+
+        if self.parent is None:
+            raise VarException()
+
+        return self.parent.get_var(name)
@@ -1,3 +1,4 @@
+import contextvars
 import sys
 
 
@@ -13,17 +14,97 @@ class VarException(Exception):
     pass
 
 
-class Error:
-    stage = "Command"
-    error_occurred = False
+# an error that was reported, with where it was if it was in a file
+class ReportedError:
+    def __init__(self, stage, message, text, file=None, line=None, char_index=None):
+        self.stage = stage
+        self.message = message
+        # the error as it was printed, with the line it was on
+        self.text = text
+        self.file = file
+        self.line = line
+        self.char_index = char_index
+
+    def __str__(self):
+        return self.text
+
+
+# raised instead of exiting when a program can't carry on, once its errors have been reported
+class SilangError(Exception):
+    def __init__(self, errors: list[ReportedError]):
+        Exception.__init__(self, "\n".join(error.text for error in errors) if errors else "silang error")
+        self.errors = errors
+
+        # the first error is usually the one that caused the rest
+        first = errors[0] if errors else None
+        self.stage = first.stage if first else None
+        self.message = first.message if first else None
+        self.file = first.file if first else None
+        self.line = first.line if first else None
+        self.char_index = first.char_index if first else None
+
+
+# raised by exit() in a silang program, with the code it gave
+class SilangExit(Exception):
+    def __init__(self, code):
+        Exception.__init__(self, f"silang program exited with code {code}")
+        self.code = code
+
+
+# writes to whatever sys.stderr is at the time, so errors still go where it has been redirected to
+class Stderr:
+    def write(self, text):
+        return sys.stderr.write(text)
+
+    def flush(self):
+        sys.stderr.flush()
+
 
-    raw_lines = {}
+stderr = Stderr()
 
+
+# everything errors are reported into. every Interpreter has its own, so interpreters running at the same time on
+# different threads don't see each other's errors. stream is where reports are printed, or None to only keep them
+class ErrorState:
+    def __init__(self, stream=stderr):
+        self.stage = "Command"
+        self.error_occurred = False
+        self.lexing_failed = False
+        self.raw_lines = {}
+        self.errors = []
+        self.stream = stream
+
+    # forgets the errors from before, keeping the lines of the files they were in
+    def clear(self):
+        self.error_occurred = False
+        self.lexing_failed = False
+        self.errors = []
+
+
+# the state the running code reports into. it is only set by interpreters, so the command line uses the default
+current_state = contextvars.ContextVar("error_state", default=ErrorState())
+
+
+# Error.stage, Error.error_occurred and the rest are looked up in the current ErrorState
+class ErrorStateLookup(type):
+    def __getattr__(cls, name):
+        return getattr(current_state.get(), name)
+
+    def __setattr__(cls, name, value):
+        if name in ("stage", "error_occurred", "lexing_failed", "raw_lines", "errors", "stream"):
+            setattr(current_state.get(), name, value)
+        else:
+            type.__setattr__(cls, name, value)
+
+
+class Error(metaclass=ErrorStateLookup):
     padding = 20
 
     @staticmethod
     def report(message, line, char_index, file):
         Error.error_occurred = True
+        if Error.stage == "Lexing":
+            Error.lexing_failed = True
 
         raw_line = Error.raw_lines[file][line - 1]
 
@@ -39,11 +120,16 @@ class Error:
         else:
             left += "..."
 
-        print(f"{Error.stage}Error in {file}[at line {line}:{char_index}]: {message}\n" +
-              left + surrounding_characters + ("...\n" if right < len(raw_line) else "\n")
-              + " " * (10 + left_padding) + "^", file=sys.stderr)
+        text = f"{Error.stage}Error in {file}[at line {line}:{char_index}]: {message}\n" + \
+            left + surrounding_characters + ("...\n" if right < len(raw_line) else "\n") + \
+            " " * (10 + left_padding) + "^"
+        Error.errors.append(ReportedError(Error.stage, message, text, file, line, char_index))
 
-        print("\n")
+        stream = Error.stream
+        if stream is not None:
+            print(text, file=stream)
+            # the command line has always left a gap on stdout after an error
+            print("\n", file=sys.stdout if stream is stderr else stream)
 
     @staticmethod
     def report_packet(message, packet: ErrorPacket):
@@ -51,4 +137,12 @@ class Error:
 
     @staticmethod
     def report_flat(message):
-        print(f"{Error.stage}Error: {message}", file=sys.stderr)
+        text = f"{Error.stage}Error: {message}"
+        Error.errors.append(ReportedError(Error.stage, message, text))
+        if Error.stream is not None:
+            print(text, file=Error.stream)
+
+    # what to raise after reporting an error the program can't carry on from
+    @staticmethod
+    def failure():
+        return SilangError(list(Error.errors))
@@ -0,0 +1,112 @@
+from tree_walker import *
+import json
+
+
+# a tree walker which counts what it does, and calls hooks a host registers for statements, function calls and
+# returns, and builtins. it is a separate engine, so the plain tree walker doesn't pay anything for it.
+#
+#   walker = InstrumentedWalker()
+#   walker.add_hook("call", lambda name, args: print("calling", name))
+#   walker.run(stmts)
+#   print(walker.counters)
+class InstrumentedWalker(TreeWalker):
+    # statement hooks are given the statement, call and builtin hooks the function's name and arguments, and
+    # return hooks the function's name and what it returned
+    HOOKS = ("statement", "call", "return", "builtin")
+
+    def __init__(self):
+        TreeWalker.__init__(self)
+
+        self.hooks = {kind: [] for kind in InstrumentedWalker.HOOKS}
+        self.counters = {
+            "statements": 0,
+            "expressions": 0,
+            # the global environment is made before anything can count it
+            "environments": 1,
+            "strings": 0,
+            "calls": {},
+        }
+
+        # every node goes through the handler tables, so counting them there sees all of them
+        for stmt_type, handler in self.stmt_handlers.items():
+            self.stmt_handlers[stmt_type] = self.counted_statement(handler)
+        for expr_type, handler in self.expr_handlers.items():
+            self.expr_handlers[expr_type] = self.counted_expression(handler)
+
+    def add_hook(self, kind, hook):
+        if kind not in self.hooks:
+            raise ValueError(f"Unknown hook '{kind}'. Available hooks are: {', '.join(self.hooks)}")
+        self.hooks[kind].append(hook)
+
+    def remove_hook(self, kind, hook):
+        self.hooks[kind].remove(hook)
+
+    def counted_statement(self, handler):
+        counters = self.counters
+        hooks = self.hooks["statement"]
+
+        def statement(stmt):
+            counters["statements"] += 1
+            for hook in hooks:
+                hook(stmt)
+            return handler(stmt)
+        return statement
+
+    def counted_expression(self, handler):
+        counters = self.counters
+
+        def expression(expr):
+            counters["expressions"] += 1
+            return handler(expr)
+        return expression
+
+    def new_string(self, value):
+        self.counters["strings"] += 1
+        return SILString(value)
+
+    # strings joined with '+' and characters taken out of a string are made by the strings themselves
+    def eval_binary(self, expr: Expression, lvalue, rvalue):
+        value = TreeWalker.eval_binary(self, expr, lvalue, rvalue)
+        if type(value) is SILString:
+            self.counters["strings"] += 1
+        return value
+
+    def index_list(self, expr: Expression, lst, index):
+        value = TreeWalker.index_list(self, expr, lst, index)
+        if type(lst) is SILString:
+            self.counters["strings"] += 1
+        return value
+
+    def interpret_block(self, stmt: Block, env: SlotEnvironment | None = None):
+        if env is None:
+            self.counters["environments"] += 1
+        return TreeWalker.interpret_block(self, stmt, env)
+
+    def interpret_call(self, expr: Call):
+        callee = self.eval_expr(expr.callee)
+        self.check_call(expr, callee)
+        args = [self.eval_expr(arg) for arg in expr.args]
+
+        calls = self.counters["calls"]
+        calls[callee.name] = calls.get(callee.name, 0) + 1
+
+        # the standard library's silang functions are functions too, even when they have native versions
+        if type(callee) is not FunctionCallable and not isinstance(callee, Native):
+            for hook in self.hooks["builtin"]:
+                hook(callee.name, args)
+            return callee.call(self, args, expr)
+
+        if type(callee) is FunctionCallable:
+            self.counters["environments"] += 1
+        for hook in self.hooks["call"]:
+            hook(callee.name, args)
+        value = callee.call(self, args, expr)
+        for hook in self.hooks["return"]:
+            hook(callee.name, value)
+        return value
+
+    # the counters as json, with the total number of nodes evaluated
+    def counters_json(self):
+        counters = dict(self.counters)
+        counters["nodes"] = counters["statements"] + counters["expressions"]
+        return json.dumps(counters, indent=2)
@@ -0,0 +1,134 @@
+from error import *
+import contextlib
+import os
+import random
+
+
+engine_names = ["walker", "vm", "closure", "python"]
+
+
+# engines are only imported when they are used, so the ones that aren't don't slow down starting up
+def load_engine(name):
+    if name == "vm":
+        from vm import VM
+        return VM
+    if name == "closure":
+        from closures import ClosureEngine
+        return ClosureEngine
+    if name == "python":
+        from transpiler import PythonEngine
+        return PythonEngine
+
+    from tree_walker import TreeWalker
+    return TreeWalker
+
+
+# a parsed and resolved silang program, which can be run any number of times
+class Program:
+    def __init__(self, stmts, path, raw_lines):
+        self.stmts = stmts
+        self.path = path
+        # the lines of every file in the program, so errors while it runs can show where they happened
+        self.raw_lines = raw_lines
+
+
+# runs silang from python, in the same process.
+#
+#   interpreter = Interpreter()
+#   program = interpreter.compile('fun greet(name) { print "hello " + name; } greet("world");')
+#   interpreter.run(program)
+#
+# errors raise a SilangError with everything that was reported, and exit() in a program raises SilangExit, instead
+# of exiting python. every interpreter keeps its own errors and its own rng, so different interpreters can run at the
+# same time on different threads, but one interpreter should only be used by one thread at a time
+class Interpreter:
+    def __init__(self, engine="walker", natives=True, error_stream=None, optimize=True):
+        if engine not in engine_names:
+            raise ValueError(f"Unknown engine '{engine}'. Available engines are: {', '.join(engine_names)}")
+
+        self.engine_class = load_engine(engine)
+        self.natives = natives
+        self.optimize = optimize
+        # reports are only kept on the errors raised unless they are given somewhere to be printed
+        self.state = ErrorState(error_stream)
+        # what rng and seed use in every program this runs, so a seed carries over from one run to the next
+        self.random = random.Random()
+
+        # the engine running programs with shared globals
+        self.shared_engine = None
+
+    # makes errors report into this interpreter while running code
+    @contextlib.contextmanager
+    def active(self, stage):
+        token = current_state.set(self.state)
+        self.state.clear()
+        self.state.stage = stage
+        try:
+            yield
+        finally:
+            current_state.reset(token)
+
+    def compile(self, source, path="<string>"):
+        return self.compile_program(path, source, False)
+
+    def compile_file(self, path, cache=False):
+        if not os.path.isfile(path):
+            with self.active("Command"):
+                Error.report_flat(f"File '{path}' not found")
+                raise Error.failure()
+        return self.compile_program(path, None, cache)
+
+    def compile_program(self, path, source, cache):
+        from lexer import MultiFileLexer
+        from resolver import Resolver
+        from optimizer import Optimizer
+        from cache import ParseCache
+
+        with self.active("Lexing"):
+            lexer = MultiFileLexer(path, source)
+            stmts = ParseCache(cache).parse(lexer)
+            if Error.error_occurred:
+                raise Error.failure()
+
+            if self.optimize:
+                stmts = Optimizer().optimize(stmts)
+            Resolver().resolve(stmts)
+            raw_lines = {file_lexer.path: Error.raw_lines[file_lexer.path] for file_lexer in lexer.lexers}
+        return Program(stmts, path, raw_lines)
+
+    # runs a program with globals of its own, or with the globals every other shared run has used. print and input
+    # use sys.stdout and sys.stdin unless they are given files to use instead
+    def run(self, program: Program, args=None, shared=False, stdout=None, stdin=None):
+        with self.active("Runtime"):
+            self.state.raw_lines.update(program.raw_lines)
+
+            if shared:
+                if self.shared_engine is None:
+                    self.shared_engine = self.new_engine()
+                engine = self.shared_engine
+            else:
+                engine = self.new_engine()
+
+            # arg(0) is the first argument. arg makes a silang string from it, so any value passed is kept as a str
+            engine.argv = [None] + [str(arg) for arg in args or []]
+            engine.stdout = stdout
+            engine.stdin = stdin
+            engine.run(program.stmts)
+
+    def execute(self, source, path="<string>", args=None, shared=False, stdout=None, stdin=None):
+        self.run(self.compile(source, path), args, shared, stdout, stdin)
+
+    def new_engine(self):
+        engine = self.engine_class()
+        engine.natives = self.natives
+        engine.random = self.random
+        return engine
+
+    # the value of a global variable or function from the shared runs
+    def get(self, name):
+        if self.shared_engine is not None:
+            try:
+                return self.shared_engine.global_env.get_var(name)
+            except VarException:
+                pass
+        raise KeyError(name)
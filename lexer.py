@@ -1,32 +1,72 @@
 from tokens import *
 from error import *
 import os
+import re
 
 
-# handles lexing of multiple files
+# handles lexing of multiple files. the includes make a graph, which is walked depth first so each file comes after
+# the files it includes, and a file included more than once is only lexed the first time. the tokens of every file
+# are streamed one after the other, so the parser can start before everything has been lexed
 class MultiFileLexer:
-    def __init__(self, init_path):
-        self.tokens = []
-        self.added = []
-        self.lex(init_path)
+    # the first file's code can be given as a string, which path is then just the name of
+    def __init__(self, init_path, string=None):
+        # the lexer of every file by its absolute path
+        self.modules = {}
+
+        # the lexer of every file, in the order their tokens come in
+        self.lexers = []
+
+        # the files still being added, to find include cycles
+        self.adding = []
+        self.add(init_path, string)
+
+    # included paths are looked for next to the file including them first, then from the working directory
+    def resolve(self, include):
+        path = os.path.normpath(os.path.join(os.path.dirname(include.file), include.lexeme))
+        if os.path.isfile(path):
+            return path
+        if os.path.isfile(include.lexeme):
+            return include.lexeme
+        return None
+
+    def add(self, path, string=None):
+        Error.stage = "Lexing"
+        lexer = Lexer(path, string)
+        key = os.path.abspath(path)
+        self.modules[key] = lexer
+        self.adding.append(key)
+
+        for include in lexer.scan_includes():
+            path = self.resolve(include)
+            if path is None:
+                Error.report_packet(f"file with path '{include.lexeme}' doesn't exist.", include)
+                continue
+
+            key = os.path.abspath(path)
+            if key in self.adding:
+                cycle = self.adding[self.adding.index(key):] + [key]
+                Error.report_packet("include cycle: " + " -> ".join(os.path.relpath(p) for p in cycle), include)
+                continue
 
-    def lex(self, path):
-        lexer = Lexer(path)
-        lexer.lex()
+            if key not in self.modules:
+                self.add(path)
 
-        if len(self.tokens) > 0:
-            lexer.tokens.pop()  # get rid of EOF
+        self.adding.pop()
+        self.lexers.append(lexer)
 
-        self.tokens = lexer.tokens + self.tokens
-        for include in lexer.includes:
-            path = include.lexeme
-            if path in self.added:
-                continue
-            if not os.path.isfile(path):
-                Error.report_packet(f"file with path '{path}' doesn't exist.", include)
-                continue
+    def __iter__(self):
+        # only the last file keeps its EOF
+        for lexer in self.lexers[:-1]:
+            for token in lexer.stream():
+                if token.type != Token.EOF:
+                    yield token
+
+        yield from self.lexers[-1].stream()
 
-            self.lex(path)
+    # every token at once
+    @property
+    def tokens(self):
+        return list(self)
 
 
 # check if a character is a hex digit
@@ -34,13 +74,16 @@ def ishex(x):
     return x in '0123456789abcdefABCDEF'
 
 
-# lexer or tokeniser, which tokenises the raw string of the program file
-class Lexer:
+# lexer or tokeniser, which tokenises the raw string of the program file one character at a time.
+# Lexer does the same with a regex, and falls back to this for anything unusual, like escapes in strings
+class CharLexer:
 
-    def __init__(self, path):
+    def __init__(self, path, string=None):
         self.path = path
-        with open(path, "r") as file:
-            self.string = file.read()
+        if string is None:
+            with open(path, "r") as file:
+                string = file.read()
+        self.string = string
 
         self.i = 0
 
@@ -140,6 +183,11 @@ class Lexer:
                 self.advance()
                 continue
 
+            if char == ':':
+                self.add_token(Token.COLON, "")
+                self.advance()
+                continue
+
             if char == '(':
                 self.add_token(Token.OPEN_PAREN, "")
                 self.advance()
@@ -234,9 +282,10 @@ class Lexer:
         self.advance()
         string = ""
 
-        closed_string = True
+        # a quote at the end of the file starts a string that is never closed
+        closed_string = not self.is_end()
 
-        while self.current() != '"':
+        while closed_string and self.current() != '"':
             char: str = self.current()
             if char == "\\":
                 self.advance()
@@ -265,6 +314,10 @@ class Lexer:
                     value = char
 
                     self.advance()
+                    if self.is_end():
+                        closed_string = False
+                        break
+
                     char = self.current()
                     value += char
 
@@ -353,3 +406,165 @@ class Lexer:
 
     def is_end(self):
         return self.i >= len(self.string)
+
+
+# every token the regex lexer handles itself. anything else is matched by 'other', and goes through CharLexer
+token_pattern = re.compile(r"""
+    [ \r]*
+    (?: (?P<word>[A-Za-z_][A-Za-z0-9_]*)
+    | (?P<newline>\n)
+    | (?P<comment>//[^\n\r]*)
+    | (?P<fixed>[*/+\-<>!=]=?|[;,.:(){}\[\]])
+    | (?P<number>[0-9]+(?:\.[0-9]*)?)
+    | (?P<string>"[^"\\\n\r]*")
+    | (?P<other>.)
+    | $ )
+""", re.VERBOSE)
+
+# (token type, lexeme, offset of the token's position) for operators and punctuation. two character operators are
+# at the position of their second character
+fixed_tokens = {
+    "*": (Token.FACTOR_OP, "*", 0),
+    "/": (Token.FACTOR_OP, "/", 0),
+    "+": (Token.TERM_OP, "+", 0),
+    "-": (Token.TERM_OP, "-", 0),
+    "*=": (Token.ASSIGNMENT_OP, "*", 1),
+    "/=": (Token.ASSIGNMENT_OP, "/", 1),
+    "+=": (Token.ASSIGNMENT_OP, "+", 1),
+    "-=": (Token.ASSIGNMENT_OP, "-", 1),
+    "=": (Token.ASSIGNMENT_OP, "", 0),
+    "==": (Token.CONDITIONAL_OP, "==", 1),
+    "<": (Token.CONDITIONAL_OP, "<", 0),
+    ">": (Token.CONDITIONAL_OP, ">", 0),
+    "<=": (Token.CONDITIONAL_OP, "<=", 1),
+    ">=": (Token.CONDITIONAL_OP, ">=", 1),
+    "!": (Token.EXCLAMATION, "", 0),
+    "!=": (Token.CONDITIONAL_OP, "!=", 1),
+    ";": (Token.SEMI_COLON, "", 0),
+    ",": (Token.COMMA, "", 0),
+    ".": (Token.POINT, "", 0),
+    ":": (Token.COLON, "", 0),
+    "(": (Token.OPEN_PAREN, "", 0),
+    ")": (Token.CLOSED_PAREN, "", 0),
+    "{": (Token.OPEN_CURLY, "", 0),
+    "}": (Token.CLOSED_CURLY, "", 0),
+    "[": (Token.OPEN_SQUARE, "", 0),
+    "]": (Token.CLOSED_SQUARE, "", 0),
+}
+
+# (token type, lexeme) for words that aren't identifiers
+words = {"true": (Token.TRUE, ""), "false": (Token.FALSE, ""), "novalue": (Token.NOVALUE, ""),
+         "and": (Token.LOGICAL_OP, "and"), "or": (Token.LOGICAL_OP, "or")}
+for keyword in Token.keywords:
+    words[keyword] = (Token.KEYWORD, keyword)
+
+
+# lexer which matches a whole token at a time with a regex, and slices the lexeme out of the source.
+# it makes exactly the same tokens as CharLexer, with the same positions
+class Lexer(CharLexer):
+
+    def lex(self):
+        self.tokens = list(self.stream())
+        return self.tokens
+
+    # the includes at the start of lines, found without lexing the whole file
+    def scan_includes(self):
+        includes = []
+        for line, text in enumerate(self.string.split("\n")):
+            if text.startswith("#"):
+                path = re.match(r"#([^\r]*)", text).group(1)
+                includes.append(Token(Token.INCLUDE, path).set_error_fields(line + 1, 1, self.path))
+        return includes
+
+    # generates the tokens one at a time
+    def stream(self):
+        string = self.string
+        path = self.path
+        length = len(string)
+
+        pos = 0
+        line = 1
+        # where the current line starts, so a token's char_index is its position minus this
+        line_start = 0
+
+        while pos < length:
+            if pos == line_start and string[pos] == "#":
+                self.i, self.line, self.char_index = pos, line, 0
+                self.handle_include()
+                pos = self.i
+                continue
+
+            # matches tokens until one needs CharLexer, or an include starts
+            stopped = None
+            for m in token_pattern.finditer(string, pos):
+                kind = m.lastgroup
+
+                if kind == "word" or kind == "number":
+                    end = m.end()
+                    start = m.start(kind)
+                    # a character outside ascii could still be part of the number or identifier
+                    if end < length and string[end] >= "\x80":
+                        stopped = start
+                        break
+
+                    if kind == "word":
+                        word = m.group(kind)
+                        token_type, lexeme = words.get(word, (Token.IDENTIFIER, word))
+                        yield Token(token_type, lexeme).set_error_fields(line, start - line_start, path)
+                    else:
+                        yield Token(Token.NUMBER, m.group(kind)).set_error_fields(line, start - line_start, path)
+
+                elif kind == "fixed":
+                    token_type, lexeme, offset = fixed_tokens[m.group(kind)]
+                    yield Token(token_type, lexeme).set_error_fields(line, m.start(kind) + offset - line_start, path)
+
+                elif kind == "newline":
+                    line += 1
+                    line_start = m.end()
+                    if line_start < length and string[line_start] == "#":
+                        stopped = line_start
+                        break
+
+                elif kind == "string":
+                    start = m.start(kind)
+                    yield Token(Token.STRING, string[start + 1:m.end() - 1]).set_error_fields(
+                        line, start - line_start, path)
+
+                elif kind == "other":
+                    stopped = m.start(kind)
+                    break
+
+            if stopped is None:
+                pos = length
+                break
+
+            pos = stopped
+            if pos == line_start and string[pos] == "#":
+                continue
+
+            # CharLexer adds what it lexes to self.tokens, and its errors are lexing errors even mid parse
+            self.i, self.line, self.char_index = pos, line, pos - line_start
+            stage = Error.stage
+            Error.stage = "Lexing"
+            self.lex_char(string[pos])
+            Error.stage = stage
+            yield from self.tokens
+            self.tokens.clear()
+            pos, line = self.i, self.line
+            line_start = pos - self.char_index
+
+        self.i, self.line, self.char_index = pos, line, pos - line_start
+        yield Token(Token.EOF, "").set_error_fields(line, pos - line_start, path)
+
+    # the token at a character the regex doesn't handle
+    def lex_char(self, char):
+        if char == '"':
+            self.lex_string()
+        elif char.isdigit():
+            self.lex_number()
+        elif self.is_id_char(char):
+            self.lex_id()
+        else:
+            Error.report(f"Unexpected character '{char}'", self.line, self.char_index, self.path)
+            self.advance()
+
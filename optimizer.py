@@ -0,0 +1,208 @@
+from tree_components import *
+import math
+
+
+def cast(x) -> Any:
+    # used for the type checker
+    return x
+
+
+# a literal with nothing to evaluate inside of it
+def is_constant(expr: Expression):
+    if expr.type == Expression.LIST_LITERAL:
+        return all(is_constant(item) for item in expr.lvalue)
+    return expr.type == Expression.LITERAL
+
+
+# whether a statement declares variables in the scope it is in, the same way the resolver finds them
+def declares(stmt: Statement):
+    if stmt is None:
+        return False
+    if stmt.type == Statement.VAR_DECL:
+        return True
+    if stmt.type == Statement.IF:
+        return declares(stmt.stmt) or declares(stmt.elseStmt)
+    if stmt.type == Statement.WHILE:
+        return declares(stmt.stmt) or declares(stmt.final_stmt)
+    return False
+
+
+# static pass between parsing and resolving. it works out everything that only depends on literals before the
+# program runs: arithmetic, comparisons and joined strings, 'if's and loops with a condition that is always the
+# same, and lists that only hold numbers, booleans and novalue. statements that do nothing are dropped.
+#
+# anything that would be an error is left as it is, so the engines still report it if it ever runs
+class Optimizer:
+    def optimize(self, stmts):
+        return self.optimize_stmts(stmts)
+
+    def optimize_stmts(self, stmts):
+        optimized = []
+        for stmt in stmts:
+            stmt = self.optimize_stmt(stmt)
+            if stmt is not None:
+                optimized.append(stmt)
+        return optimized
+
+    # the statement to run instead, or None if it does nothing
+    def optimize_stmt(self, stmt: Statement):
+        if stmt is None:
+            return None
+
+        if stmt.type == Statement.BLOCK:
+            stmt.stmts = self.optimize_stmts(cast(stmt).stmts)
+            return stmt if stmt.stmts else None
+
+        if stmt.type == Statement.FUNCTION:
+            # the body keeps its block, it holds the function's scope
+            stmt.body.stmts = self.optimize_stmts(cast(stmt).body.stmts)
+            return stmt
+
+        if stmt.type == Statement.IF:
+            return self.optimize_if(cast(stmt))
+
+        if stmt.type == Statement.WHILE:
+            return self.optimize_while(cast(stmt))
+
+        if stmt.type == Statement.LIST_SET:
+            stmt.lst = self.fold(stmt.lst)
+            stmt.index_expr = self.fold(stmt.index_expr)
+            stmt.expr = self.fold(stmt.expr)
+            return stmt
+
+        if stmt.type == Statement.FLAT:
+            stmt.expr = self.fold(stmt.expr)
+            return None if is_constant(stmt.expr) else stmt
+
+        if stmt.expr is not None:
+            stmt.expr = self.fold(stmt.expr)
+        return stmt
+
+    def optimize_if(self, stmt: If):
+        stmt.expr = self.fold(stmt.expr)
+        stmt.stmt = self.optimize_stmt(stmt.stmt)
+        stmt.elseStmt = self.optimize_stmt(stmt.elseStmt)
+
+        if is_constant(stmt.expr):
+            if to_bool(stmt.expr.lvalue):
+                taken, skipped = stmt.stmt, stmt.elseStmt
+            else:
+                taken, skipped = stmt.elseStmt, stmt.stmt
+
+            # variables declared in the branch that never runs are still in scope for the resolver, so dropping it
+            # would change how they are looked up
+            if not declares(skipped):
+                return taken
+        return stmt
+
+    def optimize_while(self, stmt: While):
+        stmt.expr = self.fold(stmt.expr)
+        stmt.stmt = self.optimize_stmt(stmt.stmt)
+        stmt.final_stmt = self.optimize_stmt(stmt.final_stmt)
+
+        if is_constant(stmt.expr) and not to_bool(stmt.expr.lvalue) and not declares(stmt):
+            return None
+        return stmt
+
+    # a literal in place of an expression, which errors still point to the expression of
+    @staticmethod
+    def folded(value, expr: Expression):
+        literal = ConstLiteral(value)
+        if hasattr(expr, "line"):
+            literal.set_error_fields(expr.line, expr.char_index, expr.file)
+        return literal
+
+    def fold(self, expr: Expression):
+        if expr is None:
+            return None
+
+        if expr.type == Expression.LIST_LITERAL:
+            expr.lvalue = [self.fold(item) for item in expr.lvalue]
+            cast(expr).find_values()
+            return expr
+
+        if expr.type == Expression.MAP_LITERAL:
+            expr.lvalue = [self.fold(key) for key in expr.lvalue]
+            expr.rvalue = [self.fold(value) for value in expr.rvalue]
+            return expr
+
+        if expr.type == Expression.CALL:
+            call = cast(expr)
+            call.callee = self.fold(call.callee)
+            call.args = [self.fold(arg) for arg in call.args]
+            return expr
+
+        if expr.type == Expression.LIST_ACCESS:
+            expr.lvalue = self.fold(expr.lvalue)
+            expr.rvalue = self.fold(expr.rvalue)
+            return expr
+
+        if expr.type == Expression.INPUT:
+            expr.lvalue = self.fold(expr.lvalue)
+            return expr
+
+        if expr.type == Expression.UNARY:
+            return self.fold_unary(cast(expr))
+
+        if expr.type == Expression.BINARY_EXPRESSION:
+            return self.fold_binary(cast(expr))
+
+        return expr
+
+    def fold_unary(self, expr: Unary):
+        expr.lvalue = self.fold(expr.lvalue)
+        if not is_constant(expr.lvalue):
+            return expr
+
+        value = expr.lvalue.lvalue
+        if expr.op == "-":
+            if type(value) in number_types:
+                return Optimizer.folded(-value, expr)
+            return expr
+
+        return Optimizer.folded(not to_bool(value), expr)
+
+    def fold_binary(self, expr: BinaryExpression):
+        expr.lvalue = self.fold(expr.lvalue)
+        expr.rvalue = self.fold(expr.rvalue)
+        left = expr.lvalue
+        right = expr.rvalue
+
+        if expr.op == "and" or expr.op == "or":
+            if not is_constant(left):
+                return expr
+
+            # the right side is only needed when the left one doesn't decide the result
+            if to_bool(left.lvalue) == (expr.op == "or"):
+                return Optimizer.folded(to_bool(left.lvalue), expr)
+            if is_constant(right):
+                return Optimizer.folded(to_bool(right.lvalue), expr)
+            return expr
+
+        if left.type != Expression.LITERAL or right.type != Expression.LITERAL:
+            return expr
+
+        lvalue = left.lvalue
+        rvalue = right.lvalue
+        if type(lvalue) in number_types and type(rvalue) in number_types:
+            try:
+                value = expr.operator(None, expr, lvalue, rvalue)
+            except ArithmeticError:
+                return expr
+
+            # the engines that write literals into code can't write these
+            if type(value) is float and not math.isfinite(value):
+                return expr
+            return Optimizer.folded(value, expr)
+
+        if type(lvalue) is SILString and type(rvalue) is SILString:
+            if expr.op == "+":
+                return Optimizer.folded(SILString(lvalue.get_string() + rvalue.get_string()), expr)
+            if expr.op == "==" or expr.op == "!=":
+                return Optimizer.folded(expr.operator(None, expr, lvalue, rvalue), expr)
+            return expr
+
+        # comparing a string with anything else is an error
+        if (expr.op == "==" or expr.op == "!=") and type(lvalue) is not SILString and type(rvalue) is not SILString:
+            return Optimizer.folded(expr.operator(None, expr, lvalue, rvalue), expr)
+        return expr
@@ -0,0 +1,203 @@
+from interpreter import *
+from concurrent.futures import ThreadPoolExecutor
+import ctypes
+import io
+import multiprocessing
+import os
+import threading
+import time
+
+
+# raised into a thread running a program once it has run out of time. it isn't an Exception, so nothing in the
+# engines mistakes it for an error in the program
+class ProgramTimeout(BaseException):
+    pass
+
+
+# what happened when a program ran: what it printed, the errors it reported, and the code it exited with, which is
+# 0 when it finished, 1 after an error, whatever it gave exit(), and None when it ran out of time
+class ProgramResult:
+    def __init__(self, name, output, error_output, errors, exit_code, timed_out, seconds):
+        self.name = name
+        self.output = output
+        # the errors as the command line would have printed them
+        self.error_output = error_output
+        self.errors = errors
+        self.exit_code = exit_code
+        self.timed_out = timed_out
+        self.seconds = seconds
+
+    @property
+    def ok(self):
+        return self.exit_code == 0
+
+    def __repr__(self):
+        status = "timed out" if self.timed_out else f"exit code {self.exit_code}"
+        return f"<ProgramResult {self.name}: {status} after {self.seconds:.3f}s>"
+
+
+# runs a program, or the file at a path, and collects what it printed into a result
+def run_program(engine, natives, program, args, stdin) -> ProgramResult:
+    start = time.perf_counter()
+    name = program.path if isinstance(program, Program) else program
+
+    error_output = io.StringIO()
+    output = io.StringIO()
+    interpreter = Interpreter(engine, natives, error_output)
+    exit_code = 0
+    timed_out = False
+    try:
+        try:
+            if not isinstance(program, Program):
+                program = interpreter.compile_file(program)
+            # programs never wait on the real stdin, they get an empty one unless they are given what to read
+            interpreter.run(program, args, stdout=output, stdin=io.StringIO(stdin or ""))
+        except SilangError:
+            exit_code = 1
+        except SilangExit as e:
+            exit_code = e.code
+    except ProgramTimeout:
+        exit_code = None
+        timed_out = True
+
+    return ProgramResult(name, output.getvalue(), error_output.getvalue(), interpreter.state.errors, exit_code,
+                         timed_out, time.perf_counter() - start)
+
+
+# stops the thread which started it once it has run for too long, by raising ProgramTimeout into it. python only
+# raises it between bytecodes, so a program stuck waiting on a file isn't stopped until the file gives it something
+class Deadline:
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.thread_id = None
+        self.lock = threading.Lock()
+        self.running = False
+        self.timer = None
+
+    def start(self):
+        with self.lock:
+            self.thread_id = threading.get_ident()
+            self.running = True
+        self.timer = threading.Timer(self.seconds, self.expire)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def expire(self):
+        with self.lock:
+            if self.running:
+                self.running = False
+                ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(self.thread_id),
+                                                           ctypes.py_object(ProgramTimeout))
+
+    # the timeout can be raised while this runs, so it has to be called until it gets through
+    def cancel(self):
+        with self.lock:
+            self.running = False
+        if self.timer is not None:
+            self.timer.cancel()
+
+
+def run_in_thread(engine, natives, program, args, stdin, timeout):
+    if timeout is None:
+        return run_program(engine, natives, program, args, stdin)
+
+    deadline = Deadline(timeout)
+    try:
+        deadline.start()
+        result = run_program(engine, natives, program, args, stdin)
+    except ProgramTimeout:
+        # it came before the program started or after it finished, while its result was being put together
+        result = None
+
+    while True:
+        try:
+            deadline.cancel()
+            break
+        except ProgramTimeout:
+            pass
+
+    if result is None:
+        name = program.path if isinstance(program, Program) else program
+        result = ProgramResult(name, "", "", [], None, True, timeout)
+    return result
+
+
+def process_main(connection, engine, natives, program, args, stdin):
+    connection.send(run_program(engine, natives, program, args, stdin))
+    connection.close()
+
+
+# runs a program in a process of its own, which is killed if it runs for too long
+def run_in_process(context, engine, natives, program, args, stdin, timeout):
+    start = time.perf_counter()
+    name = program.path if isinstance(program, Program) else program
+
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=process_main, args=(sender, engine, natives, program, args, stdin), daemon=True)
+    process.start()
+    sender.close()
+
+    try:
+        if receiver.poll(timeout):
+            result = receiver.recv()
+        else:
+            process.kill()
+            # what it printed went with it
+            result = ProgramResult(name, "", "", [], None, True, time.perf_counter() - start)
+    except EOFError:
+        process.join()
+        result = ProgramResult(name, "", f"Program's process stopped with code {process.exitcode}\n", [],
+                               process.exitcode, False, time.perf_counter() - start)
+    finally:
+        receiver.close()
+    process.join()
+    return result
+
+
+# runs many independent programs at once, each with its own engine, globals, errors and output.
+#
+#   with ExecutionPool(processes=True, timeout=10) as pool:
+#       for result in pool.map(["a.sil", "b.sil"]):
+#           print(result.name, result.exit_code, result.output)
+#
+# threads suit programs that spend their time waiting on files or input, since python only runs one thread at a
+# time. processes use every core for programs that spend it computing, but start a new process for each program.
+# programs are given as paths, which are compiled where they run, or as Programs from Interpreter.compile
+class ExecutionPool:
+    def __init__(self, engine="walker", workers=None, processes=False, natives=True, timeout=None):
+        if engine not in engine_names:
+            raise ValueError(f"Unknown engine '{engine}'. Available engines are: {', '.join(engine_names)}")
+
+        self.engine = engine
+        self.natives = natives
+        self.processes = processes
+        # the timeout of programs which aren't given their own, in seconds
+        self.timeout = timeout
+        self.workers = workers or os.cpu_count() or 1
+
+        # every program is waited on by a thread, even when it runs in a process
+        self.executor = ThreadPoolExecutor(self.workers, thread_name_prefix="silang")
+        self.context = multiprocessing.get_context() if processes else None
+
+    # starts running a program, returning a future of its ProgramResult. stdin is the text input reads from
+    def submit(self, program: Program | str, args=None, stdin=None, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        if self.processes:
+            return self.executor.submit(run_in_process, self.context, self.engine, self.natives, program, args, stdin,
+                                        timeout)
+        return self.executor.submit(run_in_thread, self.engine, self.natives, program, args, stdin, timeout)
+
+    # runs every program, returning their results in the same order
+    def map(self, programs, args=None, stdin=None, timeout=None) -> list[ProgramResult]:
+        futures = [self.submit(program, args, stdin, timeout) for program in programs]
+        return [future.result() for future in futures]
+
+    # waits for the programs that are still running, unless told not to
+    def close(self, wait=True):
+        self.executor.shutdown(wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,154 @@
+from tree_components import *
+import sys
+import threading
+import time
+
+
+def cast(x) -> Any:
+    # used for the type checker
+    return x
+
+
+# stands in for a function while profiling, counting its calls. it isn't any engine's own kind of function, so every
+# engine calls it through the same slow path, which is also where the profiler sees a silang function start
+class CountedCallable(Callable):
+    def __init__(self, compiled: Callable):
+        self.compiled = compiled
+        self.name = compiled.name
+        self.param_count = compiled.param_count
+        self.calls = 0
+
+    def call(self, tree_walker, args, call):
+        self.calls += 1
+        return self.compiled.call(tree_walker, args, call)
+
+
+# the python engine calls its functions' python code directly, so they are counted by wrapping that instead, which
+# keeps them on the fast path
+class CountedFunction:
+    def __init__(self, name, fn):
+        self.name = name
+        self.fn = fn
+        self.calls = 0
+
+    def __call__(self, env, *args):
+        self.calls += 1
+        return self.fn(env, *args)
+
+
+counted_codes = (CountedCallable.call.__code__, CountedFunction.__call__.__code__)
+
+
+# samples the python stack of the thread running a program every few milliseconds, and works out the silang
+# functions and lines it was in from it. the program itself only pays for the samples and for counting calls
+class Profiler:
+    interval = 0.005
+
+    def __init__(self, engine):
+        self.engine = engine
+        engine.profiler = self
+
+        self.functions = []
+        # seconds spent in each function, and in each function or anything it called
+        self.self_times = {}
+        self.total_times = {}
+        # seconds spent on each line, by (file, line)
+        self.line_times = {}
+        # samples of every stack, as 'function (file:line);...' for flame graphs
+        self.stacks = {}
+        self.sampled = 0.0
+
+        self.thread_id = None
+        self.thread = None
+        self.stopped = threading.Event()
+
+    def counted(self, compiled: Callable):
+        if hasattr(compiled, "fn"):
+            counted = CountedFunction(compiled.name, cast(compiled).fn)
+            cast(compiled).fn = counted
+        else:
+            compiled = counted = CountedCallable(compiled)
+
+        self.functions.append(counted)
+        return compiled
+
+    def start(self):
+        self.thread_id = threading.get_ident()
+        self.thread = threading.Thread(target=self.sample_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def sample_loop(self):
+        last = time.perf_counter()
+        while not self.stopped.wait(Profiler.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is not None:
+                self.sample(frame, now - last)
+            last = now
+
+    # the silang stack the python stack is running, from the outside in, as [function name, node] pairs
+    def silang_stack(self, frame):
+        frames = []
+        while frame is not None:
+            frames.append(frame)
+            frame = frame.f_back
+
+        engine = self.engine
+        stack = [["<main>", None]]
+        for frame in reversed(frames):
+            if frame.f_code in counted_codes:
+                stack.append([frame.f_locals["self"].name, None])
+                continue
+
+            node = engine.profile_node(frame)
+            if node is not None and hasattr(node, "line"):
+                stack[-1][1] = node
+        return stack
+
+    def sample(self, frame, seconds):
+        stack = self.silang_stack(frame)
+        self.sampled += seconds
+
+        name, node = stack[-1]
+        self.self_times[name] = self.self_times.get(name, 0) + seconds
+        # recursive functions are only counted once for each sample
+        for name in set(name for name, _ in stack):
+            self.total_times[name] = self.total_times.get(name, 0) + seconds
+
+        if node is not None:
+            line = (node.file, node.line)
+            self.line_times[line] = self.line_times.get(line, 0) + seconds
+
+        collapsed = ";".join(name if node is None else f"{name} ({node.file}:{node.line})" for name, node in stack)
+        self.stacks[collapsed] = self.stacks.get(collapsed, 0) + 1
+
+    def report(self, file=sys.stderr, lines=20):
+        calls = {"<main>": 1}
+        for function in self.functions:
+            calls[function.name] = calls.get(function.name, 0) + function.calls
+
+        total = self.sampled or 1
+        names = sorted(set(calls) | set(self.total_times), key=lambda name: -self.self_times.get(name, 0))
+        print(f"{'function':<24}{'calls':>10}{'self':>11}{'total':>11}", file=file)
+        for name in names:
+            if not calls.get(name) and name not in self.total_times:
+                continue
+            self_time = self.self_times.get(name, 0)
+            total_time = self.total_times.get(name, 0)
+            print(f"{name:<24}{calls.get(name, 0):>10}{self_time:>10.3f}s{total_time:>10.3f}s"
+                  f"  {self_time / total * 100:5.1f}%", file=file)
+
+        print(f"\n{'line':<40}{'self':>11}", file=file)
+        hot = sorted(self.line_times.items(), key=lambda item: -item[1])[:lines]
+        for (path, line), seconds in hot:
+            print(f"{f'{path}:{line}':<40}{seconds:>10.3f}s  {seconds / total * 100:5.1f}%", file=file)
+
+    # one line for every stack with the number of times it was sampled, which flamegraph.pl and speedscope can read
+    def write_stacks(self, path):
+        with open(path, "w") as file:
+            for stack, samples in self.stacks.items():
+                file.write(f"{stack} {samples}\n")
@@ -0,0 +1,162 @@
+from tree_components import *
+from environment import *
+
+
+def cast(x) -> Any:
+    # used for the type checker
+    return x
+
+
+# static pass between parsing and running. it gives every block and function a scope, and works out
+# the (depth, slot) of every variable, so the tree walker doesn't have to look variables up by name.
+#
+# functions are called in the environment of their caller, so variables a function doesn't declare
+# itself are left to be looked up by name at runtime. so are top level variables, which are global.
+class Resolver:
+    def __init__(self):
+        # scopes of the function or top level block being resolved, innermost last
+        self.scopes = []
+
+        self.in_function = False
+        self.loop_depth = 0
+
+    def resolve(self, stmts):
+        for stmt in stmts:
+            self.resolve_stmt(stmt)
+        return stmts
+
+    # declares everything a list of statements declares directly in its scope. this is done before resolving
+    # anything, so a variable used before its declaration (e.g. in a loop) still gets a slot, which will just
+    # be empty until the declaration runs
+    def declare_all(self, scope: Scope, stmts):
+        for stmt in stmts:
+            if stmt is None:
+                continue
+
+            if stmt.type == Statement.VAR_DECL:
+                stmt.slot = scope.declare(stmt.name)
+
+            elif stmt.type == Statement.IF:
+                self.declare_all(scope, [stmt.stmt, stmt.elseStmt])
+
+            elif stmt.type == Statement.WHILE:
+                self.declare_all(scope, [stmt.stmt, stmt.final_stmt])
+
+    def resolve_stmt(self, stmt: Statement):
+        if stmt is None:
+            return
+
+        if stmt.type == Statement.BLOCK:
+            self.resolve_block(cast(stmt))
+            return
+
+        if stmt.type == Statement.FUNCTION:
+            self.resolve_function(cast(stmt))
+            return
+
+        if stmt.type == Statement.VAR_SET:
+            self.resolve_name(stmt)
+            self.resolve_expr(stmt.expr)
+            return
+
+        if stmt.type == Statement.IF:
+            self.resolve_expr(stmt.expr)
+            self.resolve_stmt(stmt.stmt)
+            self.resolve_stmt(stmt.elseStmt)
+            return
+
+        if stmt.type == Statement.WHILE:
+            self.resolve_expr(stmt.expr)
+            self.loop_depth += 1
+            self.resolve_stmt(stmt.stmt)
+            self.loop_depth -= 1
+
+            # the final statement of a for loop isn't part of the loop
+            self.resolve_stmt(stmt.final_stmt)
+            return
+
+        if stmt.type == Statement.RETURN:
+            stmt.in_function = self.in_function
+            self.resolve_expr(stmt.expr)
+            return
+
+        if stmt.type == Statement.STOP or stmt.type == Statement.SKIP:
+            stmt.in_loop = self.loop_depth > 0
+            return
+
+        if stmt.type == Statement.LIST_SET:
+            self.resolve_expr(stmt.lst)
+            self.resolve_expr(stmt.index_expr)
+            self.resolve_expr(stmt.expr)
+            return
+
+        if stmt.expr is not None:
+            self.resolve_expr(stmt.expr)
+
+    def resolve_block(self, stmt: Block):
+        stmt.scope = Scope()
+        self.declare_all(stmt.scope, stmt.stmts)
+
+        self.scopes.append(stmt.scope)
+        for substmt in stmt.stmts:
+            self.resolve_stmt(substmt)
+        self.scopes.pop()
+
+    def resolve_function(self, stmt: Function):
+        # the parameters and the body share one scope
+        stmt.scope = Scope()
+        for param in stmt.params:
+            stmt.scope.declare(param)
+        stmt.body.scope = stmt.scope
+        self.declare_all(stmt.scope, stmt.body.stmts)
+
+        enclosing = (self.scopes, self.in_function, self.loop_depth)
+        self.scopes = [stmt.scope]
+        self.in_function = True
+        self.loop_depth = 0
+
+        for substmt in stmt.body.stmts:
+            self.resolve_stmt(substmt)
+
+        self.scopes, self.in_function, self.loop_depth = enclosing
+
+    def resolve_name(self, node):
+        name = node.lvalue if node.type == Expression.VARIABLE else node.name
+        for depth in range(len(self.scopes)):
+            slots = self.scopes[-1 - depth].slots
+            if name in slots:
+                node.depth = depth
+                node.slot = slots[name]
+                return
+
+    def resolve_expr(self, expr: Expression):
+        if expr is None:
+            return
+
+        if expr.type == Expression.VARIABLE:
+            self.resolve_name(expr)
+            return
+
+        if expr.type == Expression.LITERAL:
+            return
+
+        if expr.type == Expression.LIST_LITERAL:
+            for item in expr.lvalue:
+                self.resolve_expr(item)
+            return
+
+        if expr.type == Expression.MAP_LITERAL:
+            for key, value in zip(expr.lvalue, expr.rvalue):
+                self.resolve_expr(key)
+                self.resolve_expr(value)
+            return
+
+        if expr.type == Expression.CALL:
+            self.resolve_expr(cast(expr).callee)
+            for arg in cast(expr).args:
+                self.resolve_expr(arg)
+            return
+
+        self.resolve_expr(expr.lvalue)
+        if expr.type == Expression.LIST_ACCESS or expr.type == Expression.BINARY_EXPRESSION:
+            self.resolve_expr(expr.rvalue)
@@ -0,0 +1,22 @@
+from setuptools import setup
+import os
+import re
+
+# the version lives in silang.py, which can't be imported here without the rest of the interpreter
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "silang.py")) as file:
+    version = re.search(r'^version = "(.*)"$', file.read(), re.MULTILINE).group(1)
+
+setup(
+    name="silang",
+    version=version,
+    description="silang (slow interpreted language), an interpreted language similar to javascript",
+    python_requires=">=3.10",
+    py_modules=[
+        "silang", "lexer", "tokens", "error", "_parser", "tree_components", "environment", "resolver", "optimizer", "cache",
+        "baselib", "tree_walker", "compiler", "vm", "closures", "transpiler",
+        "profiler", "instrumented", "interpreter", "pool",
+    ],
+    entry_points={
+        "console_scripts": ["silang = silang:main"],
+    },
+)
@@ -1,36 +1,244 @@
-from lexer import MultiFileLexer
-from tokens import *
-from error import *
-from _parser import *
-from tree_walker import *
+# the silang command. the interpreter is only imported once it is needed, so '--version' and small scripts start fast
 import sys
 import os
+import time
+import gc
+from interpreter import engine_names, load_engine
 
-input_file_path = sys.argv[1]
-if not os.path.exists(input_file_path):
-    Error.report_flat(f"File '{input_file_path}' not found")
-    exit(1)
+version = "0.1.0"
 
-tokens = MultiFileLexer(input_file_path).tokens
+usage = """usage: silang [options] <file.sil> [args...]
+       silang [options] -c <code> [args...]
 
-t = ""
-for token in tokens:
-    t += f"{token.type} {token.lexeme}\n"
+options:
+  --engine=<engine>     run with 'walker' (the default), 'vm', 'closure' or 'python'
+  --no-natives          use the silang versions of the standard library instead of the native ones
+  --no-cache            don't read or write parsed files in __silcache__ folders
+  --no-optimize         run the syntax tree as it was parsed, without working out constants first
+  --time                print how long lexing, parsing and running took, and how much they allocated
+  --counters[=path]     run with a tree walker that counts the nodes, environments, strings and calls the program
+                        makes, and print them as json, or write them to a file
+  --profile[=path]      print the functions and lines the program spent its time in, and write the sampled stacks
+                        to a file for flame graphs
+  --dump-tokens[=path]  print every token, or write them to a file
+  --dump-ast[=path]     print the syntax tree, or write it to a file
+  --dump-optimized[=path]
+                        print the syntax tree after it has been optimized, or write it to a file
+  -c <code>             run the code given instead of a file
+  --version             print the version
+  --help                print this"""
 
-with open("out.txt", "wb") as file:
-    file.write(t.encode('ascii', errors='replace'))
+# the time, change in allocated memory blocks and garbage collections of each phase, for '--time'
+class PhaseTimer:
+    def __init__(self):
+        self.phases = {}
 
-if Error.error_occurred:
-    exit(1)
+    @staticmethod
+    def sample():
+        return time.perf_counter(), sys.getallocatedblocks(), sum(stat["collections"] for stat in gc.get_stats())
 
-parser = Parser(tokens)
+    def add(self, name, start, end, sign=1):
+        phase = self.phases.setdefault(name, [0, 0, 0])
+        for i in range(3):
+            phase[i] += sign * (end[i] - start[i])
 
-stmts = parser.parse()
+    # lexing happens while parsing, so each file's tokens are gathered all at once to keep it out of the parse time
+    def lex(self, tokens):
+        start = PhaseTimer.sample()
+        tokens = list(tokens)
+        end = PhaseTimer.sample()
+        self.add("lex", start, end)
+        self.add("parse", start, end, -1)
+        return tokens
 
-if Error.error_occurred:
-    exit(1)
+    def report(self):
+        total = [sum(phase[i] for phase in self.phases.values()) for i in range(3)]
+        for name, (seconds, blocks, collections) in list(self.phases.items()) + [("total", total)]:
+            print(f"{name:<8}{seconds:>9.4f}s{blocks:>+12} blocks{collections:>6} collections", file=sys.stderr)
 
-# print(Parser.tree_to_str(parser.parse()))
 
-walker = TreeWalker()
-walker.run(stmts)
+# dumps go to stdout when they aren't given a path, and are written as they are made
+def open_dump(path):
+    if path == "-":
+        return open(sys.stdout.fileno(), "w", encoding="ascii", errors="replace", closefd=False)
+    return open(path, "w", encoding="ascii", errors="replace")
+
+
+def dump_tokens(tokens, file):
+    for token in tokens:
+        file.write(f"{token.type} {token.lexeme}\n")
+        yield token
+
+
+def main(argv=None):
+    from error import SilangError, SilangExit
+
+    # errors have already been reported by the time they get here
+    try:
+        run_command(sys.argv[1:] if argv is None else argv)
+    except SilangError:
+        exit(1)
+    except SilangExit as e:
+        exit(e.code)
+
+
+def run_command(argv):
+    from error import Error
+
+    # options come before the file path, and everything after it is left for arg()
+    engine = "walker"
+    natives = True
+    cache = True
+    optimize = True
+    timing = False
+    profile = False
+    counters = False
+    counters_path = None
+    profile_path = None
+    dump_tokens_path = None
+    dump_ast_path = None
+    dump_optimized_path = None
+    code = None
+
+    i = 0
+    while i < len(argv) and argv[i].startswith("-") and code is None:
+        option = argv[i]
+        i += 1
+        if option.startswith("--engine="):
+            engine = option[len("--engine="):]
+            if engine not in engine_names:
+                Error.report_flat(f"Unknown engine '{engine}'. Available engines are: {', '.join(engine_names)}")
+                exit(1)
+        elif option == "--no-natives":
+            natives = False
+        elif option == "--no-cache":
+            cache = False
+        elif option == "--no-optimize":
+            optimize = False
+        elif option == "--time":
+            timing = True
+        elif option == "--counters" or option.startswith("--counters="):
+            counters = True
+            counters_path = option[len("--counters="):] or None
+        elif option == "--profile" or option.startswith("--profile="):
+            profile = True
+            profile_path = option[len("--profile="):] or None
+        elif option == "--dump-tokens" or option.startswith("--dump-tokens="):
+            dump_tokens_path = option[len("--dump-tokens="):] or "-"
+        elif option == "--dump-ast" or option.startswith("--dump-ast="):
+            dump_ast_path = option[len("--dump-ast="):] or "-"
+        elif option == "--dump-optimized" or option.startswith("--dump-optimized="):
+            dump_optimized_path = option[len("--dump-optimized="):] or "-"
+        elif option == "-c":
+            if i == len(argv):
+                Error.report_flat("No code given after '-c'")
+                exit(1)
+            code = argv[i]
+            i += 1
+        elif option == "--version":
+            print(f"silang {version}")
+            return
+        elif option == "--help":
+            print(usage)
+            return
+        else:
+            Error.report_flat(f"Unknown option '{option}'")
+            exit(1)
+
+    if counters and engine != "walker":
+        Error.report_flat("Counters only work with the 'walker' engine")
+        exit(1)
+
+    if code is not None:
+        input_file_path = "<string>"
+        # arg(0) is '-c' then, like python's sys.argv
+        args = ["-c"] + argv[i:]
+    else:
+        if i == len(argv):
+            Error.report_flat("No input file given")
+            exit(1)
+
+        input_file_path = argv[i]
+        args = argv[i:]
+        if not os.path.exists(input_file_path):
+            Error.report_flat(f"File '{input_file_path}' not found")
+            exit(1)
+
+    from lexer import MultiFileLexer
+    from _parser import Parser
+    from resolver import Resolver
+    from optimizer import Optimizer
+    from cache import ParseCache
+
+    timer = PhaseTimer()
+    start = PhaseTimer.sample()
+    lexer = MultiFileLexer(input_file_path, code)
+    timer.add("lex", start, PhaseTimer.sample())
+
+    def wrap(tokens):
+        return timer.lex(tokens) if timing else tokens
+
+    start = PhaseTimer.sample()
+    # code given with -c isn't cached, it has nowhere to go
+    cache = cache and code is None
+    if dump_tokens_path is None:
+        stmts = ParseCache(cache).parse(lexer, wrap)
+    else:
+        # files loaded from the cache aren't lexed, so they wouldn't have any tokens to dump
+        with open_dump(dump_tokens_path) as file:
+            stmts = ParseCache(False).parse(lexer, lambda tokens: dump_tokens(wrap(tokens), file))
+
+    if dump_ast_path is not None:
+        with open_dump(dump_ast_path) as file:
+            for stmt in stmts:
+                file.write(Parser.tree_to_str(stmt) + "\n")
+
+    if Error.error_occurred:
+        exit(1)
+
+    if optimize:
+        stmts = Optimizer().optimize(stmts)
+    if dump_optimized_path is not None:
+        with open_dump(dump_optimized_path) as file:
+            for stmt in stmts:
+                file.write(Parser.tree_to_str(stmt) + "\n")
+
+    Resolver().resolve(stmts)
+    timer.add("parse", start, PhaseTimer.sample())
+
+    if counters:
+        from instrumented import InstrumentedWalker
+        walker = InstrumentedWalker()
+    else:
+        walker = load_engine(engine)()
+    walker.natives = natives
+    walker.argv = [sys.argv[0]] + args
+
+    profiler = None
+    if profile:
+        from profiler import Profiler
+        profiler = Profiler(walker)
+        profiler.start()
+
+    start = PhaseTimer.sample()
+    try:
+        walker.run(stmts)
+    finally:
+        if counters:
+            if counters_path is None:
+                print(walker.counters_json(), file=sys.stderr)
+            else:
+                with open(counters_path, "w") as file:
+                    file.write(walker.counters_json() + "\n")
+        if profiler is not None:
+            profiler.stop()
+            profiler.report()
+            if profile_path is not None:
+                profiler.write_stacks(profile_path)
+        if timing:
+            timer.add("run", start, PhaseTimer.sample())
+            timer.report()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+import io
+import os
+from interpreter import Interpreter, engine_names
+from error import SilangError
+
+
+# where programs are run from, so they can include the standard library with #base/...
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# runs source on an engine, giving what it printed and the messages of the errors it stopped with
+def run(source, engine="walker", optimize=True, natives=True):
+    output = io.StringIO()
+    interpreter = Interpreter(engine, natives, io.StringIO(), optimize)
+    try:
+        interpreter.execute(source, os.path.join(root, "<test>.sil"), stdout=output)
+    except SilangError as e:
+        return output.getvalue(), [error.message for error in e.errors]
+    return output.getvalue(), []
+
+
+# every engine with and without the optimizer, and the unoptimized tree walker that the others are compared to
+def run_everywhere(source, natives=True):
+    expected = run(source, "walker", False, natives)
+    results = {("walker", False): expected}
+    for engine in engine_names:
+        for optimize in (True, False):
+            results[(engine, optimize)] = run(source, engine, optimize, natives)
+    return expected, results
@@ -0,0 +1,69 @@
+import cache
+import pytest
+from cache import ParseCache
+from error import ErrorState, current_state
+from lexer import MultiFileLexer
+from _parser import Parser
+
+
+# parses a file through the cache, giving the tree of every statement and the files that had to be parsed
+def parse(path):
+    parsed = []
+
+    def wrap(tokens):
+        tokens = list(tokens)
+        parsed.append(tokens[0].file)
+        return tokens
+
+    state = ErrorState(None)
+    token = current_state.set(state)
+    try:
+        lexer = MultiFileLexer(str(path))
+        stmts = ParseCache().parse(lexer, wrap)
+    finally:
+        current_state.reset(token)
+    assert state.errors == []
+    return [Parser.tree_to_str(stmt) for stmt in stmts], parsed
+
+
+@pytest.fixture
+def program(tmp_path):
+    (tmp_path / "lib.sil").write_text("fun double(x) return x * 2;\n")
+    path = tmp_path / "main.sil"
+    path.write_text('#lib.sil\nprint double(21);\n')
+    return path
+
+
+def test_second_load_is_a_hit(program):
+    tree, parsed = parse(program)
+    assert len(parsed) == 2
+    assert len(list((program.parent / ParseCache.folder).iterdir())) == 2
+
+    assert parse(program) == (tree, [])
+
+
+def test_changed_source_is_parsed_again(program):
+    tree, _ = parse(program)
+    program.write_text('#lib.sil\nprint double(4);\n')
+
+    changed, parsed = parse(program)
+    assert parsed == [str(program)]
+    assert changed != tree and "4" in changed[-1]
+
+
+def test_new_interpreter_version_is_parsed_again(program, monkeypatch):
+    tree, _ = parse(program)
+    monkeypatch.setattr(cache, "interpreter_version", lambda: "0" * 16)
+
+    assert parse(program) == (tree, [str(program.parent / "lib.sil"), str(program)])
+    assert parse(program) == (tree, [])
+
+
+def test_corrupt_cache_file_is_parsed_again(program):
+    tree, _ = parse(program)
+    for cached in (program.parent / ParseCache.folder).iterdir():
+        cached.write_bytes(b"not a cached tree")
+
+    assert parse(program) == (tree, [str(program.parent / "lib.sil"), str(program)])
+    # and cached again
+    assert parse(program) == (tree, [])
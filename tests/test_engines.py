@@ -0,0 +1,170 @@
+import pytest
+from support import run_everywhere
+
+
+conditions = [
+    'var s = "x"; if s print 1; else print 2;',
+    'var s = ""; if s print 1; else print 2;',
+    'var s = "x"; print !s; print s and true; print novalue or s;',
+    'var s = "x"; var i = 0; while s { i += 1; if i > 2 s = novalue; } print i;',
+    'var l = []; if l print 1; print !l; print l or false;',
+    'var n = novalue; if n print 1; else print 2; print !n; print n and true;',
+    'var z = 0; if z print 1; print !z;',
+]
+
+
+@pytest.mark.parametrize("source", conditions)
+def test_conditions_agree(source):
+    expected, results = run_everywhere(source)
+    assert expected[1] == []
+    for key, result in results.items():
+        assert result == expected, key
+
+
+# conditions the optimizer can work out on its own, which have to fold to what the engines would do at runtime
+folded = [
+    'var s = "x"; if s print 1; print !s; print s and true;',
+    'if "x" print 1; else print 2; print !"x"; print "x" and true; print "" or false;',
+    'if [] print 1; else print 2; print ![]; print [1] and true; print [] or false;',
+    'if novalue print 1; else print 2; print !novalue; print novalue and true; print novalue or 3;',
+    'var i = 0; while "x" { i += 1; if i > 2 stop; } print i;',
+    'while novalue print 1; while [] { print 2; stop; }',
+]
+
+
+@pytest.mark.parametrize("source", folded)
+def test_optimizer_agrees(source):
+    expected, results = run_everywhere(source)
+    assert expected[1] == []
+    for key, result in results.items():
+        assert result == expected, key
+
+
+# variables with a slot, ones looked up by name, and slots that are still empty
+scoping = [
+    'var x = 1; { var y = x + 1; { var z = y + x; print z; x = z; } } print x;',
+    '{ var i = 0; while i < 3 { if i > 0 print j; var j = i; i += 1; } }',
+    'fun f() { print x; x = 5; } { var x = 2; f(); print x; } var x = 3; f(); print x;',
+    'fun g(a) { var b = a * 2; { var c = b + a; return c; } } print g(4);',
+    '{ var a = 1; { var a = 2; print a; } print a; var b = 1; var b = 2; }',
+    'fun f(a, a) print a; f(1, 2);',
+    'print missing;',
+    '{ missing = 1; }',
+]
+
+
+@pytest.mark.parametrize("source", scoping)
+def test_scoping_agrees(source):
+    expected, results = run_everywhere(source)
+    for key, result in results.items():
+        assert result == expected, key
+
+
+# runs of instructions the vm links into one handler, with values that have to take the slow path
+fused = [
+    'fun f() { var i = 0; var t = 0; while i < 5 { t += i * i - 1; i += 1; } return t; } print f();',
+    'fun f() { var i = 0.5; while i < 3 { print i; i += 1; } } f();',
+    'fun f() { var i = "a"; while i < 3 { print i; i += 1; } } f();',
+    'fun f() { var i = 0; var n = 3; while i != n { print i; i += 1; } } f();',
+    'fun f() { for var i = 0; i < 6; i += 1; { if i == 2 skip; if i == 4 stop; print i; } } f();',
+    'fun f() { var s = "a"; var t = "b"; s = s + t; print s; s = s + 1; } f();',
+    'var s = ""; for var i = 0; i < 3; i += 1; s += "x"; print s; s += 1;',
+    'fun f(l) { var i = 0; while i < 4 { print l[i]; i += 1; } } f([1, 2, 3]);',
+    'fun f(l, i) { print l[i]; } f("abc", 1); f([1], 0); f(5, 0);',
+    'fun f() { var i = 0; while i < 3 { var j = i; i += 1; } print j; } f();',
+    'fun f(x) return x; print f(novalue); print f(2) < f(3);',
+    'fun f() { var i = 0; while i * 2 < 10 i += 1; return i; } print f();',
+    'fun f() { var x = 1; { var x = 2; } var x = 3; } f();',
+    'fun g() print 1; for var i = 0; i < 2; i += 1; { g(); g = 2; }',
+]
+
+
+@pytest.mark.parametrize("source", fused)
+def test_fused_agrees(source):
+    expected, results = run_everywhere(source)
+    for key, result in results.items():
+        assert result == expected, key
+
+
+# map literals, str and number keys, getting and setting items, missing keys and the order keys are kept in
+maps = [
+    ('var m = {"a": 1, 2: "two", 1.5: [3]}; print m; print m["a"]; print m[2]; print m[1.5][0]; print length(m); '
+     'print type(m);', "{a: 1, 2: two, 1.5: [3]}1two33map", []),
+    ('var m = {}; m["x"] = 1; m["x"] = m["x"] + 2; m[3] = "c"; print m;', "{x: 3, 3: c}", []),
+    ('var k = "key"; var m = {k: 1}; k[0] = "m"; print m; print has(m, "key"); print has(m, k);',
+     "{key: 1}truefalse", []),
+    ('var m = {1: "one"}; print m[1.0]; print has(m, 1.0); print remove(m, 1); print remove(m, 1); print m;',
+     "onetrueonenovalue{}", []),
+    ('var m = {"b": 1, "a": 2, 10: 3}; m["c"] = 4; remove(m, "a"); m["a"] = 5; m["b"] = 6; print keys(m); '
+     'for var i = 0; i < length(keys(m)); i += 1; print m[keys(m)[i]];', "[b, 10, c, a]6345", []),
+    ('fun f() { var m = {"n": 0}; for var i = 0; i < 5; i += 1; m["n"] = m["n"] + i; return m["n"]; } print f();',
+     "10", []),
+    ('var m = {"a": 1}; var n = m; n["b"] = 2; print m; print m == n; print {"a": 1} == {"a": 1};',
+     "{a: 1, b: 2}truetrue", []),
+    ('var m = {"x": {"y": [1, 2]}}; m["x"]["y"][1] = 5; print m["x"]["y"]; print m.keys(); print m.has("x");',
+     "[1, 5][x]true", []),
+    ('var m = {"a": 1}; print 1; print m["b"];', "1", ["Key 'b' isn't in the map"]),
+    ('fun f(m) return m[1]; print f({"1": 1});', "", ["Key '1' isn't in the map"]),
+    ('var m = {[1]: 2};', "", ["Map keys must be strings or numbers, not 'list'"]),
+    ('var m = {"a": 1}; m[true] = 2;', "", ["Map keys must be strings or numbers, not 'boolean'"]),
+]
+
+
+@pytest.mark.parametrize("source, output, errors", maps)
+def test_maps(source, output, errors):
+    expected, results = run_everywhere(source)
+    assert expected == (output, errors)
+    for key, result in results.items():
+        assert result == expected, key
+
+
+# whole numbers are python ints, so they don't lose precision, and dividing them only gives a float when it has to
+numbers = [
+    ('var x = 1; for var i = 0; i < 100; i += 1; x *= 2; print x; print " "; print x - 1; print " "; print x / 1024;',
+     "1267650600228229401496703205376 1267650600228229401496703205375 1237940039285380274899124224"),
+    ('var f = 1; for var i = 1; i <= 25; i += 1; f *= i; print f; print " "; print f / 24; print " "; print f / 7;',
+     "15511210043330985984000000 646300418472124416000000 2215887149047283712000000"),
+    ('print num("123456789012345678901234567890") + 1; print " "; print -12345678901234567890 * 10;',
+     "123456789012345678901234567891 -123456789012345678900"),
+    # exact division keeps every digit, inexact division is a float
+    ('print 12345678901234567890123 / 3; print " "; print 12345678901234567890124 / 3;',
+     "4115226300411522630041 4115226300411522580480"),
+    ('print 6 / 3; print " "; print 7 / 2; print " "; print 1 / 3; print " "; print -7 / 2; print " "; print -8 / 2; '
+     'print " "; print 0 / 5;', "2 3.5 0.3333333333333333 -3.5 -4 0"),
+    ('fun half(n) return n / 2; var total = 0; for var i = 0; i < 5; i += 1; total += half(i); print total;', "5"),
+    # ints and floats mix freely
+    ('print 1 + 2.5; print " "; print 2 * 1.5; print " "; print 3 - 0.5; print " "; print 10 / 4.0; print " "; '
+     'print 6.0 / 3; print " "; print 1 == 1.0; print " "; print 2 < 2.5; print " "; print type(6 / 3);',
+     "3.5 3 2.5 2.5 2 true true number"),
+    ('var x = 0.5; for var i = 0; i < 3; i += 1; x += i; print x; print " "; print 100000000000000000000 + 0.5;',
+     "3.5 100000000000000000000"),
+]
+
+
+@pytest.mark.parametrize("source, output", numbers)
+def test_numbers(source, output):
+    expected, results = run_everywhere(source)
+    assert expected == (output, [])
+    for key, result in results.items():
+        assert result == expected, key
+
+
+# list and map literals changed after they are evaluated, which have to be new again the next time
+literals = [
+    ('for var i = 0; i < 3; i += 1; { var l = [1, 2]; l.push(i); print l; }', "[1, 2, 0][1, 2, 1][1, 2, 2]"),
+    ('fun f() { var l = [[0], "ab", {"k": 1}]; push(l[0], 9); l[1][0] = "z"; l[2]["k"] = 5; return l; } '
+     'print f(); print f();', "[[0, 9], zb, {k: 5}][[0, 9], zb, {k: 5}]"),
+    ('fun f() { var m = {"a": [1], "s": "q"}; push(m["a"], 2); m["b"] = 3; m["s"][0] = "r"; return m; } '
+     'print f(); print f();', "{a: [1, 2], s: r, b: 3}{a: [1, 2], s: r, b: 3}"),
+    ('for var i = 0; i < 2; i += 1; { var m = {}; m[i] = i; print m; }', "{0: 0}{1: 1}"),
+    ('fun f() return [1]; var a = f(); var b = f(); a.push(2); print b; print a == b;', "[1]false"),
+    ('fun g(l) { l.push(0); return l; } for var i = 0; i < 2; i += 1; print g([]);', "[0][0]"),
+]
+
+
+@pytest.mark.parametrize("source, output", literals)
+def test_literals_are_new_every_time(source, output):
+    expected, results = run_everywhere(source)
+    assert expected == (output, [])
+    for key, result in results.items():
+        assert result == expected, key
@@ -0,0 +1,36 @@
+import io
+import threading
+from interpreter import Interpreter
+from instrumented import InstrumentedWalker
+from tree_components import SILString
+
+
+def count_strings(source):
+    program = Interpreter(error_stream=io.StringIO(), optimize=False).compile(source)
+    walker = InstrumentedWalker()
+    walker.stdout = io.StringIO()
+    walker.run(program.stmts)
+    return walker.counters["strings"]
+
+
+def test_counts_strings():
+    assert count_strings('print "a";') == 1
+    assert count_strings('var s = "ab" + "cd"; print s[0]; print type(s);') == 5
+    assert count_strings('var l = json_parse("[\\"a\\", \\"b\\"]"); print json_dump(l);') == 4
+
+
+def test_strings_are_counted_per_walker():
+    init = SILString.__init__
+    counts = {}
+
+    def run(n):
+        counts[n] = count_strings(f'var s = ""; for var i = 0; i < {n}; i += 1; s = s + "x";')
+
+    threads = [threading.Thread(target=run, args=(n,)) for n in (200, 400, 800)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert counts == {200: 401, 400: 801, 800: 1601}
+    assert SILString.__init__ is init
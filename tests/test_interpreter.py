@@ -0,0 +1,59 @@
+import io
+import threading
+import pytest
+from error import SilangError
+from interpreter import Interpreter
+
+
+def random_numbers(seed):
+    return f'seed({seed}); for var i = 0; i < 5000; i += 1; {{ print rng(); print " "; }}'
+
+
+def run_alone(source):
+    output = io.StringIO()
+    Interpreter().execute(source, stdout=output)
+    return output.getvalue()
+
+
+def test_interpreters_on_threads_keep_their_own_rng():
+    sources = [random_numbers(1), random_numbers(2)]
+    expected = [run_alone(source) for source in sources]
+
+    for _ in range(5):
+        outputs = [io.StringIO(), io.StringIO()]
+        interpreters = [Interpreter(), Interpreter()]
+        threads = [threading.Thread(target=interpreters[i].execute, args=(sources[i],), kwargs={"stdout": outputs[i]})
+                   for i in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert [output.getvalue() for output in outputs] == expected
+
+
+def test_seed_carries_over_between_runs():
+    output = io.StringIO()
+    interpreter = Interpreter()
+    interpreter.execute("seed(7);")
+    interpreter.execute("print rng();", stdout=output)
+    assert output.getvalue() == run_alone("seed(7); print rng();")
+
+
+# code that stops in the middle of something
+truncated = ['fun f(', 'fun', 'var', 'f(1,', 'x[', 'var m = {1:', 'for var i = 0; i <', 'print (1', 'x = "', 'x = "\\4']
+
+
+@pytest.mark.parametrize("source", truncated)
+def test_truncated_source_raises_silang_error(source):
+    with pytest.raises(SilangError) as error:
+        Interpreter().compile(source)
+    assert error.value.line == 1
+
+
+def test_arg_gives_strings():
+    output = io.StringIO()
+    interpreter = Interpreter()
+    program = interpreter.compile('print type(arg(0)); print arg(0) + arg(1); print arg(1) == "7"; print arg(2);')
+    interpreter.run(program, args=["a", 7], stdout=output)
+    interpreter.run(program, args=["b", 8], stdout=output)
+    assert output.getvalue() == "stringa7truenovaluestringb8falsenovalue"
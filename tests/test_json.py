@@ -0,0 +1,50 @@
+import json
+import pytest
+from baselib import JsonStream
+from support import run_everywhere
+
+
+document = {
+    "meta": {"tags": ["a", "}", {"b": "]"}], "count": 2},
+    "skipped": [1, 2.5, None, True],
+    "items": [{"id": i, "name": "x" * i, "nested": [i, [i]]} for i in range(40)],
+    "after": 12345,
+}
+
+
+@pytest.fixture(params=[3, 64, 1 << 16])
+def path(request, tmp_path, monkeypatch):
+    # small chunks make values cross the end of what has been read so far
+    monkeypatch.setattr(JsonStream, "chunk_size", request.param)
+    path = tmp_path / "data.json"
+    path.write_text(json.dumps(document, indent=1))
+    return str(path).replace("\\", "/")
+
+
+def agree(source):
+    expected, results = run_everywhere(source)
+    for key, result in results.items():
+        assert result == expected, key
+    return expected
+
+
+def test_nested_array_is_streamed(path):
+    streamed = agree(f'var n = 0; fun add(item) n += item["id"] + length(item["nested"]); '
+                     f'json_each_in("{path}", "items", add); print n;')
+    parsed = agree(f'var n = 0; var items = read("{path}").json_parse()["items"]; '
+                   f'for var i = 0; i < length(items); i += 1; n += items[i]["id"] + length(items[i]["nested"]); '
+                   f'print n;')
+    assert streamed == parsed == (str(sum(range(40)) + 80), [])
+
+
+def test_keys(path):
+    assert agree(f'fun show(item) print item; json_each_in("{path}", ["meta", "tags"], show);') == ("a}{b: ]}", [])
+    assert agree(f'fun show(item) print item; json_each_in("{path}", "after", show);') == ("12345", [])
+    assert agree(f'fun show(item) print item; json_each_in("{path}", [], show);')[0].startswith("{meta:")
+
+
+def test_errors(path):
+    assert "isn't in the object" in agree(f'fun f(x) x; json_each_in("{path}", "missing", f);')[1][0]
+    assert "Expecting an object" in agree(f'fun f(x) x; json_each_in("{path}", ["after", "x"], f);')[1][0]
+    assert "list of keys" in agree(f'fun f(x) x; json_each_in("{path}", 1, f);')[1][0]
+    assert "Third argument" in agree(f'json_each_in("{path}", "items", 1);')[1][0]
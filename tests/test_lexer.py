@@ -0,0 +1,98 @@
+import glob
+import io
+import os
+import pytest
+from error import ErrorState, SilangError, current_state
+from interpreter import Interpreter
+from lexer import CharLexer, Lexer, MultiFileLexer
+from support import root
+
+
+# every token, include and error a lexer makes, with where they were
+def lex(lexer_class, path, string=None):
+    state = ErrorState(None)
+    token = current_state.set(state)
+    try:
+        lexer = lexer_class(path, string)
+        tokens = [(t.type, t.lexeme, t.line, t.char_index, t.file) for t in lexer.lex()]
+        includes = [(t.lexeme, t.line, t.char_index, t.file) for t in lexer.includes]
+    finally:
+        current_state.reset(token)
+    return tokens, includes, [error.text for error in state.errors]
+
+
+files = sorted(path for folder in ("examples", "base", "bench")
+               for path in glob.glob(os.path.join(root, folder, "*.sil")))
+
+
+@pytest.mark.parametrize("path", files, ids=lambda path: os.path.relpath(path, root))
+def test_files_lex_the_same(path):
+    assert lex(Lexer, path) == lex(CharLexer, path)
+
+
+sources = [
+    '',
+    'print 1;',
+    'var x = 1',
+    'print "unterminated;\nprint 2;',
+    'print "unterminated',
+    'print "a\\nb\\x41\\q" + "\\"";',
+    'print "\\x4";',
+    'var a1b = 12abc; print 3.5.x; print 7.; print .5;',
+    'x1=2;y+=3;z-=4;w*=5;v/=6;a==b;a!=b;a<=b;a>=b;!a;',
+    'print 1; // a comment with "quotes" and \\ in it',
+    '// only a comment',
+    '#base/math.sil\nprint 1;\n#base/strops.sil',
+    'print 1;\r\nprint 2;\r\n',
+    '\n\n   \n',
+    'var é = 1; print ab€c; print 1é;',
+    'print @; print $ 1; ` ~ ^ &',
+    'print "line\nbreak";',
+    'var\tx = 1;',
+]
+
+
+@pytest.mark.parametrize("source", sources)
+def test_sources_lex_the_same(source):
+    path = os.path.join(root, "<test>.sil")
+    assert lex(Lexer, path, source) == lex(CharLexer, path, source)
+
+
+# files included from more than one place, and files that include each other
+def write(folder, files):
+    for name, source in files.items():
+        (folder / name).write_text(source)
+
+
+def test_diamond_includes_each_file_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write(tmp_path, {
+        "main.sil": '#left.sil\n#right.sil\nprint left() + right();\n',
+        "left.sil": '#shared.sil\nfun left() return shared() + 1;\n',
+        "right.sil": '#shared.sil\nfun right() return shared() * 10;\n',
+        "shared.sil": 'var calls = 0;\nfun shared() { calls += 1; return calls; }\n',
+    })
+    state = ErrorState(None)
+    token = current_state.set(state)
+    try:
+        lexer = MultiFileLexer("main.sil")
+    finally:
+        current_state.reset(token)
+    assert state.errors == []
+    assert [os.path.basename(file_lexer.path) for file_lexer in lexer.lexers] == \
+        ["shared.sil", "left.sil", "right.sil", "main.sil"]
+
+    # shared.sil's global is only declared once
+    output = io.StringIO()
+    interpreter = Interpreter()
+    interpreter.run(interpreter.compile_file("main.sil"), stdout=output)
+    assert output.getvalue() == "22"
+
+
+def test_include_cycle_is_reported_where_it_closes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write(tmp_path, {"a.sil": '#b.sil\nprint 1;\n', "b.sil": 'print 2;\n#a.sil\n'})
+    with pytest.raises(SilangError) as error:
+        Interpreter().compile_file("a.sil")
+    assert [(e.file, e.line, e.char_index, e.message) for e in error.value.errors] == \
+        [("b.sil", 2, 1, "include cycle: a.sil -> b.sil -> a.sil")]
@@ -0,0 +1,39 @@
+import pytest
+from interpreter import engine_names
+from support import run
+
+
+# every function with a native version, with the arguments to call it with. the natives only handle some of these
+# themselves, the rest go to the silang version, and either way the result has to be the same
+calls = {
+    "base/listops.sil": [
+        "copy([])", 'copy("")', 'copy([1, "a", novalue])', 'copy("abc")', "copy(novalue)", "copy(3)",
+        "contains([], 1)", 'contains("", "a")', 'contains("abc", "b")', 'contains("abc", "d")',
+        "contains([1, 2], 2)", "contains([novalue], novalue)", "contains(novalue, 1)",
+        "indexof([], 1)", 'indexof("", "a")', 'indexof("abc", "c")', "indexof([1, 2, 2], 2)",
+        'indexof([1, "x"], "y")', "indexof(novalue, 1)",
+    ],
+    "base/strops.sil": [
+        'split("", ",")', 'split("a,b", ",")', 'split(",a,,b,", ",")', 'split("abc", "")', 'split("abc", "ab")',
+        'split("abc", 1)', 'split(novalue, ",")',
+    ],
+    "base/math.sil": [
+        "floor(0)", "floor(2.7)", "floor(-2.7)", "floor(-2.5)", "floor(-0.5)", "floor(1.5)", "floor(-3)",
+        "floor(novalue)", 'floor("1")',
+        "ceil(0)", "ceil(2.2)", "ceil(-2.2)", "ceil(-2.5)", "ceil(0.5)", "ceil(1.5)", "ceil(-3)",
+        "ceil(novalue)",
+        "mod(7, 3)", "mod(-7, 3)", "mod(7, -3)", "mod(-7, -3)", "mod(-7.5, 2)", "mod(5.5, 1.5)", "mod(0, 5)",
+        "mod(5, 0)", "mod(novalue, 2)",
+        "chr(0)", "chr(9)", "chr(10)", "chr(-1)", "chr(3.5)", "chr(1000)", "chr(novalue)", 'chr("1")',
+        "tostr(0)", "tostr(7)", "tostr(120)", "tostr(-5)", "tostr(2.5)", "tostr(novalue)",
+    ],
+}
+
+cases = [(path, call) for path, path_calls in calls.items() for call in path_calls]
+
+
+@pytest.mark.parametrize("engine", engine_names)
+@pytest.mark.parametrize("path, call", cases)
+def test_native_matches_silang(engine, path, call):
+    source = f"#{path}\nprint {call};"
+    assert run(source, engine, natives=True) == run(source, engine, natives=False)
@@ -0,0 +1,32 @@
+import os
+from interpreter import Interpreter
+from pool import ExecutionPool
+from support import root
+
+
+# hashmap.sil seeds the rng with every key it hashes, so threads sharing one rng would put keys in the wrong buckets
+hashmap_source = """#examples/hashmap.sil
+var days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"];
+for var n = 0; n < 20; n += 1;
+{
+    var map = hashmap(13);
+    for var i = 0; i < days.length(); i += 1;
+        map.mset(days[i], i + n);
+    for var i = 0; i < days.length(); i += 1;
+        { print map.mget(days[i]); print " "; }
+    print "\\n";
+}
+"""
+
+
+def test_threads_have_their_own_rng():
+    program = Interpreter().compile(hashmap_source, os.path.join(root, "<test>.sil"))
+    with ExecutionPool(workers=1) as pool:
+        expected = pool.map([program])[0]
+    assert expected.ok, expected.error_output
+
+    with ExecutionPool(workers=8) as pool:
+        results = pool.map([program] * 16)
+    for result in results:
+        assert result.ok, result.error_output
+        assert result.output == expected.output
@@ -0,0 +1,12 @@
+import pytest
+from interpreter import engine_names
+from silang import run_command
+
+
+@pytest.mark.parametrize("engine", engine_names)
+def test_arg_is_a_string(engine, tmp_path, capsys):
+    path = tmp_path / "args.sil"
+    path.write_text('print type(arg(1)); print arg(1) + "x"; var a = arg(1); a[0] = "j"; print a; print arg(1); '
+                    'print arg(1) == "hello"; print arg(2);')
+    run_command([f"--engine={engine}", "--no-cache", str(path), "hello"])
+    assert capsys.readouterr().out == "stringhelloxjellohellotruenovalue"
@@ -0,0 +1,120 @@
+import pytest
+from support import run_everywhere
+from tree_components import SILString, SILStringNotChar
+
+
+def test_buffer_is_made_on_the_first_change():
+    string = SILString("abc")
+    assert string.buffer is None and string[1] == SILString("b")
+
+    string[1] = SILString("x")
+    string.append(SILString("d"))
+    assert string.buffer == ["a", "x", "c", "d"]
+    assert string.get_string() == "axcd" and len(string) == 4
+
+
+def test_changing_a_string_updates_its_hash():
+    string = SILString("abc")
+    assert hash(string) == hash("abc")
+    string[0] = SILString("z")
+    assert hash(string) == hash("zbc") and string == SILString("zbc")
+    assert string.pop(0) == SILString("z") and string == SILString("bc")
+
+
+def test_copies_and_items_dont_share_the_buffer():
+    string = SILString("abc")
+    copy = string.copy()
+    item = string[0]
+    string[0] = SILString("z")
+    assert copy == SILString("abc") and item == SILString("a")
+
+
+def test_only_characters_can_be_set():
+    string = SILString("abc")
+    with pytest.raises(SILStringNotChar):
+        string[0] = SILString("xy")
+    with pytest.raises(SILStringNotChar):
+        string.append(1)
+    assert string.get_string() == "abc"
+
+
+# strings changed in place, and compared with the literals they are now equal to
+changed = [
+    ('var s = "hello"; var t = s; t[0] = "j"; print s; print " "; print s == "jello"; print " "; s.push("!"); '
+     'print t; print " "; print pop(s, 0); print " "; print s;', "jello true jello! j ello!", []),
+    ('var s = "abc"; print s[1]; print s[-1]; s[1] = "x"; print s; print s == "axc"; print "axc" == s; '
+     'print s != "abc"; print length(s);', "bcaxctruetruetrue3", []),
+    ('fun f() { var s = "abc"; s[0] = "z"; return s; } print f(); print f() == "zbc";', "zbctrue", []),
+    ('var s = "ab"; var m = {s: 1}; s[0] = "x"; m[s] = 2; print m; print m["ab"];', "{ab: 1, xb: 2}1", []),
+    ('var s = "abc"; s[0] = "xy";', "", ["Attempt to set character in string to non character"]),
+]
+
+
+@pytest.mark.parametrize("source, output, errors", changed)
+def test_changed_strings(source, output, errors):
+    expected, results = run_everywhere(source)
+    assert expected == (output, errors)
+    for key, result in results.items():
+        assert result == expected, key
+
+
+def long_string(character):
+    return SILString(character * SILString.BUILD_LENGTH)
+
+
+def test_adding_to_the_newest_string_extends_its_builder():
+    start = long_string("a") + SILString("b")
+    longer = start + SILString("c")
+    assert longer.builder is start.builder
+    assert start.get_string() == "a" * 64 + "b" and longer.get_string() == "a" * 64 + "bc"
+
+    # start isn't at the end of the builder any more, so adding to it again can't extend it
+    other = start + SILString("d")
+    assert other.builder is not start.builder
+    assert other.get_string() == "a" * 64 + "bd" and longer.get_string() == "a" * 64 + "bc"
+
+
+def test_adding_to_the_front_extends_its_builder():
+    end = SILString("b") + long_string("a")
+    longer = SILString("c") + end
+    assert longer.builder is end.builder
+    assert longer.get_string() == "cb" + "a" * 64 and len(longer) == 66
+
+
+def test_changing_a_built_string_leaves_the_others():
+    start = long_string("a") + SILString("b")
+    longer = start + SILString("c")
+    start[0] = SILString("z")
+    assert start.builder is None
+    assert longer.get_string() == "a" * 64 + "bc"
+    assert (start + SILString("d")).get_string() == "z" + "a" * 63 + "bd"
+
+
+# repeated '+' in loops, then reading, changing and comparing what was built
+built = [
+    ('var s = ""; for var i = 0; i < 200; i += 1; s += "ab"; print length(s); print s[0]; print s[399]; '
+     'print s[150];', "400aba"),
+    ('var s = ""; for var i = 0; i < 100; i += 1; s = "x" + s + "y"; print length(s); print s[0] + s[199]; '
+     'print s[99] + s[100];', "200xyxy"),
+    ('var a = ""; for var i = 0; i < 50; i += 1; a += "ab"; var b = a + "c"; var c = a + "d"; print b[100] + c[100]; '
+     'print length(a); print a == b;', "cd100false"),
+    ('var a = ""; for var i = 0; i < 50; i += 1; a += "ab"; var b = a + "c"; b[0] = "z"; var c = b + "e"; '
+     'print a[0] + b[0] + c[0] + c[101]; print length(c);', "azze102"),
+    ('var a = ""; for var i = 0; i < 70; i += 1; a += "z"; var b = a; a += "y"; print length(b); print length(a); '
+     'b += "w"; print a[70] + b[70];', "7071yw"),
+    ('var a = ""; for var i = 0; i < 40; i += 1; a += "q"; var lit = "qqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqq"; '
+     'print a == lit; print lit == a; var m = {a: 1}; print m[lit]; print has(m, a);', "truetrue1true"),
+    ('var parts = []; var s = ""; for var i = 0; i < 10; i += 1; { s += "0123456789"; parts.push(s); } '
+     'print length(parts[3]) + length(parts[9]); print parts[9] == s; print parts[2][29];', "140true9"),
+    ('fun join(l) { var s = ""; for var i = 0; i < length(l); i += 1; s += l[i] + ","; return s; } '
+     'var l = []; for var i = 0; i < 30; i += 1; l.push("n"); var s = join(l); s.push("!"); print s[60]; '
+     'print join(l) == s;', "!false"),
+]
+
+
+@pytest.mark.parametrize("source, output", built)
+def test_built_strings(source, output):
+    expected, results = run_everywhere(source)
+    assert expected == (output, [])
+    for key, result in results.items():
+        assert result == expected, key
@@ -0,0 +1,86 @@
+import io
+import pytest
+from error import SilangError
+from interpreter import Interpreter
+from transpiler import Transpiler, TranspileError
+from support import run_everywhere
+
+
+def transpile(source):
+    program = Interpreter("python", error_stream=io.StringIO()).compile(source)
+    return Transpiler().transpile(program.stmts)
+
+
+shadowed = "var n = 0; for var i = 0; i < 3; i += 1; { var i = 10; n += 1; if n > 30 stop; skip; } print n;"
+skipped = "var m = 0; for var j = 0; j < 5; j += 1; { if j == 2 skip; m += j; " \
+          "for var k = 0; k < 2; k += 1; { if k == 0 skip; m += 100; } } print m;"
+
+
+def test_skip_runs_final_statement_once():
+    source = transpile(skipped)
+    # a skip is a plain continue, without any exceptions
+    assert "continue" in source and "raise" not in source and "try:" not in source
+    expected, results = run_everywhere(skipped)
+    assert expected == ("408", [])
+    for key, result in results.items():
+        assert result == expected, key
+
+
+def test_shadowed_loop_variable_with_skip():
+    with pytest.raises(TranspileError):
+        transpile(shadowed)
+    expected, results = run_everywhere(shadowed)
+    assert expected == ("3", [])
+    for key, result in results.items():
+        assert result == expected, key
+
+
+def test_nested_calls_grow_linearly():
+    def nested(depth):
+        return "fun f(x) return x + 1; print " + "f(" * depth + "0" + ")" * depth + ";"
+
+    sizes = [len(transpile(nested(depth))) for depth in (8, 16, 32)]
+    # twice as many calls, not twice as much code per call
+    assert sizes[2] - sizes[1] < 3 * (sizes[1] - sizes[0])
+
+    expected, results = run_everywhere(nested(32))
+    assert expected == ("32", [])
+    for key, result in results.items():
+        assert result == expected, key
+
+
+def test_arguments_are_evaluated_after_checking_the_callee():
+    source = 'var n = 1; fun f(x) { n = 2; return x; } var g = 3; g(f(1), n);'
+    expected, results = run_everywhere(source)
+    assert expected[1] != []
+    for key, result in results.items():
+        assert result == expected, key
+
+
+def test_infinite_float_literals():
+    huge = "9" * 400 + ".5"
+    source = f"var x = {huge}; print x > 0; print -{huge} < x; print {huge} * 2 == x; print x - x == x - x;"
+    expected, results = run_everywhere(source)
+    assert expected == ("truetruetruefalse", [])
+    for key, result in results.items():
+        assert result == expected, key
+
+
+def test_program_run_again_is_transpiled_once(monkeypatch):
+    transpiled = []
+    transpile_stmts = Transpiler.transpile
+    monkeypatch.setattr(Transpiler, "transpile", lambda self, stmts: transpiled.append(stmts) or
+                        transpile_stmts(self, stmts))
+
+    interpreter = Interpreter("python", error_stream=io.StringIO())
+    program = interpreter.compile('var l = [1]; l.push(arg(0)); print l;\nprint l[5];', "again.sil")
+    for run in ("a", "b", "c"):
+        output = io.StringIO()
+        with pytest.raises(SilangError) as error:
+            interpreter.run(program, args=[run], stdout=output)
+        # the cached code still traces errors back to their line, and still has its own globals every run
+        assert output.getvalue() == f"[1, {run}]" and error.value.line == 2
+    assert transpiled == [program.stmts]
+
+    interpreter.run(interpreter.compile("print 1;"), stdout=io.StringIO())
+    assert len(transpiled) == 2
@@ -16,6 +16,7 @@ class Token(ErrorPacket):
     SEMI_COLON = ";"
     EXCLAMATION = "!"
     COMMA = ","
+    COLON = ":"
 
     INCLUDE = "include"
 
@@ -0,0 +1,810 @@
+from closures import *
+import math
+import threading
+
+
+class TranspileError(Exception):
+    pass
+
+
+class PyFunction(Callable):
+    def __init__(self, func: Function, fn):
+        self.name = func.name
+        self.param_count = func.param_count
+        self.fn = fn
+
+    def call(self, tree_walker, args, call):
+        return self.fn(tree_walker.env, *args)
+
+
+# turns the whole program into python source code, with a python function for every silang function and one for
+# the main program, so it can be compiled once and run directly.
+#
+# silang functions run in the environment of their caller, so a function can see its caller's variables by name.
+# only names that can actually be looked up like that (the ones some function uses without having declared them
+# first) are kept in SlotEnvironments. everything else becomes a plain python local, renamed per scope.
+class Transpiler:
+    def __init__(self, path="<silang>"):
+        self.path = path
+
+        self.lines = []
+        # the silang statement every generated line came from, so errors in generated code can be traced back
+        self.source_map = []
+        self.indent = 0
+        self.current_stmt = None
+
+        # values the generated code refers to, which become globals named _k0, _k1, ...
+        self.constants = []
+        self.constant_indices = {}
+        self.temp_count = 0
+
+        self.scope_indices = {}
+        self.function_names = {}
+        self.function_lines = []
+        self.function_map = []
+
+        # filled in by the scan before any code is generated
+        self.free_names = set()
+        self.dominated = set()
+        self.needs_init = set()
+        self.needs_check = set()
+        self.decl_counts = {}
+
+        self.stack = []
+        self.defined = set()
+        self.envs = []
+
+    def transpile(self, stmts) -> str:
+        self.scan_main(stmts)
+
+        self.stack = []
+        self.envs = ["env"]
+        self.emit("def _main(env):")
+        self.indent += 1
+        self.gen_body(stmts)
+        self.indent -= 1
+
+        # functions are defined at the top level of the module, before the main program
+        header = [f"_k{i} = _constants[{i}]" for i in range(len(self.constants))]
+        self.source_map = [None] * len(header) + self.function_map + self.source_map
+        return "\n".join(header + self.function_lines + self.lines) + "\n"
+
+    def node_at(self, line):
+        if 0 < line <= len(self.source_map):
+            return self.source_map[line - 1]
+        return None
+
+    # ------------------------------------------------------------------------------------------------------------
+    # scan: works out which names have to be looked up by name at runtime, and which reads of a variable are always
+    # after its declaration in the same scope
+
+    def scope_index(self, scope: Scope):
+        if id(scope) not in self.scope_indices:
+            self.scope_indices[id(scope)] = (len(self.scope_indices), scope)
+        return self.scope_indices[id(scope)][0]
+
+    def scan_main(self, stmts):
+        self.in_function = False
+        for stmt in stmts:
+            self.scan_stmt(stmt, False)
+
+    def scan_sequence(self, stmts, scope: Scope):
+        index = self.scope_index(scope)
+        self.stack.append(scope)
+
+        added = []
+        for stmt in stmts:
+            self.scan_stmt(stmt, True)
+
+            # a declaration that isn't nested in anything runs exactly once, and everything after it can use it
+            if stmt is not None and stmt.type == Statement.VAR_DECL:
+                key = (index, stmt.name)
+                if key not in self.defined:
+                    self.defined.add(key)
+                    added.append(key)
+
+        for key in added:
+            self.defined.discard(key)
+        self.stack.pop()
+
+    def scan_stmt(self, stmt: Statement, direct):
+        if stmt is None:
+            return
+
+        if stmt.type == Statement.VAR_DECL:
+            self.scan_expr(stmt.expr)
+            if stmt.slot is not None:
+                key = (self.scope_index(self.stack[-1]), stmt.name)
+                self.decl_counts[key] = self.decl_counts.get(key, 0) + 1
+                if not direct or self.decl_counts[key] > 1:
+                    self.needs_check.add(key)
+                    self.needs_init.add(key)
+            return
+
+        if stmt.type == Statement.VAR_SET:
+            self.scan_expr(stmt.expr)
+            self.scan_access(stmt, stmt.name)
+            return
+
+        if stmt.type == Statement.BLOCK:
+            self.scan_sequence(cast(stmt).stmts, cast(stmt).scope)
+            return
+
+        if stmt.type == Statement.FUNCTION:
+            func = cast(stmt)
+            if len(set(func.params)) != len(func.params):
+                raise TranspileError(f"function '{func.name}' has duplicate parameters")
+
+            enclosing = (self.stack, self.defined, self.in_function)
+            self.stack = []
+            self.defined = {(self.scope_index(func.scope), param) for param in func.params}
+            for param in func.params:
+                self.decl_counts[(self.scope_index(func.scope), param)] = 1
+            self.in_function = True
+            self.scan_sequence(func.body.stmts, func.scope)
+            self.stack, self.defined, self.in_function = enclosing
+            return
+
+        if stmt.type == Statement.IF:
+            self.scan_expr(stmt.expr)
+            self.scan_stmt(stmt.stmt, False)
+            self.scan_stmt(stmt.elseStmt, False)
+            return
+
+        if stmt.type == Statement.WHILE:
+            self.scan_expr(stmt.expr)
+            self.scan_stmt(stmt.stmt, False)
+            self.scan_stmt(stmt.final_stmt, False)
+            if stmt.final_stmt is not None and self.has_loop_exit(stmt.final_stmt):
+                raise TranspileError("stop or skip in the final statement of a for loop")
+            if stmt.final_stmt is not None and self.loop_names(stmt) & self.declared_names(stmt.stmt):
+                raise TranspileError("the body of a for loop shadows a loop variable")
+            return
+
+        if stmt.type == Statement.LIST_SET:
+            self.scan_expr(stmt.lst)
+            self.scan_expr(stmt.index_expr)
+            self.scan_expr(stmt.expr)
+            return
+
+        if stmt.expr is not None:
+            self.scan_expr(stmt.expr)
+
+    # whether a stop or skip (or only the kinds given) in the statement leaves the loop it is in
+    def has_loop_exit(self, stmt: Statement, kinds=(Statement.STOP, Statement.SKIP)):
+        if stmt is None:
+            return False
+        if stmt.type in kinds:
+            return cast(stmt).in_loop
+        if stmt.type == Statement.BLOCK:
+            return any(self.has_loop_exit(substmt, kinds) for substmt in cast(stmt).stmts)
+        if stmt.type == Statement.IF:
+            return self.has_loop_exit(stmt.stmt, kinds) or self.has_loop_exit(stmt.elseStmt, kinds)
+        return False
+
+    # the variables a for loop declares in its first statement, and the one its final statement sets
+    def loop_names(self, loop: While):
+        names = set(self.stack[-1].slots) if self.stack else set()
+        if loop.final_stmt.type == Statement.VAR_SET:
+            names.add(cast(loop.final_stmt).name)
+        return names
+
+    # the variables a statement declares in itself or any block nested in it, not counting functions
+    def declared_names(self, stmt: Statement):
+        if stmt is None:
+            return set()
+        if stmt.type == Statement.VAR_DECL:
+            return {cast(stmt).name}
+        if stmt.type == Statement.BLOCK:
+            return set().union(*(self.declared_names(substmt) for substmt in cast(stmt).stmts))
+        if stmt.type == Statement.IF:
+            return self.declared_names(stmt.stmt) | self.declared_names(stmt.elseStmt)
+        if stmt.type == Statement.WHILE:
+            return self.declared_names(stmt.stmt) | self.declared_names(stmt.final_stmt)
+        return set()
+
+    def scan_expr(self, expr: Expression):
+        if expr is None:
+            return
+
+        if expr.type == Expression.VARIABLE:
+            self.scan_access(expr, expr.lvalue)
+            return
+
+        if expr.type == Expression.LITERAL:
+            return
+
+        if expr.type == Expression.LIST_LITERAL:
+            for item in expr.lvalue:
+                self.scan_expr(item)
+            return
+
+        if expr.type == Expression.MAP_LITERAL:
+            for key, value in zip(expr.lvalue, expr.rvalue):
+                self.scan_expr(key)
+                self.scan_expr(value)
+            return
+
+        if expr.type == Expression.CALL:
+            self.scan_expr(cast(expr).callee)
+            for arg in cast(expr).args:
+                self.scan_expr(arg)
+            return
+
+        self.scan_expr(expr.lvalue)
+        if expr.type == Expression.LIST_ACCESS or expr.type == Expression.BINARY_EXPRESSION:
+            self.scan_expr(expr.rvalue)
+
+    def scan_access(self, node, name):
+        if node.slot is not None:
+            scope = self.stack[-1 - node.depth]
+            if (self.scope_index(scope), name) in self.defined:
+                self.dominated.add(id(node))
+                return
+
+        # any scope this could fall back to has to start out empty
+        for scope in self.stack:
+            if name in scope.slots:
+                self.needs_init.add((self.scope_index(scope), name))
+
+        if self.in_function:
+            self.free_names.add(name)
+
+    # ------------------------------------------------------------------------------------------------------------
+    # code generation
+
+    def emit(self, line):
+        self.lines.append("    " * self.indent + line)
+        self.source_map.append(self.current_stmt)
+
+    def constant(self, value):
+        if id(value) not in self.constant_indices:
+            self.constant_indices[id(value)] = len(self.constants)
+            self.constants.append(value)
+        return f"_k{self.constant_indices[id(value)]}"
+
+    def temp(self):
+        self.temp_count += 1
+        return f"_t{self.temp_count}"
+
+    def is_boxed(self, scope: Scope):
+        return any(name in self.free_names for name in scope.slots)
+
+    def local_name(self, scope: Scope, name):
+        return f"v{self.scope_index(scope)}_{name}"
+
+    def env_name(self, scope: Scope):
+        return f"e{self.scope_index(scope)}"
+
+    def enter_scope(self, scope: Scope, params=()):
+        self.stack.append(scope)
+        if self.is_boxed(scope):
+            self.emit(f"{self.env_name(scope)} = _SlotEnvironment({self.constant(scope)}, {self.envs[-1]})")
+            self.envs.append(self.env_name(scope))
+        else:
+            self.envs.append(self.envs[-1])
+
+        index = self.scope_index(scope)
+        for name in scope.slots:
+            if name not in self.free_names and name not in params and (index, name) in self.needs_init:
+                self.emit(f"{self.local_name(scope, name)} = _U")
+
+    def exit_scope(self):
+        self.stack.pop()
+        self.envs.pop()
+
+    def gen_body(self, stmts):
+        start = len(self.lines)
+        for stmt in stmts:
+            self.gen_stmt(stmt)
+        if len(self.lines) == start:
+            self.emit("pass")
+
+    def gen_stmt(self, stmt: Statement):
+        if stmt is None:
+            return
+
+        enclosing_stmt = self.current_stmt
+        self.current_stmt = stmt
+        self.gen_stmt_inner(stmt)
+        self.current_stmt = enclosing_stmt
+
+    def gen_stmt_inner(self, stmt: Statement):
+        if stmt.type == Statement.FLAT:
+            self.emit(self.gen_expr(stmt.expr))
+            return
+
+        if stmt.type == Statement.PRINT:
+            self.emit(f"print(_get_value({self.gen_expr(stmt.expr)}), end='', file=_w.stdout)")
+            return
+
+        if stmt.type == Statement.VAR_DECL:
+            self.gen_var_decl(cast(stmt))
+            return
+
+        if stmt.type == Statement.VAR_SET:
+            self.gen_write(stmt, cast(stmt).name, self.gen_expr(stmt.expr))
+            return
+
+        if stmt.type == Statement.LIST_SET:
+            self.gen_list_set(cast(stmt))
+            return
+
+        if stmt.type == Statement.BLOCK:
+            self.enter_scope(cast(stmt).scope)
+            for substmt in cast(stmt).stmts:
+                self.gen_stmt(substmt)
+            self.exit_scope()
+            return
+
+        if stmt.type == Statement.IF:
+            self.emit(f"if {self.gen_condition(stmt.expr)}:")
+            self.indent += 1
+            self.gen_body([stmt.stmt])
+            self.indent -= 1
+            if stmt.elseStmt is not None:
+                self.emit("else:")
+                self.indent += 1
+                self.gen_body([stmt.elseStmt])
+                self.indent -= 1
+            return
+
+        if stmt.type == Statement.WHILE:
+            loop = cast(stmt)
+
+            # a skip has to get to the final statement, which runs in the loop's scope and not the body's. it is
+            # generated once at the top of the loop instead, where every iteration but the first runs it, so a
+            # skip is just a continue
+            if loop.final_stmt is not None and self.has_loop_exit(loop.stmt, (Statement.SKIP,)):
+                first = self.temp()
+                self.emit(f"{first} = True")
+                self.emit("while True:")
+                self.indent += 1
+                self.emit(f"if {first}:")
+                self.emit(f"    {first} = False")
+                self.emit("else:")
+                self.indent += 1
+                self.gen_stmt(loop.final_stmt)
+                self.indent -= 1
+                self.emit(f"if not ({self.gen_condition(loop.expr)}):")
+                self.emit("    break")
+                self.gen_body([loop.stmt])
+                self.indent -= 1
+                return
+
+            self.emit(f"while {self.gen_condition(loop.expr)}:")
+            self.indent += 1
+            self.gen_body([loop.stmt])
+            self.gen_stmt(loop.final_stmt)
+            self.indent -= 1
+            return
+
+        if stmt.type == Statement.FUNCTION:
+            self.gen_function(cast(stmt))
+            return
+
+        if stmt.type == Statement.RETURN:
+            if not cast(stmt).in_function:
+                self.emit(f"raise {self.constant(stmt)}")
+                return
+            self.emit(f"return {self.gen_expr(stmt.expr)}")
+            return
+
+        if stmt.type == Statement.STOP:
+            if not cast(stmt).in_loop:
+                self.emit(f"raise {self.constant(stmt)}")
+                return
+            self.emit("break")
+            return
+
+        if stmt.type == Statement.SKIP:
+            if not cast(stmt).in_loop:
+                self.emit(f"raise {self.constant(stmt)}")
+                return
+            self.emit("continue")
+            return
+
+        raise TranspileError(f"unimplemented statement type '{stmt.type}'")
+
+    def gen_function(self, func: Function):
+        name = f"_f{len(self.function_names)}_{func.name}"
+        self.function_names[id(func)] = name
+
+        saved = (self.lines, self.source_map, self.indent, self.stack, self.envs)
+        self.lines, self.source_map, self.indent, self.stack, self.envs = [], [], 0, [], ["env"]
+
+        params = [self.local_name(func.scope, param) for param in func.params]
+        self.emit(f"def {name}({', '.join(['env'] + params)}):")
+        self.indent += 1
+        self.enter_scope(func.scope, func.params)
+        for param in func.params:
+            if param in self.free_names:
+                self.emit(f"{self.env_name(func.scope)}.values[{func.scope.slots[param]}] = "
+                          f"{self.local_name(func.scope, param)}")
+        for stmt in func.body.stmts:
+            self.gen_stmt(stmt)
+        self.emit("return None")
+        self.exit_scope()
+        self.indent = 0
+        self.emit(f"{self.constant(func)}_fn = _PyFunction({self.constant(func)}, {name})")
+
+        self.function_lines += self.lines
+        self.function_map += self.source_map
+        self.lines, self.source_map, self.indent, self.stack, self.envs = saved
+
+        self.emit(f"_declare_function({self.constant(func)}, {self.constant(func)}_fn)")
+
+    def gen_var_decl(self, stmt: VarDecl):
+        value = self.gen_expr(stmt.expr)
+        node = self.constant(stmt)
+
+        if stmt.slot is None:
+            self.emit(f"_declare_global({self.envs[-1]}, {stmt.name!r}, {value}, {node})")
+            return
+
+        scope = self.stack[-1]
+        if stmt.name in self.free_names:
+            target = f"{self.env_name(scope)}.values[{stmt.slot}]"
+        else:
+            target = self.local_name(scope, stmt.name)
+            if (self.scope_index(scope), stmt.name) not in self.needs_check:
+                self.emit(f"{target} = {value}")
+                return
+
+        temp = self.temp()
+        self.emit(f"{temp} = {value}")
+        self.emit(f"if {target} is not _U: _redeclared({node})")
+        self.emit(f"{target} = {temp}")
+
+    # the python for a variable in a scope, and whether it is a local that is always set
+    def storage(self, scope: Scope, slot, name):
+        if name in self.free_names:
+            return f"{self.env_name(scope)}.values[{slot}]"
+        return self.local_name(scope, name)
+
+    # every scope, innermost first, that could hold the variable a node refers to. scopes in the environment chain
+    # are covered by the lookup by name, so only the first of those is needed
+    def candidates(self, node, name):
+        if node.slot is None:
+            return []
+        scopes = [scope for scope in self.stack[:len(self.stack) - node.depth][::-1] if name in scope.slots]
+        if name in self.free_names:
+            return scopes[:1]
+        return scopes
+
+    def gen_read(self, node, name):
+        candidates = self.candidates(node, name)
+        if len(candidates) > 0 and id(node) in self.dominated:
+            return self.storage(candidates[0], candidates[0].slots[name], name)
+
+        code = f"_get({self.envs[-1]}, {name!r}, {self.constant(node)})"
+        for scope in reversed(candidates):
+            target = self.storage(scope, scope.slots[name], name)
+            if name in self.free_names:
+                temp = self.temp()
+                code = f"({temp} if ({temp} := {target}) is not _U else {code})"
+            else:
+                code = f"({target} if {target} is not _U else {code})"
+        return code
+
+    def gen_write(self, node, name, value):
+        candidates = self.candidates(node, name)
+        if len(candidates) > 0 and id(node) in self.dominated:
+            self.emit(f"{self.storage(candidates[0], candidates[0].slots[name], name)} = {value}")
+            return
+
+        temp = self.temp()
+        self.emit(f"{temp} = {value}")
+        keyword = "if"
+        for scope in candidates:
+            target = self.storage(scope, scope.slots[name], name)
+            self.emit(f"{keyword} {target} is not _U: {target} = {temp}")
+            keyword = "elif"
+        fallback = f"_set({self.envs[-1]}, {name!r}, {temp}, {self.constant(node)})"
+        if keyword == "if":
+            self.emit(fallback)
+        else:
+            self.emit(f"else: {fallback}")
+
+    def gen_list_set(self, stmt: ListSet):
+        node = self.constant(stmt)
+        lst = self.temp()
+        index = self.temp()
+
+        self.emit(f"{lst} = {self.gen_expr(stmt.lst)}")
+        self.emit(f"if type({lst}) is not list and type({lst}) is not _SILString and type({lst}) is not dict: "
+                  f"_not_settable({node}, {lst})")
+        self.emit(f"{index} = {self.gen_expr(stmt.index_expr)}")
+        # maps keep their keys as they are
+        self.emit(f"if type({index}) is not int or type({lst}) is dict or {index} >= len({lst}): "
+                  f"{index} = _set_index({node}, {lst}, {index})")
+        value = self.gen_expr(stmt.expr)
+        self.emit(f"if type({lst}) is list: {lst}[{index}] = {value}")
+        self.emit(f"else: _store({node}, {lst}, {index}, {value})")
+
+    # python for an expression used as a condition. comparisons always give a boolean, everything else is checked
+    def gen_condition(self, expr: Expression):
+        if expr.type == Expression.LITERAL and type(expr.lvalue) is bool:
+            return repr(expr.lvalue)
+
+        if expr.type == Expression.BINARY_EXPRESSION and expr.op in ("==", "!=", "<", "<=", ">", ">=", "and", "or"):
+            return self.gen_expr(expr)
+
+        if expr.type == Expression.UNARY and expr.op == "!":
+            return self.gen_expr(expr)
+
+        return f"_to_bool({self.gen_expr(expr)})"
+
+    # python that is safe to evaluate more than once, or None if the expression needs a temporary. string literals
+    # are given as they are, so this is only for operands, which aren't changed
+    def gen_simple(self, expr: Expression):
+        # python has no literal for infinity, so those floats are constants like strings
+        if expr.type == Expression.LITERAL and type(expr.lvalue) in (int, float, bool, type(None)) and \
+                (type(expr.lvalue) is not float or math.isfinite(expr.lvalue)):
+            return repr(expr.lvalue)
+
+        if expr.type == Expression.LITERAL:
+            return self.constant(expr.lvalue)
+
+        if expr.type == Expression.VARIABLE and id(expr) in self.dominated and expr.lvalue not in self.free_names:
+            return self.gen_read(expr, expr.lvalue)
+
+        return None
+
+    def gen_expr(self, expr: Expression) -> str:
+        # strings can be changed in place, so each evaluation gets its own
+        if expr.type == Expression.LITERAL and type(expr.lvalue) is SILString:
+            return f"{self.constant(expr.lvalue)}.copy()"
+
+        simple = self.gen_simple(expr)
+        if simple is not None:
+            return simple
+
+        if expr.type == Expression.LIST_LITERAL:
+            if expr.values is not None:
+                return f"{self.constant(expr.values)}.copy()"
+            return "[" + ", ".join(self.gen_expr(item) for item in expr.lvalue) + "]"
+
+        if expr.type == Expression.MAP_LITERAL:
+            items = []
+            for key, value in zip(expr.lvalue, expr.rvalue):
+                items.append(self.gen_expr(key))
+                items.append(self.gen_expr(value))
+            return f"_build_map({self.constant(expr)}, [{', '.join(items)}])"
+
+        if expr.type == Expression.VARIABLE:
+            return self.gen_read(expr, expr.lvalue)
+
+        if expr.type == Expression.BINARY_EXPRESSION:
+            return self.gen_binary(cast(expr))
+
+        if expr.type == Expression.LIST_ACCESS:
+            node = self.constant(expr)
+            lst, index = self.temp(), self.temp()
+            return (f"({lst}[{index}] if ((type({lst} := {self.gen_expr(expr.lvalue)}) is list or "
+                    f"_indexable({node}, {lst})) & (type({index} := {self.gen_expr(expr.rvalue)}) is int)) and "
+                    f"{index} < len({lst}) else _index({node}, {lst}, {index}))")
+
+        if expr.type == Expression.CALL:
+            return self.gen_call(cast(expr))
+
+        if expr.type == Expression.UNARY:
+            if expr.op == "-":
+                value = self.temp()
+                return (f"(-{value} if type({value} := {self.gen_expr(expr.lvalue)}) in _numbers else "
+                        f"_invert({self.constant(expr)}))")
+            return f"(not _to_bool({self.gen_expr(expr.lvalue)}))"
+
+        if expr.type == Expression.INPUT:
+            return f"_input({self.constant(expr)}, {self.gen_expr(expr.lvalue)})"
+
+        raise TranspileError(f"unimplemented expression type '{expr.type}'")
+
+    def gen_call(self, expr: Call):
+        node = self.constant(expr)
+        callee = self.temp()
+        env = self.envs[-1]
+
+        # the callee is checked before the arguments are evaluated, unless it is a silang function that fits
+        fits = (f"type({callee} := {self.gen_expr(expr.callee)}) is _PyFunction and "
+                f"{callee}.param_count == {len(expr.args)}")
+        if not any(self.has_call(arg) for arg in expr.args):
+            args = ", ".join(self.gen_expr(arg) for arg in expr.args)
+            return (f"({callee}.fn({env}{', ' if args else ''}{args}) if {fits} "
+                    f"else (_check_call({node}, {callee}, {env}), {callee}.call(_w, [{args}], {node}))[1])")
+
+        # arguments with calls in them are only written once, into temps both calls use, or every level of nested
+        # calls would double the code
+        checked = self.temp()
+        parts = [f"({checked} := {fits}) or _check_call({node}, {callee}, {env})"]
+        args = []
+        for arg in expr.args:
+            args.append(self.temp())
+            parts.append(f"({args[-1]} := {self.gen_expr(arg)})")
+
+        args = ", ".join(args)
+        parts.append(f"{callee}.fn({env}, {args}) if {checked} else {callee}.call(_w, [{args}], {node})")
+        return f"({', '.join(parts)})[-1]"
+
+    def has_call(self, expr: Expression):
+        if expr is None or expr.type == Expression.LITERAL or expr.type == Expression.VARIABLE:
+            return False
+        if expr.type == Expression.CALL:
+            return True
+        if expr.type == Expression.LIST_LITERAL:
+            return any(self.has_call(item) for item in expr.lvalue)
+        if expr.type == Expression.MAP_LITERAL:
+            return any(self.has_call(item) for item in expr.lvalue + expr.rvalue)
+        return self.has_call(expr.lvalue) or expr.type in (Expression.BINARY_EXPRESSION, Expression.LIST_ACCESS) and \
+            self.has_call(expr.rvalue)
+
+    # operators only read their operands, so string literals are used as they are instead of copied
+    def gen_operand(self, expr: Expression):
+        simple = self.gen_simple(expr)
+        return simple if simple is not None else self.gen_expr(expr)
+
+    def gen_binary(self, expr: BinaryExpression):
+        if expr.op == "and" or expr.op == "or":
+            left_true = f"_to_bool({self.gen_operand(expr.lvalue)})"
+            right_true = f"_to_bool({self.gen_operand(expr.rvalue)})"
+            if expr.op == "and":
+                return f"({right_true} if {left_true} else False)"
+            return f"(True if {left_true} else {right_true})"
+
+        if expr.op == "==" or expr.op == "!=":
+            return f"({self.gen_operand(expr.lvalue)} {expr.op} {self.gen_operand(expr.rvalue)})"
+
+        node = self.constant(expr)
+        op = expr.op
+
+        # two numbers are worked out now, unless that would be an error
+        if expr.lvalue.type == Expression.LITERAL and type(expr.lvalue.lvalue) in number_types and \
+                expr.rvalue.type == Expression.LITERAL and type(expr.rvalue.lvalue) in number_types:
+            try:
+                value = number_operators[op](expr.lvalue.lvalue, expr.rvalue.lvalue)
+                if type(value) is not float or math.isfinite(value):
+                    return repr(value)
+            except ArithmeticError:
+                pass
+
+        left = self.gen_simple(expr.lvalue)
+        right = self.gen_simple(expr.rvalue)
+        checks = []
+        if left is None:
+            left = self.temp()
+            checks.append(f"(type({left} := {self.gen_expr(expr.lvalue)}) in _numbers)")
+        else:
+            checks.append(f"(type({left}) in _numbers)")
+        if right is None:
+            right = self.temp()
+            checks.append(f"(type({right} := {self.gen_expr(expr.rvalue)}) in _numbers)")
+        elif expr.rvalue.type != Expression.LITERAL or type(expr.rvalue.lvalue) not in number_types:
+            checks.append(f"(type({right}) in _numbers)")
+
+        # ints only stay ints when they divide exactly
+        result = f"_divide({left}, {right})" if op == "/" else f"{left} {op} {right}"
+        return f"({result} if {' & '.join(checks)} else _binary({node}, {left}, {right}))"
+
+
+# runs a program by compiling it to python. programs using something the transpiler doesn't support are run by
+# the closure engine instead
+class PythonEngine(ClosureEngine):
+    # the transpiler and code of the programs run most recently, by the id of their statements, so a program run
+    # again doesn't have to be transpiled again. the statements are kept too, so their id can't be reused
+    compiled = {}
+    compiled_limit = 32
+    compiled_lock = threading.Lock()
+
+    def run(self, stmts):
+        transpiled = self.transpile(stmts)
+        if transpiled is None:
+            ClosureEngine.run(self, stmts)
+            return
+
+        transpiler, code = transpiled
+        self.transpiler = transpiler
+        self.filename = code.co_filename
+
+        namespace = self.namespace(transpiler)
+        exec(code, namespace)
+        self.run_guarded(self.run_main, namespace["_main"])
+
+    # the transpiler and compiled code of a program, or None if it can't be transpiled
+    def transpile(self, stmts):
+        with PythonEngine.compiled_lock:
+            entry = PythonEngine.compiled.get(id(stmts))
+        if entry is not None and entry[0] is stmts:
+            return entry[1]
+
+        path = stmts[0].file if len(stmts) > 0 and hasattr(stmts[0], "file") else "<silang>"
+        transpiler = Transpiler(path)
+        try:
+            source = transpiler.transpile(stmts)
+            transpiled = (transpiler, compile(source, f"<transpiled {path}>", "exec"))
+        except (TranspileError, SyntaxError, RecursionError, MemoryError):
+            transpiled = None
+
+        with PythonEngine.compiled_lock:
+            compiled = PythonEngine.compiled
+            compiled.pop(id(stmts), None)
+            compiled[id(stmts)] = (stmts, transpiled)
+            # the oldest are dropped first
+            while len(compiled) > PythonEngine.compiled_limit:
+                del compiled[next(iter(compiled))]
+        return transpiled
+
+    # errors from python itself are traced back to the silang statement that caused them
+    def run_main(self, main):
+        try:
+            main(self.global_env)
+        except (ExceptionStatment, RecursionError, SilangError, SilangExit):
+            raise
+        except Exception as e:
+            stmt = self.statement_at(e.__traceback__)
+            if stmt is None:
+                raise
+            Error.report_packet(f"Unknown error: {e}", stmt)
+            raise Error.failure()
+
+    def statement_at(self, traceback):
+        stmt = None
+        while traceback is not None:
+            if traceback.tb_frame.f_code.co_filename == self.filename:
+                node = self.transpiler.node_at(traceback.tb_lineno)
+                if node is not None and hasattr(node, "line"):
+                    stmt = node
+            traceback = traceback.tb_next
+        return stmt
+
+    def profile_node(self, frame):
+        if frame.f_code.co_filename != getattr(self, "filename", None):
+            return ClosureEngine.profile_node(self, frame)
+        return self.transpiler.node_at(frame.f_lineno)
+
+    # everything the generated code can use
+    def namespace(self, transpiler: Transpiler):
+        return {
+            "_constants": transpiler.constants,
+            "_w": self,
+            "_U": UNDEFINED,
+            "_SlotEnvironment": SlotEnvironment,
+            "_SILString": SILString,
+            "_numbers": number_types,
+            "_to_bool": to_bool,
+            "_divide": divide,
+            "_PyFunction": PyFunction,
+            "_get_value": Parser.get_value,
+            "_get": self.get_by_name,
+            "_set": self.set_by_name,
+            "_declare_global": self.declare_global,
+            "_declare_function": self.declare_function,
+            "_redeclared": self.report_redeclared,
+            "_binary": self.eval_binary,
+            "_invert": self.report_invert,
+            "_input": self.eval_input,
+            "_indexable": self.check_indexable,
+            "_index": self.index_list,
+            "_not_settable": self.report_not_settable,
+            "_set_index": self.list_set_index,
+            "_store": self.store_item,
+            "_build_map": self.build_map,
+            "_check_call": self.check_python_call,
+        }
+
+    def declare_global(self, env, name, value, node):
+        try:
+            env.declare_var(name, value)
+        except VarException:
+            self.report_redeclared(node)
+
+    # maps are indexed by index_list, which the generated code only uses when this is false
+    def check_indexable(self, expr: ListAccess, lst):
+        if type(lst) is dict:
+            return False
+        if type(lst) is not SILString:
+            self.report_not_indexable(expr, lst)
+        return True
+
+    def check_python_call(self, expr: Call, callee, env):
+        self.check_call(expr, callee)
+        self.env = env
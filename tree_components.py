@@ -7,52 +7,127 @@ class SILStringNotChar(Exception):
     pass
 
 
+# pieces of a string being built with '+'. pieces are only ever added, so every string made from the same builder
+# still sees the same characters, and the newest string at either end can be extended in place
+class StringBuilder:
+    def __init__(self, front, back):
+        # pieces added to the start are stored last one first
+        self.front = front
+        self.back = back
+
+
+# strings are kept as an immutable str until they are changed in place. the first change copies the characters into
+# a list, which is then used for every change after it, and joined back into a str only when it is read again.
+# long strings made with '+' share a builder instead, so building a string a piece at a time is linear
 class SILString:
+    # strings shorter than this are just joined
+    BUILD_LENGTH = 64
+
     def __init__(self, string):
-        self.string = list(string)
+        self.value = string if type(string) is str else ''.join(string)
+        self.buffer = None
+        self.hash = None
+        self.builder = None
+
+    @staticmethod
+    def built(builder: StringBuilder, front, back, length):
+        string = SILString("")
+        string.value = None
+        string.builder = builder
+        string.front = front
+        string.back = back
+        string.length = length
+        return string
 
     def is_not_char(self, item):
         return type(item) is not SILString or len(item) != 1
 
     def get_string(self):
-        return ''.join(self.string)
+        if self.value is None:
+            if self.buffer is not None:
+                self.value = ''.join(self.buffer)
+            else:
+                builder = self.builder
+                self.value = ''.join(builder.front[self.front - 1::-1] if self.front else ()) + \
+                    ''.join(builder.back[:self.back])
+        return self.value
+
+    # the list of characters to change in place. the str it came from, and its hash, are out of date afterwards
+    def get_buffer(self):
+        if self.buffer is None:
+            self.buffer = list(self.get_string())
+            self.builder = None
+        self.value = None
+        self.hash = None
+        return self.buffer
 
     def __getitem__(self, index):
-        return SILString(self.string[index])
+        if self.buffer is None:
+            return SILString(self.get_string()[index])
+        return SILString(self.buffer[index])
 
     def __setitem__(self, index, item):
         if self.is_not_char(item):
             raise SILStringNotChar()
 
-        self.string[index] = item.get_string()
+        self.get_buffer()[index] = item.get_string()
 
     def __len__(self):
-        return len(self.string)
+        if self.buffer is not None:
+            return len(self.buffer)
+        if self.builder is not None:
+            return self.length
+        return len(self.value)
 
     def __add__(self, b):
-        return SILString(self.get_string() + b.get_string())
+        builder = self.builder
+        if builder is not None and len(builder.back) == self.back:
+            added = b.get_string()
+            builder.back.append(added)
+            return SILString.built(builder, self.front, self.back + 1, self.length + len(added))
+
+        builder = b.builder
+        if builder is not None and len(builder.front) == b.front:
+            added = self.get_string()
+            builder.front.append(added)
+            return SILString.built(builder, b.front + 1, b.back, b.length + len(added))
+
+        length = len(self) + len(b)
+        if length < SILString.BUILD_LENGTH:
+            return SILString(self.get_string() + b.get_string())
+        return SILString.built(StringBuilder([], [self.get_string(), b.get_string()]), 0, 2, length)
 
     def __eq__(self, b):
-        return self.get_string() == b.get_string()
+        return self is b or self.get_string() == b.get_string()
+
+    def __hash__(self):
+        if self.hash is None:
+            self.hash = hash(self.get_string())
+        return self.hash
 
     def append(self, item):
         if self.is_not_char(item):
             raise SILStringNotChar()
 
-        self.string.append(item.get_string())
+        self.get_buffer().append(item.get_string())
 
     def pop(self, index):
-        return SILString(self.string.pop(index))
+        return SILString(self.get_buffer().pop(index))
+
+    def copy(self):
+        return SILString(self.get_string())
 
 
 class Expression(ErrorPacket):
     LITERAL = "lit"
+    LIST_LITERAL = "list_lit"
     UNARY = "unary"
     BINARY_EXPRESSION = "bin_exp"
     VARIABLE = "var"
     INPUT = "input"
     CALL = "call"
     LIST_ACCESS = "list_access"
+    MAP_LITERAL = "map_lit"
 
     def __init__(self, t, lvalue, rvalue, op):
         self.type = t
@@ -61,11 +136,40 @@ class Expression(ErrorPacket):
         self.op = op
 
 
-class Literal(Expression):
+# a number, string, boolean or novalue written in the code. strings can be changed in place, so every evaluation
+# of a string literal gives a copy of it, and the literal itself is never changed
+class ConstLiteral(Expression):
     def __init__(self, value):
         Expression.__init__(self, Expression.LITERAL, value, None, None)
 
 
+# values that can't be changed in place
+immutable_types = frozenset((int, float, bool, type(None)))
+
+
+# every evaluation of a list literal makes a new list. when its items are all literals that can't be changed in
+# place, their values are kept, and the new list is just a copy of them
+class ListLiteral(Expression):
+    def __init__(self, items):
+        Expression.__init__(self, Expression.LIST_LITERAL, items, None, None)
+        self.values = None
+        self.find_values()
+
+    # the optimizer calls this again once it has folded the items
+    def find_values(self):
+        if all(item is not None and item.type == Expression.LITERAL and type(item.lvalue) in immutable_types
+               for item in self.lvalue):
+            self.values = [item.lvalue for item in self.lvalue]
+        else:
+            self.values = None
+
+
+# a map literal's keys and values are kept in two lists, in the order they are written
+class MapLiteral(Expression):
+    def __init__(self, keys, values):
+        Expression.__init__(self, Expression.MAP_LITERAL, keys, values, None)
+
+
 class Call(Expression):
     def __init__(self, callee, args):
         Expression.__init__(self, Expression.CALL, None, None, None)
@@ -77,6 +181,10 @@ class Variable(Expression):
     def __init__(self, name):
         Expression.__init__(self, Expression.VARIABLE, name, None, None)
 
+        # set by the resolver. a slot of None means the variable is looked up by name
+        self.depth = None
+        self.slot = None
+
 
 class ListAccess(Expression):
     def __init__(self, lst, index_expr):
@@ -88,9 +196,98 @@ class Unary(Expression):
         Expression.__init__(self, Expression.UNARY, value, None, unary_op)
 
 
+# numbers are ints while they are whole, so they never lose precision, and floats once they have a '.' or come from a
+# division that doesn't divide evenly. both are silang numbers, and can be mixed freely
+number_types = frozenset((int, float))
+
+
+def divide(lvalue, rvalue):
+    if type(lvalue) is int and type(rvalue) is int:
+        if rvalue == 0:
+            # the same error as dividing floats
+            raise ZeroDivisionError("float division by zero")
+        if lvalue % rvalue == 0:
+            return lvalue // rvalue
+    return lvalue / rvalue
+
+
+# implementations of the binary operators, which get bound to a binary expression when it is created.
+# they handle numbers themselves, and leave type checking and errors to the tree walker
+def op_add(tree_walker, expr, lvalue, rvalue):
+    if type(lvalue) in number_types and type(rvalue) in number_types:
+        return lvalue + rvalue
+    return tree_walker.eval_binary(expr, lvalue, rvalue)
+
+
+def op_subtract(tree_walker, expr, lvalue, rvalue):
+    if type(lvalue) in number_types and type(rvalue) in number_types:
+        return lvalue - rvalue
+    return tree_walker.eval_binary(expr, lvalue, rvalue)
+
+
+def op_multiply(tree_walker, expr, lvalue, rvalue):
+    if type(lvalue) in number_types and type(rvalue) in number_types:
+        return lvalue * rvalue
+    return tree_walker.eval_binary(expr, lvalue, rvalue)
+
+
+def op_divide(tree_walker, expr, lvalue, rvalue):
+    if type(lvalue) in number_types and type(rvalue) in number_types:
+        return divide(lvalue, rvalue)
+    return tree_walker.eval_binary(expr, lvalue, rvalue)
+
+
+def op_less(tree_walker, expr, lvalue, rvalue):
+    if type(lvalue) in number_types and type(rvalue) in number_types:
+        return lvalue < rvalue
+    return tree_walker.eval_binary(expr, lvalue, rvalue)
+
+
+def op_less_equal(tree_walker, expr, lvalue, rvalue):
+    if type(lvalue) in number_types and type(rvalue) in number_types:
+        return lvalue <= rvalue
+    return tree_walker.eval_binary(expr, lvalue, rvalue)
+
+
+def op_greater(tree_walker, expr, lvalue, rvalue):
+    if type(lvalue) in number_types and type(rvalue) in number_types:
+        return lvalue > rvalue
+    return tree_walker.eval_binary(expr, lvalue, rvalue)
+
+
+def op_greater_equal(tree_walker, expr, lvalue, rvalue):
+    if type(lvalue) in number_types and type(rvalue) in number_types:
+        return lvalue >= rvalue
+    return tree_walker.eval_binary(expr, lvalue, rvalue)
+
+
+def op_equal(tree_walker, expr, lvalue, rvalue):
+    return lvalue == rvalue
+
+
+def op_not_equal(tree_walker, expr, lvalue, rvalue):
+    return lvalue != rvalue
+
+
+# 'and' and 'or' short-circuit, so they don't have an implementation here
+binary_operators = {
+    "+": op_add,
+    "-": op_subtract,
+    "*": op_multiply,
+    "/": op_divide,
+    "<": op_less,
+    "<=": op_less_equal,
+    ">": op_greater,
+    ">=": op_greater_equal,
+    "==": op_equal,
+    "!=": op_not_equal,
+}
+
+
 class BinaryExpression(Expression):
     def __init__(self, lvalue, rvalue, op):
         Expression.__init__(self, Expression.BINARY_EXPRESSION, lvalue, rvalue, op)
+        self.operator = binary_operators.get(op)
 
 
 class Input(Expression):
@@ -124,6 +321,8 @@ class If(Statement):
         self.elseStmt = elseStmt
 
 
+# these are only raised when they are used in the wrong place, otherwise they change control flow by
+# the signal interpret returns. the resolver works out which ones are in the right place
 class ExceptionStatment(Statement, Exception):
     pass
 
@@ -131,16 +330,31 @@ class ExceptionStatment(Statement, Exception):
 class Return(ExceptionStatment):
     def __init__(self, expr: Expression):
         Statement.__init__(self, Statement.RETURN, expr)
+        self.in_function = False
 
 
 class Stop(ExceptionStatment):
     def __init__(self):
         Statement.__init__(self, Statement.STOP, None)
+        self.in_loop = False
 
 
 class Skip(ExceptionStatment):
     def __init__(self):
         Statement.__init__(self, Statement.SKIP, None)
+        self.in_loop = False
+
+
+# whether a value counts as true in a condition. only false and novalue don't, every engine and the optimizer use
+# this so they all agree
+def to_bool(value):
+    return value is not False and value is not None
+
+
+# a loop condition which is a literal that is always true, like the one a for loop without a condition is given.
+# loops don't evaluate these every time around
+def always_true(expr: Expression):
+    return expr.type == Expression.LITERAL and to_bool(expr.lvalue)
 
 
 class While(Statement):
@@ -154,6 +368,7 @@ class Block(Statement):
     def __init__(self, stmts):
         self.type = Statement.BLOCK
         self.stmts = stmts
+        self.scope = None
 
 
 class Function(Statement):
@@ -163,6 +378,7 @@ class Function(Statement):
         self.params = params
         self.body = body
         self.param_count = len(params)
+        self.scope = None
 
 
 class VarDecl(Statement):
@@ -170,11 +386,16 @@ class VarDecl(Statement):
         Statement.__init__(self, Statement.VAR_DECL, expr)
         self.name = name
 
+        # set by the resolver. a slot of None means the variable is global
+        self.slot = None
+
 
 class VarSet(Statement):
     def __init__(self, name, expr):
         Statement.__init__(self, Statement.VAR_SET, expr)
         self.name = name
+        self.depth = None
+        self.slot = None
 
 
 class ListSet(Statement):
@@ -196,15 +417,12 @@ class FunctionCallable(Callable):
         self.name = func.name
 
     def call(self, tree_walker, args: list[Expression], call: Call):
-        env = Environment(tree_walker.env)
+        env = SlotEnvironment(self.func.scope, tree_walker.env)
         for i, param in enumerate(self.func.params):
             env.declare_var(param, args[i])
 
-        try:
-            tree_walker.interpret_block(self.func.body, env)
-        except Return as ret:
-            return_value = tree_walker.eval_expr(ret.expr)
-            tree_walker.env = env.parent
-            return return_value
+        if tree_walker.interpret_block(self.func.body, env):
+            # stop and skip can't leave a function, so this has to be a return
+            return tree_walker.return_value
 
         return None
@@ -4,17 +4,71 @@ from _parser import *
 from environment import *
 from baselib import *
 from typing import Any
+import random
+import sys
 
 
 def cast(x: Any):
     return x
 
 
+# what interpret returns when a statement changes control flow
+class Signal:
+    STOP = 1
+    SKIP = 2
+    RETURN = 3
+
+
 class TreeWalker:
+    # whether functions from the standard library are replaced by native versions
+    natives = True
+
+    # the command line arguments arg() reads, with the file being run at 1
+    argv = sys.argv
+
+    # set while the program is being profiled
+    profiler = None
+
+    # makes the strings a program creates while it runs, so an engine can keep track of them
+    new_string = SILString
+
+    # where print writes and input reads, when they aren't sys.stdout and sys.stdin
+    stdout = None
+    stdin = None
 
     def __init__(self):
         Error.stage = "Runtime"
         self.env = Environment()
+        self.return_value = None
+        # what rng and seed use, so programs running at the same time don't reseed each other
+        self.random = random.Random()
+
+        # every node is dispatched straight to its handler by its type
+        self.stmt_handlers = {
+            Statement.PRINT: self.interpret_print,
+            Statement.FLAT: self.interpret_flat,
+            Statement.VAR_DECL: self.interpret_var_dec,
+            Statement.VAR_SET: self.interpret_var_set,
+            Statement.BLOCK: self.interpret_block,
+            Statement.IF: self.interpret_if,
+            Statement.WHILE: self.interpret_while,
+            Statement.FUNCTION: self.interpret_function,
+            Statement.RETURN: self.interpret_return,
+            Statement.STOP: self.interpret_stop,
+            Statement.SKIP: self.interpret_skip,
+            Statement.LIST_SET: self.interpret_list_set,
+        }
+        self.expr_handlers = {
+            Expression.LITERAL: self.eval_literal,
+            Expression.LIST_LITERAL: self.eval_list_literal,
+            Expression.VARIABLE: self.eval_variable,
+            Expression.BINARY_EXPRESSION: self.eval_binary_expression,
+            Expression.UNARY: self.eval_unary,
+            Expression.LIST_ACCESS: self.eval_list_access,
+            Expression.MAP_LITERAL: self.eval_map_literal,
+            Expression.CALL: self.interpret_call,
+            Expression.INPUT: self.eval_input_expression,
+        }
         self.global_env = self.env
         # setup std lib
         for name in Base.funs:
@@ -23,184 +77,230 @@ class TreeWalker:
 
     def run(self, stmts):
         for stmt in stmts:
-            try:
-                self.interpret(stmt)
-            except Return as ret:
-                Error.report_packet("Use of 'return' outside of a function", ret)
-                exit(1)
-            except Skip as skip:
-                Error.report_packet("Use of 'skip' outside of a loop", skip)
-                exit(1)
-            except Stop as stop:
-                Error.report_packet("Use of 'stop' outside of a loop", stop)
-                exit(1)
-            except KeyboardInterrupt:
-                Error.report_flat("Program was forcefully stopped")
-                exit(1)
-            except RecursionError:
-                Error.report_flat("Recursion limit reached. idk where bucko")
-                exit(1)
-            except Exception as e:
-                Error.report_flat(f"Unknown error: {e}")
-                exit(1)
+            self.run_guarded(self.interpret, stmt)
 
+    # runs func, reporting anything that escapes it the same way for every engine
+    def run_guarded(self, func, *args):
+        try:
+            return func(*args)
+        except (SilangError, SilangExit):
+            raise
+        except Return as ret:
+            Error.report_packet("Use of 'return' outside of a function", ret)
+            raise Error.failure()
+        except Skip as skip:
+            Error.report_packet("Use of 'skip' outside of a loop", skip)
+            raise Error.failure()
+        except Stop as stop:
+            Error.report_packet("Use of 'stop' outside of a loop", stop)
+            raise Error.failure()
+        except KeyboardInterrupt:
+            Error.report_flat("Program was forcefully stopped")
+            raise Error.failure()
+        except RecursionError:
+            Error.report_flat("Recursion limit reached. idk where bucko")
+            raise Error.failure()
+        except Exception as e:
+            Error.report_flat(f"Unknown error: {e}")
+            raise Error.failure()
+
+    # returns one of the signals when the statement stops, skips or returns, otherwise None
     def interpret(self, stmt: Statement):
-        if stmt.type == Statement.PRINT:
-            self.interpret_print(stmt)
-            return
-
-        if stmt.type == Statement.VAR_DECL:
-            self.interpret_var_dec(cast(stmt))
-            return
-
-        if stmt.type == Statement.IF:
-            self.interpret_if(cast(stmt))
-            return
-
-        if stmt.type == Statement.VAR_SET:
-            self.interpret_var_set(cast(stmt))
-            return
-
-        if stmt.type == Statement.LIST_SET:
-            self.interpret_list_set(cast(stmt))
-            return
-
-        if stmt.type == Statement.RETURN:
-            self.interpret_return(cast(stmt))
-            return
-
-        if stmt.type == Statement.STOP:
-            self.interpret_stop(cast(stmt))
-            return
-
-        if stmt.type == Statement.SKIP:
-            self.interpret_skip(cast(stmt))
-            return
+        return self.stmt_handlers[stmt.type](stmt)
 
-        if stmt.type == Statement.BLOCK:
-            self.interpret_block(cast(stmt))
-            return
-
-        if stmt.type == Statement.WHILE:
-            self.interpret_while(cast(stmt))
-            return
-
-        if stmt.type == Statement.FUNCTION:
-            self.interpret_function(cast(stmt))
-            return
-
-        if stmt.type == Statement.FLAT:
-            return self.eval_expr(stmt.expr)
-
-        Error.report_packet(f"Unimplemented statement type '{stmt}'", stmt)
-        exit(1)
+    def interpret_flat(self, stmt: Statement):
+        self.eval_expr(stmt.expr)
 
     def interpret_print(self, stmt: Statement):
         value = self.eval_expr(stmt.expr)
-        print(Parser.get_value(value), end="")
+        print(Parser.get_value(value), end="", file=self.stdout)
 
+    # empty statements, like the ones the optimizer leaves behind, do nothing
     def interpret_if(self, stmt: If):
         value = self.eval_expr(stmt.expr)
         if self.to_bool(value):
-            self.interpret(stmt.stmt)
+            if stmt.stmt is not None:
+                return self.interpret(stmt.stmt)
         else:
             if stmt.elseStmt is not None:
-                self.interpret(stmt.elseStmt)
+                return self.interpret(stmt.elseStmt)
 
     def interpret_return(self, stmt: Return):
-        raise stmt
+        if not stmt.in_function:
+            raise stmt
+
+        self.return_value = self.eval_expr(stmt.expr)
+        return Signal.RETURN
 
     def interpret_stop(self, stmt: Stop):
-        raise stmt
+        if not stmt.in_loop:
+            raise stmt
+
+        return Signal.STOP
 
     def interpret_skip(self, stmt: Skip):
-        raise stmt
+        if not stmt.in_loop:
+            raise stmt
+
+        return Signal.SKIP
 
-    def interpret_block(self, stmt: Block, env: Environment | None = None):
+    def interpret_block(self, stmt: Block, env: SlotEnvironment | None = None):
         if env is None:
-            env = Environment(self.env)
+            env = SlotEnvironment(stmt.scope, self.env)
         self.env = env
 
-        error = None
+        handlers = self.stmt_handlers
+        signal = None
         for substmt in stmt.stmts:
-            try:
-                self.interpret(substmt)
-            except Stop as stop:
-                error = stop
+            signal = handlers[substmt.type](substmt)
+            if signal:
                 break
 
-        # we catch and raise the error again, to keep the scopes correct
-        self.env = self.env.parent
-        if error is not None:
-            raise error
+        self.env = env.parent
+        return signal
 
     def interpret_while(self, stmt: While):
-        while self.to_bool(self.eval_expr(stmt.expr)):
-            try:
-                self.interpret(stmt.stmt)
-            except Skip:
-                pass
-            except Stop:
-                break
+        forever = always_true(stmt.expr)
+        while forever or self.to_bool(self.eval_expr(stmt.expr)):
+            signal = self.interpret(stmt.stmt) if stmt.stmt is not None else None
+            if signal:
+                if signal == Signal.STOP:
+                    break
+                if signal == Signal.RETURN:
+                    return signal
+
+            # the final statement of a for loop is outside of the loop, so it can only stop or skip an outer one
             if stmt.final_stmt is not None:
-                self.interpret(stmt.final_stmt)
+                signal = self.interpret(stmt.final_stmt)
+                if signal:
+                    return signal
 
     def interpret_function(self, stmt: Function):
+        self.declare_function(stmt, FunctionCallable(stmt))
+
+    # every engine declares its functions through here, so the standard library can be swapped for native versions
+    def declare_function(self, stmt: Function, compiled: Callable):
+        if self.natives:
+            compiled = Base.native_for(stmt, compiled)
+        if self.profiler is not None:
+            compiled = self.profiler.counted(compiled)
         try:
-            self.global_env.declare_var(stmt.name, FunctionCallable(stmt))
+            self.global_env.declare_var(stmt.name, compiled)
         except(VarException):
-            Error.report_packet(
-                f"Tried to define a function with name '{stmt.name}', but such a variable already exists in the global scope.",
-                stmt)
-            exit(1)
+            self.report_function_exists(stmt)
+
+    # the node a python frame of this engine is running, for the profiler. the handlers and closures that run
+    # nodes all have them as 'stmt' or 'expr'
+    def profile_node(self, frame):
+        code = frame.f_code
+        for name in ("expr", "stmt"):
+            if name in code.co_varnames or name in code.co_freevars:
+                return frame.f_locals.get(name)
+        return None
+
+    def report_function_exists(self, stmt: Function):
+        Error.report_packet(
+            f"Tried to define a function with name '{stmt.name}', but such a variable already exists in the global scope.",
+            stmt)
+        raise Error.failure()
 
     def interpret_var_dec(self, stmt: VarDecl):
         try:
-            # cast here is just to remove error
-            cast(self.env).declare_var(stmt.name, self.eval_expr(stmt.expr))
+            if stmt.slot is None:
+                # cast here is just to remove error
+                cast(self.env).declare_var(stmt.name, self.eval_expr(stmt.expr))
+            else:
+                cast(self.env).declare_slot(stmt.slot, self.eval_expr(stmt.expr))
         except(VarException):
-            Error.report_packet(f"Tried to declare variable '{stmt.name}' that already exists in the current scope",
-                                stmt)
-            exit(1)
+            self.report_redeclared(stmt)
+
+    def report_redeclared(self, stmt: VarDecl):
+        Error.report_packet(f"Tried to declare variable '{stmt.name}' that already exists in the current scope", stmt)
+        raise Error.failure()
 
     def interpret_var_set(self, stmt: VarSet):
         try:
+            value = self.eval_expr(stmt.expr)
+            if stmt.slot is not None:
+                env = self.env
+                depth = stmt.depth
+                while depth:
+                    env = env.parent
+                    depth -= 1
+
+                if env.values[stmt.slot] is not UNDEFINED:
+                    env.values[stmt.slot] = value
+                    return
+
             # cast here is also to remove error
-            cast(self.env).set_var(stmt.name, self.eval_expr(stmt.expr))
+            cast(self.env).set_var(stmt.name, value)
         except(VarException):
-            Error.report_packet(f"Tried to set variable '{stmt.name}' that doesn't exist in the current scope", stmt)
-            exit(1)
+            self.report_unset(stmt)
+
+    def report_unset(self, stmt: VarSet):
+        Error.report_packet(f"Tried to set variable '{stmt.name}' that doesn't exist in the current scope", stmt)
+        raise Error.failure()
+
+    # for the engines that look variables without a slot up themselves
+    def get_by_name(self, env, name, node):
+        try:
+            return env.get_var(name)
+        except VarException:
+            self.report_undefined(node)
+
+    def set_by_name(self, env, name, value, node):
+        try:
+            env.set_var(name, value)
+        except VarException:
+            self.report_unset(node)
 
     def is_list(self, x):
         return type(x) is list or type(x) is SILString
 
+    # lists, strings and maps can all be indexed and have items set
+    def is_indexable(self, x):
+        return type(x) is list or type(x) is SILString or type(x) is dict
+
     def interpret_list_set(self, stmt: ListSet):
         lst = self.eval_expr(stmt.lst)
-        if not self.is_list(lst):
-            Error.report_packet(f"Trying to list set non-list type '{self.type_to_str(type(lst))}'", stmt)
-            exit(1)
-        index = self.eval_expr(stmt.index_expr)
-        if type(index) is not float:
+        if not self.is_indexable(lst):
+            self.report_not_settable(stmt, lst)
+        index = self.list_set_index(stmt, lst, self.eval_expr(stmt.index_expr))
+        self.store_item(stmt, lst, index, self.eval_expr(stmt.expr))
+
+    def report_not_settable(self, stmt: ListSet, lst):
+        Error.report_packet(f"Trying to list set non-list type '{self.type_to_str(type(lst))}'", stmt)
+        raise Error.failure()
+
+    # lst has already been checked to be indexable
+    def list_set_index(self, stmt: ListSet, lst, index):
+        if type(lst) is dict:
+            return self.map_key(stmt.index_expr, index)
+
+        if type(index) not in number_types:
             Error.report_packet(f"Trying to index a list with non-number type '{self.type_to_str(type(index))}'",
                                 stmt.index_expr)
-            exit(1)
+            raise Error.failure()
         index = int(index)
         if index >= len(lst):
             Error.report_packet(
                 f"List index out of bounds. Tried to access item '{index}' from list of size '{len(lst)}'",
                 stmt.index_expr)
-            exit(1)
+            raise Error.failure()
+        return index
+
+    def store_item(self, stmt: ListSet, lst, index, value):
         try:
-            lst[index] = self.eval_expr(stmt.expr)
+            lst[index] = value
         except SILStringNotChar:
             Error.report_packet("Attempt to set character in string to non character", stmt.expr)
-            exit(1)
+            raise Error.failure()
 
     def type_to_str(self, t):
         if t is type(None):
             return "novalue"
 
-        if t is float:
+        if t is float or t is int:
             return "number"
 
         if t is SILString:
@@ -212,10 +312,20 @@ class TreeWalker:
         if t is list:
             return "list"
 
+        if t is dict:
+            return "map"
+
+        if issubclass(t, Callable):
+            return "function"
+
         return str(t)
 
     def interpret_call(self, expr: Call):
         callee = self.eval_expr(expr.callee)
+        self.check_call(expr, callee)
+        return callee.call(self, [self.eval_expr(arg) for arg in expr.args], expr)
+
+    def check_call(self, expr: Call, callee):
         if not issubclass(type(callee), Callable):
             Error.report_packet("Tried to call a non-callable expression", expr)
 
@@ -224,133 +334,210 @@ class TreeWalker:
             Error.report_packet(
                 f"Too many arguments passed to function '{callee.name}'. Expected {callee.param_count} got {arg_count}",
                 expr)
-            exit(1)
+            raise Error.failure()
         elif callee.param_count > arg_count:
             Error.report_packet(
                 f"Too few arguments passed to function '{callee.name}'. Expected {callee.param_count} got {arg_count}",
                 expr)
-            exit(1)
-
-        return callee.call(self, [self.eval_expr(arg) for arg in expr.args], expr)
+            raise Error.failure()
 
-    def to_bool(self, val):
-        return (val == True and type(val) is bool) or (val is not None and type(val) is not bool)
+    to_bool = staticmethod(to_bool)
 
     def eval_expr(self, expr: Expression) -> Any:
-        if expr.type == Expression.LITERAL:
-            if type(expr.lvalue) is list:
-                return [self.eval_expr(item) for item in expr.lvalue]
-            return expr.lvalue
-
-        if expr.type == Expression.LIST_ACCESS:
-            lst = self.eval_expr(expr.lvalue)
-            if not self.is_list(lst):
-                Error.report_packet(f"Tried to index a non-list type {self.type_to_str(type(lst))}", expr)
-                exit(1)
-
-            index = self.eval_expr(expr.rvalue)
-            if type(index) is not float:
-                Error.report_packet(f"Trying to index a list with non-number type '{self.type_to_str(type(index))}'",
-                                    expr.rvalue)
-                exit(1)
-
-            index = int(index)
-            if index >= len(lst):
-                Error.report_packet(
-                    f"List index out of bounds. Tried to access item '{index}' from list of size '{len(lst)}'",
-                    expr.rvalue)
-                exit(1)
-
-            return lst[index]
-
-        if expr.type == Expression.CALL:
-            return self.interpret_call(cast(expr))
-
-        if expr.type == Expression.INPUT:
-            value = self.eval_expr(expr.lvalue)
-            if type(value) is not SILString:
-                Error.report_packet(
-                    f"Tried to use a non-string value '{self.type_to_str(type(value))}' with 'input' expression",
-                    expr.lvalue)
-                exit(1)
-
-            return SILString(input(value.get_string().encode('ascii', errors='replace').decode('ascii')))
-
-        if expr.type == Expression.VARIABLE:
+        return self.expr_handlers[expr.type](expr)
+
+    def eval_literal(self, expr: ConstLiteral):
+        value = expr.lvalue
+        if type(value) is SILString:
+            return self.new_string(value.get_string())
+        return value
+
+    def eval_list_literal(self, expr: ListLiteral):
+        if expr.values is not None:
+            return expr.values.copy()
+        return [self.eval_expr(item) for item in expr.lvalue]
+
+    def eval_variable(self, expr: Variable):
+        if expr.slot is not None:
+            env = self.env
+            depth = expr.depth
+            while depth:
+                env = env.parent
+                depth -= 1
+
+            value = env.values[expr.slot]
+            if value is not UNDEFINED:
+                return value
+
+        # the variable either isn't known until runtime, or hasn't been declared in its scope yet
+        try:
+            return cast(self.env).get_var(expr.lvalue)
+        except(VarException):
+            self.report_undefined(expr)
+
+    def eval_map_literal(self, expr: MapLiteral):
+        items = []
+        for key, value in zip(expr.lvalue, expr.rvalue):
+            items.append(self.eval_expr(key))
+            items.append(self.eval_expr(value))
+        return self.build_map(expr, items)
+
+    # a map from its keys and values, one after the other
+    def build_map(self, expr: MapLiteral, items):
+        keys = expr.lvalue
+        new_map = {}
+        for i in range(0, len(items), 2):
+            new_map[self.map_key(keys[i >> 1], items[i])] = items[i + 1]
+        return new_map
+
+    # maps are dicts, with strings kept as str so changing a string afterwards doesn't change the map
+    def map_key(self, expr: Expression, key):
+        if type(key) is SILString:
+            return key.get_string()
+        if type(key) in number_types:
+            return key
+
+        Error.report_packet(f"Map keys must be strings or numbers, not '{self.type_to_str(type(key))}'", expr)
+        raise Error.failure()
+
+    def eval_list_access(self, expr: ListAccess):
+        lst = self.eval_expr(expr.lvalue)
+        if not self.is_indexable(lst):
+            self.report_not_indexable(expr, lst)
+
+        return self.index_list(expr, lst, self.eval_expr(expr.rvalue))
+
+    def eval_input_expression(self, expr: Input):
+        return self.eval_input(expr, self.eval_expr(expr.lvalue))
+
+    def eval_unary(self, expr: Unary):
+        value = self.eval_expr(expr.lvalue)
+
+        if expr.op == "-":
+            if type(value) not in number_types:
+                self.report_invert(expr)
+            return -value
+
+        return not self.to_bool(value)
+
+    def eval_binary_expression(self, expr: BinaryExpression):
+        # the operator was bound when the expression was parsed
+        if expr.operator is not None:
+            handlers = self.expr_handlers
+            lvalue = expr.lvalue
+            rvalue = expr.rvalue
+            return expr.operator(self, expr, handlers[lvalue.type](lvalue), handlers[rvalue.type](rvalue))
+
+        lvalue = self.eval_expr(expr.lvalue)
+
+        if expr.op == "and":
+            if self.to_bool(lvalue):
+                return self.to_bool(self.eval_expr(expr.rvalue))
+            return False
+
+        if not self.to_bool(lvalue):
+            return self.to_bool(self.eval_expr(expr.rvalue))
+        return True
+
+    def eval_input(self, expr: Input, value):
+        if type(value) is not SILString:
+            Error.report_packet(
+                f"Tried to use a non-string value '{self.type_to_str(type(value))}' with 'input' expression",
+                expr.lvalue)
+            raise Error.failure()
+
+        prompt = value.get_string().encode('ascii', errors='replace').decode('ascii')
+        if self.stdout is None and self.stdin is None:
+            return self.new_string(input(prompt))
+
+        # input() only uses sys.stdout and sys.stdin
+        print(prompt, end="", file=self.stdout, flush=True)
+        line = (self.stdin or sys.stdin).readline()
+        if not line:
+            raise EOFError("EOF when reading a line")
+        return self.new_string(line.removesuffix("\n"))
+
+    def report_undefined(self, expr: Variable):
+        Error.report_packet(f"Tried to get variable '{expr.lvalue}' that doesn't exist in the current scope", expr)
+        raise Error.failure()
+
+    def report_invert(self, expr: Unary):
+        Error.report_packet("Attempt to invert a non numerical value", expr)
+        raise Error.failure()
+
+    def report_not_indexable(self, expr: Expression, lst):
+        Error.report_packet(f"Tried to index a non-list type {self.type_to_str(type(lst))}", expr)
+        raise Error.failure()
+
+    # lst has already been checked to be indexable
+    def index_list(self, expr: Expression, lst, index):
+        if type(lst) is dict:
             try:
-                return cast(self.env).get_var(expr.lvalue)
-            except(VarException):
-                Error.report_packet(f"Tried to get variable '{expr.lvalue}' that doesn't exist in the current scope",
-                                    expr)
-                exit(1)
-
-        if expr.type == Expression.UNARY:
-            value = self.eval_expr(expr.lvalue)
-
-            if expr.op == "-":
-                if type(value) is not float:
-                    Error.report_packet("Attempt to invert a non numerical value", expr)
-                    exit(1)
-                return -value
-
-            return not self.to_bool(value)
+                return lst[self.map_key(expr.rvalue, index)]
+            except KeyError:
+                Error.report_packet(f"Key '{Parser.get_value(index)}' isn't in the map", expr.rvalue)
+                raise Error.failure()
 
-        if expr.type == Expression.BINARY_EXPRESSION:
-            lvalue = self.eval_expr(expr.lvalue)
-
-            if expr.op == "and":
-                if self.to_bool(lvalue):
-                    return self.to_bool(self.eval_expr(expr.rvalue))
-                return False
-
-            if expr.op == "or":
-                if not self.to_bool(lvalue):
-                    return self.to_bool(self.eval_expr(expr.rvalue))
-                return True
+        if type(index) not in number_types:
+            Error.report_packet(f"Trying to index a list with non-number type '{self.type_to_str(type(index))}'",
+                                expr.rvalue)
+            raise Error.failure()
 
-            rvalue = self.eval_expr(expr.rvalue)
+        index = int(index)
+        if index >= len(lst):
+            Error.report_packet(
+                f"List index out of bounds. Tried to access item '{index}' from list of size '{len(lst)}'",
+                expr.rvalue)
+            raise Error.failure()
 
-            if expr.op == "==":
-                return lvalue == rvalue
+        return lst[index]
 
-            if expr.op == "!=":
-                return lvalue != rvalue
+    # evaluates every binary operator except the short-circuiting 'and' and 'or'.
+    # the operators bound to each binary expression only handle numbers themselves, everything else goes through here
+    def eval_binary(self, expr: Expression, lvalue, rvalue):
+        if expr.op == "==":
+            return lvalue == rvalue
 
-            if type(lvalue) != type(rvalue):
-                Error.report_packet("Invalid operation between two incompatible types " +
-                                    f"{self.type_to_str(type(lvalue))} and {self.type_to_str(type(rvalue))}", expr)
-                exit(1)
+        if expr.op == "!=":
+            return lvalue != rvalue
 
-            t = type(lvalue)
+        t = type(lvalue)
+        # ints and floats are both numbers
+        if t in number_types and type(rvalue) in number_types:
+            t = float
+        elif t != type(rvalue):
+            Error.report_packet("Invalid operation between two incompatible types " +
+                                f"{self.type_to_str(type(lvalue))} and {self.type_to_str(type(rvalue))}", expr)
+            raise Error.failure()
 
-            if t == bool or t == list:
-                Error.report_packet(f"Invalid operation '{expr.op}' between two {self.type_to_str(t)}s", expr)
-                exit(1)
+        if t == bool or t == list or t == dict:
+            Error.report_packet(f"Invalid operation '{expr.op}' between two {self.type_to_str(t)}s", expr)
+            raise Error.failure()
 
-            if expr.op == "+":
-                return lvalue + rvalue
+        if expr.op == "+":
+            return lvalue + rvalue
 
-            if t == SILString:
-                Error.report_packet(f"Invalid operation '{expr.op}' between two {self.type_to_str(SILString)}s", expr)
-                exit(1)
+        if t == SILString:
+            Error.report_packet(f"Invalid operation '{expr.op}' between two {self.type_to_str(SILString)}s", expr)
+            raise Error.failure()
 
-            if expr.op == ">=":
-                return lvalue >= rvalue
+        if expr.op == ">=":
+            return lvalue >= rvalue
 
-            if expr.op == "<=":
-                return lvalue <= rvalue
+        if expr.op == "<=":
+            return lvalue <= rvalue
 
-            if expr.op == ">":
-                return lvalue > rvalue
+        if expr.op == ">":
+            return lvalue > rvalue
 
-            if expr.op == "<":
-                return lvalue < rvalue
+        if expr.op == "<":
+            return lvalue < rvalue
 
-            if expr.op == "-":
-                return lvalue - rvalue
+        if expr.op == "-":
+            return lvalue - rvalue
 
-            if expr.op == "*":
-                return lvalue * rvalue
+        if expr.op == "*":
+            return lvalue * rvalue
 
-            if expr.op == "/":
-                return lvalue / rvalue
+        if expr.op == "/":
+            return divide(lvalue, rvalue)
@@ -0,0 +1,866 @@
+from compiler import *
+from tree_walker import *
+import operator
+
+
+# the python versions of the binary operators, for when both sides are numbers. anything else goes through
+# TreeWalker.eval_binary, the same as for the tree walker
+number_operators = {
+    ADD: operator.add,
+    SUBTRACT: operator.sub,
+    MULTIPLY: operator.mul,
+    DIVIDE: divide,
+    LESS: operator.lt,
+    LESS_EQUAL: operator.le,
+    GREATER: operator.gt,
+    GREATER_EQUAL: operator.ge,
+}
+
+# == and != work the same on every type
+equality_operators = {
+    EQUAL: operator.eq,
+    NOT_EQUAL: operator.ne,
+}
+
+COMPARISONS = (LESS, LESS_EQUAL, GREATER, GREATER_EQUAL, EQUAL, NOT_EQUAL)
+JUMPS = (JUMP, JUMP_IF_FALSE, JUMP_IF_TRUE)
+CONDITIONAL_JUMPS = (JUMP_IF_FALSE, JUMP_IF_TRUE)
+
+
+# links the bytecode of a program into handlers: one python closure for every instruction, with its operand, its
+# node and everything else it needs bound into it, so the vm only has to call one handler after another. a handler
+# takes the stack, the values of the frame and the frame, and returns the index of the next handler, or 0 to return.
+# the handler of the instruction at code[2 * i] is at i + 1.
+#
+# common runs of instructions, like a loop's condition or a counter going up, are linked into one handler, which
+# does the whole run itself when its values are numbers, and otherwise calls the handlers of the run one by one.
+# the handlers inside of a run are still linked, but nothing jumps to them
+class Linker:
+    def __init__(self, engine):
+        self.engine = engine
+
+        self.handler_makers = {
+            CONST: self.link_const,
+            GET_VAR: self.link_get_var,
+            SET_VAR: self.link_set_var,
+            DECLARE_VAR: self.link_declare_var,
+            POP: self.link_pop,
+            PRINT: self.link_print,
+            BUILD_LIST: self.link_build_list,
+            INDEX: self.link_index,
+            CHECK_INDEXABLE: self.link_check_indexable,
+            CHECK_SETTABLE: self.link_check_settable,
+            SET_INDEX: self.link_set_index,
+            STORE_INDEX: self.link_store_index,
+            CHECK_CALL: self.link_check_call,
+            CALL: self.link_call,
+            INPUT: self.link_input,
+            NEGATE: self.link_negate,
+            NOT: self.link_not,
+            TO_BOOL: self.link_to_bool,
+            JUMP: self.link_jump,
+            JUMP_IF_FALSE: self.link_jump_if_false,
+            JUMP_IF_TRUE: self.link_jump_if_true,
+            EXIT_BLOCK: self.link_exit_block,
+            FUNCTION: self.link_function,
+            RETURN: self.link_return,
+            RAISE: self.link_raise,
+            BUILD_MAP: self.link_build_map,
+            COPY: self.link_copy,
+            GET_LOCAL: self.link_get_local,
+            SET_LOCAL: self.link_set_local,
+            DECLARE_LOCAL: self.link_declare_local,
+            GET_GLOBAL: self.link_get_global,
+            SET_GLOBAL: self.link_set_global,
+        }
+        for op in number_operators:
+            self.handler_makers[op] = self.link_binary
+        for op in equality_operators:
+            self.handler_makers[op] = self.link_equality
+
+        # names that some frame in the program has a slot for. any other name can only be a global
+        self.frame_names = set()
+
+        # the chunk being linked
+        self.chunk = None
+
+    # links the main chunk and the chunk of every function in it
+    def link(self, main: Chunk):
+        chunks = [main]
+        for chunk in chunks:
+            chunks += [constant.chunk for constant in chunk.constants if type(constant) is CompiledFunction]
+        for chunk in chunks:
+            self.frame_names.update(chunk.frame_names)
+
+        for chunk in chunks:
+            self.chunk = chunk
+            chunk.linked = self.link_chunk(chunk)
+
+    def link_chunk(self, chunk: Chunk):
+        code = chunk.code
+        count = len(code) // 2
+        # calls whose callee was already checked before their arguments were evaluated
+        self.checked_calls = {id(chunk.nodes[i]) for i in range(count) if code[2 * i] == CHECK_CALL}
+
+        handlers = [None]
+        for i in range(count):
+            op = code[2 * i]
+            if op not in self.handler_makers:
+                Error.report_flat(f"Unknown opcode {op} in '{chunk.name}'")
+                raise Error.failure()
+            handlers.append(self.handler_makers[op](op, code[2 * i + 1], chunk.nodes[i], i + 2))
+
+        # a run can't have anything jump into the middle of it
+        targets = {code[pc + 1] >> 1 for pc in range(0, len(code), 2) if code[pc] in JUMPS}
+        i = 0
+        while i < count:
+            length = self.fuse(chunk, handlers, i, count, targets)
+            i += length or 1
+        return handlers
+
+    # the opcodes and operands of the n instructions from i, if they can be linked into one handler
+    def run_at(self, i, n, count, targets):
+        if i + n > count or any(j in targets for j in range(i + 1, i + n)):
+            return None
+        code = self.chunk.code
+        return [code[2 * j] for j in range(i, i + n)], [code[2 * j + 1] for j in range(i, i + n)]
+
+    # links the longest run from i that has a handler of its own, returning its length, or None if there isn't one
+    def fuse(self, chunk: Chunk, handlers, i, count, targets):
+        constants = chunk.constants
+        nodes = chunk.nodes
+
+        run = self.run_at(i, 4, count, targets)
+        if run is not None:
+            ops, operands = run
+            parts = handlers[i + 1:i + 5]
+            if ops[0] == GET_LOCAL and ops[1] == CONST and type(constants[operands[1]]) in number_types:
+                # i += 1
+                if ops[3] == SET_LOCAL and operands[3] == operands[0] and ops[2] in (ADD, SUBTRACT, MULTIPLY):
+                    handlers[i + 1] = self.link_update_local(operands[0], constants[operands[1]],
+                                                             number_operators[ops[2]], parts, i + 5)
+                    return 4
+                # i < 10
+                if ops[3] in CONDITIONAL_JUMPS and ops[2] in number_operators and ops[2] in COMPARISONS:
+                    handlers[i + 1] = self.link_compare_local_jump(operands[0], constants[operands[1]],
+                                                                   number_operators[ops[2]],
+                                                                   *branches(ops[3], operands[3], i + 5), parts)
+                    return 4
+
+            # lst[i]
+            if ops == [GET_LOCAL, CHECK_INDEXABLE, GET_LOCAL, INDEX]:
+                handlers[i + 1] = self.link_local_index_local(operands[0], operands[2], parts, i + 5)
+                return 4
+
+        run = self.run_at(i, 3, count, targets)
+        if run is not None:
+            ops, operands = run
+            parts = handlers[i + 1:i + 4]
+            # x < y, with x already on the stack
+            if ops[0] == GET_LOCAL and ops[1] in COMPARISONS and ops[2] in CONDITIONAL_JUMPS:
+                handlers[i + 1] = self.link_compare_jump_local(operands[0], ops[1],
+                                                               *branches(ops[2], operands[2], i + 4), parts)
+                return 3
+            if ops[0] == GET_LOCAL and ops[2] in number_operators:
+                if ops[1] == CONST and type(constants[operands[1]]) in number_types:
+                    handlers[i + 1] = self.link_local_constant_binary(operands[0], constants[operands[1]],
+                                                                      number_operators[ops[2]], parts, i + 4)
+                    return 3
+                if ops[1] == GET_LOCAL:
+                    handlers[i + 1] = self.link_local_local_binary(operands[0], operands[1],
+                                                                   number_operators[ops[2]], parts, i + 4)
+                    return 3
+            # lst[i]
+            if ops == [CHECK_INDEXABLE, GET_LOCAL, INDEX]:
+                handlers[i + 1] = self.link_index_local(operands[1], parts, i + 4)
+                return 3
+
+        run = self.run_at(i, 2, count, targets)
+        if run is not None:
+            ops, operands = run
+            parts = handlers[i + 1:i + 3]
+            node = nodes[i]
+            if ops[0] in COMPARISONS and ops[1] in CONDITIONAL_JUMPS:
+                handlers[i + 1] = self.link_compare_jump(ops[0], node, *branches(ops[1], operands[1], i + 3))
+                return 2
+            if ops[0] in number_operators and ops[1] == SET_LOCAL:
+                handlers[i + 1] = self.link_binary_set_local(number_operators[ops[0]], node, operands[1],
+                                                             nodes[i + 1], i + 3)
+                return 2
+            if ops[0] in number_operators and ops[1] == SET_GLOBAL:
+                handlers[i + 1] = self.link_binary_set_global(number_operators[ops[0]], node,
+                                                              chunk.names[operands[1]], nodes[i + 1], i + 3)
+                return 2
+            if ops[1] in number_operators:
+                if ops[0] == GET_LOCAL:
+                    handlers[i + 1] = self.link_binary_local(operands[0], number_operators[ops[1]], parts, i + 3)
+                    return 2
+                if ops[0] == CONST and type(constants[operands[0]]) in number_types:
+                    handlers[i + 1] = self.link_binary_constant(constants[operands[0]], number_operators[ops[1]],
+                                                                nodes[i + 1], i + 3)
+                    return 2
+            if ops == [CALL, POP]:
+                handlers[i + 1] = self.link_call(CALL, operands[0], node, i + 3, True)
+                return 2
+            if ops == [GET_LOCAL, RETURN]:
+                handlers[i + 1] = self.link_return_local(operands[0], parts)
+                return 2
+            if ops == [CONST, DECLARE_LOCAL]:
+                handlers[i + 1] = self.link_declare_constant(constants[operands[0]], operands[1], nodes[i + 1],
+                                                             i + 3)
+                return 2
+            # a function about to be called
+            if ops[1] == CHECK_CALL and (ops[0] == GET_GLOBAL or ops[0] == GET_VAR and
+                                         chunk.names[operands[0]] not in self.frame_names):
+                handlers[i + 1] = self.link_get_callee(chunk.names[operands[0]], node, operands[1], nodes[i + 1],
+                                                       i + 3)
+                return 2
+
+        return None
+
+    # ------------------------------------------------------------------------------------------------------------
+    # a handler for every instruction
+
+    def link_const(self, op, operand, node, after):
+        value = self.chunk.constants[operand]
+
+        def const(stack, values, frame):
+            stack.append(value)
+            return after
+        return const
+
+    def link_copy(self, op, operand, node, after):
+        value = self.chunk.constants[operand]
+
+        def copy(stack, values, frame):
+            stack.append(value.copy())
+            return after
+        return copy
+
+    def link_get_local(self, op, operand, node, after):
+        get_by_name = self.engine.get_by_name
+        name = node.lvalue
+
+        def get_local(stack, values, frame):
+            value = values[operand]
+            if value is UNDEFINED:
+                value = get_by_name(frame, name, node)
+            stack.append(value)
+            return after
+        return get_local
+
+    def link_set_local(self, op, operand, node, after):
+        set_by_name = self.engine.set_by_name
+        name = node.name
+
+        def set_local(stack, values, frame):
+            if values[operand] is not UNDEFINED:
+                values[operand] = stack.pop()
+            else:
+                set_by_name(frame, name, stack.pop(), node)
+            return after
+        return set_local
+
+    def link_declare_local(self, op, operand, node, after):
+        report_redeclared = self.engine.report_redeclared
+
+        def declare_local(stack, values, frame):
+            if values[operand] is not UNDEFINED:
+                report_redeclared(node)
+            values[operand] = stack.pop()
+            return after
+        return declare_local
+
+    def link_get_global(self, op, operand, node, after):
+        variables = self.engine.global_env.variable_map
+        report_undefined = self.engine.report_undefined
+        name = self.chunk.names[operand]
+
+        def get_global(stack, values, frame):
+            if name in variables:
+                stack.append(variables[name])
+            else:
+                report_undefined(node)
+            return after
+        return get_global
+
+    def link_set_global(self, op, operand, node, after):
+        variables = self.engine.global_env.variable_map
+        report_unset = self.engine.report_unset
+        name = self.chunk.names[operand]
+
+        def set_global(stack, values, frame):
+            if name in variables:
+                variables[name] = stack.pop()
+            else:
+                report_unset(node)
+            return after
+        return set_global
+
+    # a function's variables without a slot are looked for in its caller's environments
+    def link_get_var(self, op, operand, node, after):
+        name = self.chunk.names[operand]
+        if name not in self.frame_names:
+            return self.link_get_global(op, operand, node, after)
+
+        get_by_name = self.engine.get_by_name
+
+        def get_var(stack, values, frame):
+            stack.append(get_by_name(frame, name, node))
+            return after
+        return get_var
+
+    def link_set_var(self, op, operand, node, after):
+        name = self.chunk.names[operand]
+        if name not in self.frame_names:
+            return self.link_set_global(op, operand, node, after)
+
+        set_by_name = self.engine.set_by_name
+
+        def set_var(stack, values, frame):
+            set_by_name(frame, name, stack.pop(), node)
+            return after
+        return set_var
+
+    def link_declare_var(self, op, operand, node, after):
+        declare = self.engine.global_env.declare_var
+        report_redeclared = self.engine.report_redeclared
+        name = self.chunk.names[operand]
+
+        def declare_var(stack, values, frame):
+            try:
+                declare(name, stack.pop())
+            except VarException:
+                report_redeclared(node)
+            return after
+        return declare_var
+
+    def link_pop(self, op, operand, node, after):
+        def pop(stack, values, frame):
+            stack.pop()
+            return after
+        return pop
+
+    def link_print(self, op, operand, node, after):
+        engine = self.engine
+        get_value = Parser.get_value
+
+        def print_value(stack, values, frame):
+            print(get_value(stack.pop()), end="", file=engine.stdout)
+            return after
+        return print_value
+
+    def link_build_list(self, op, operand, node, after):
+        def build_list(stack, values, frame):
+            if operand:
+                lst = stack[-operand:]
+                del stack[-operand:]
+                stack.append(lst)
+            else:
+                stack.append([])
+            return after
+        return build_list
+
+    def link_build_map(self, op, operand, node, after):
+        build_map = self.engine.build_map
+        count = 2 * operand
+
+        def build(stack, values, frame):
+            if count:
+                items = stack[-count:]
+                del stack[-count:]
+                stack.append(build_map(node, items))
+            else:
+                stack.append({})
+            return after
+        return build
+
+    def link_index(self, op, operand, node, after):
+        engine = self.engine
+
+        def index(stack, values, frame):
+            i = stack.pop()
+            lst = stack[-1]
+            if type(lst) is list and type(i) is int and i < len(lst):
+                stack[-1] = lst[i]
+            else:
+                if not engine.is_indexable(lst):
+                    engine.report_not_indexable(node, lst)
+                stack[-1] = engine.index_list(node, lst, i)
+            return after
+        return index
+
+    def link_check_indexable(self, op, operand, node, after):
+        report_not_indexable = self.engine.report_not_indexable
+
+        def check_indexable(stack, values, frame):
+            lst = stack[-1]
+            if type(lst) is not list and type(lst) is not SILString and type(lst) is not dict:
+                report_not_indexable(node, lst)
+            return after
+        return check_indexable
+
+    def link_check_settable(self, op, operand, node, after):
+        engine = self.engine
+
+        def check_settable(stack, values, frame):
+            lst = stack[-1]
+            if not engine.is_indexable(lst):
+                engine.report_not_settable(node, lst)
+            return after
+        return check_settable
+
+    def link_set_index(self, op, operand, node, after):
+        list_set_index = self.engine.list_set_index
+
+        def set_index(stack, values, frame):
+            stack[-1] = list_set_index(node, stack[-2], stack[-1])
+            return after
+        return set_index
+
+    def link_store_index(self, op, operand, node, after):
+        store_item = self.engine.store_item
+
+        def store_index(stack, values, frame):
+            value = stack.pop()
+            i = stack.pop()
+            store_item(node, stack.pop(), i, value)
+            return after
+        return store_index
+
+    # a call nearly always calls the same function, which only has to be checked the first time
+    def link_check_call(self, op, operand, node, after):
+        check_call = self.engine.check_call
+        checked = UNDEFINED
+
+        def check(stack, values, frame):
+            nonlocal checked
+            callee = stack[-1]
+            if callee is not checked:
+                check_call(node, callee)
+                checked = callee
+            return after
+        return check
+
+    # calls the function under the arguments, and keeps what it returns on the stack unless it is discarded
+    def link_call(self, op, operand, node, after, discard=False):
+        engine = self.engine
+        execute = engine.execute
+        check_call = engine.check_call
+        checked = id(node) in self.checked_calls
+
+        def call(stack, values, frame):
+            if operand:
+                args = stack[-operand:]
+                del stack[-operand:]
+            else:
+                args = []
+            callee = stack[-1]
+
+            if type(callee) is CompiledFunction and callee.param_count == operand and callee.unique_params:
+                chunk = callee.chunk
+                result = execute(chunk, FrameEnvironment(chunk.frame_names, args + callee.locals, frame))
+            else:
+                if not checked:
+                    check_call(node, callee)
+                engine.env = frame
+                result = callee.call(engine, args, node)
+
+            if discard:
+                stack.pop()
+            else:
+                stack[-1] = result
+            return after
+        return call
+
+    def link_input(self, op, operand, node, after):
+        eval_input = self.engine.eval_input
+
+        def input_value(stack, values, frame):
+            stack[-1] = eval_input(node, stack[-1])
+            return after
+        return input_value
+
+    def link_negate(self, op, operand, node, after):
+        report_invert = self.engine.report_invert
+
+        def negate(stack, values, frame):
+            value = stack[-1]
+            if type(value) not in number_types:
+                report_invert(node)
+            stack[-1] = -value
+            return after
+        return negate
+
+    def link_not(self, op, operand, node, after):
+        def invert(stack, values, frame):
+            stack[-1] = not to_bool(stack[-1])
+            return after
+        return invert
+
+    def link_to_bool(self, op, operand, node, after):
+        def convert(stack, values, frame):
+            stack[-1] = to_bool(stack[-1])
+            return after
+        return convert
+
+    def link_binary(self, op, operand, node, after):
+        operate = number_operators[op]
+        eval_binary = self.engine.eval_binary
+        # strings can only be added
+        joins = op == ADD
+
+        def binary(stack, values, frame):
+            rvalue = stack.pop()
+            lvalue = stack[-1]
+            if type(lvalue) in number_types and type(rvalue) in number_types:
+                stack[-1] = operate(lvalue, rvalue)
+            elif joins and type(lvalue) is SILString and type(rvalue) is SILString:
+                stack[-1] = lvalue + rvalue
+            else:
+                stack[-1] = eval_binary(node, lvalue, rvalue)
+            return after
+        return binary
+
+    def link_equality(self, op, operand, node, after):
+        operate = equality_operators[op]
+
+        def equality(stack, values, frame):
+            rvalue = stack.pop()
+            stack[-1] = operate(stack[-1], rvalue)
+            return after
+        return equality
+
+    def link_jump(self, op, operand, node, after):
+        target = operand // 2 + 1
+
+        def jump(stack, values, frame):
+            return target
+        return jump
+
+    def link_jump_if_false(self, op, operand, node, after):
+        target = operand // 2 + 1
+
+        def jump_if_false(stack, values, frame):
+            value = stack.pop()
+            return after if value is not False and value is not None else target
+        return jump_if_false
+
+    def link_jump_if_true(self, op, operand, node, after):
+        target = operand // 2 + 1
+
+        def jump_if_true(stack, values, frame):
+            value = stack.pop()
+            return target if value is not False and value is not None else after
+        return jump_if_true
+
+    # empties the slots of the blocks that ended, so they can be declared again and aren't found by name
+    def link_exit_block(self, op, operand, node, after):
+        start, end = self.chunk.constants[operand]
+        empty = [UNDEFINED] * (end - start)
+
+        def exit_block(stack, values, frame):
+            values[start:end] = empty
+            return after
+        return exit_block
+
+    def link_function(self, op, operand, node, after):
+        declare_function = self.engine.declare_function
+        function = self.chunk.constants[operand]
+
+        def declare(stack, values, frame):
+            declare_function(node, function)
+            return after
+        return declare
+
+    def link_return(self, op, operand, node, after):
+        # what it returns is left on the stack
+        def return_value(stack, values, frame):
+            return 0
+        return return_value
+
+    def link_raise(self, op, operand, node, after):
+        stmt = self.chunk.constants[operand]
+
+        def raise_stmt(stack, values, frame):
+            raise stmt
+        return raise_stmt
+
+    # ------------------------------------------------------------------------------------------------------------
+    # handlers for runs of instructions
+
+    # GET_LOCAL, CONST, ADD, SET_LOCAL of the same variable
+    def link_update_local(self, offset, constant, operate, parts, after):
+        def update_local(stack, values, frame):
+            value = values[offset]
+            if type(value) in number_types:
+                values[offset] = operate(value, constant)
+                return after
+            return run_parts(parts, stack, values, frame)
+        return update_local
+
+    # GET_LOCAL, CONST, LESS, JUMP_IF_FALSE
+    def link_compare_local_jump(self, offset, constant, operate, if_true, if_false, parts):
+        def compare_local_jump(stack, values, frame):
+            value = values[offset]
+            if type(value) in number_types:
+                return if_true if operate(value, constant) else if_false
+            return run_parts(parts, stack, values, frame)
+        return compare_local_jump
+
+    # GET_LOCAL, CONST, ADD
+    def link_local_constant_binary(self, offset, constant, operate, parts, after):
+        def local_constant_binary(stack, values, frame):
+            value = values[offset]
+            if type(value) in number_types:
+                stack.append(operate(value, constant))
+                return after
+            return run_parts(parts, stack, values, frame)
+        return local_constant_binary
+
+    # GET_LOCAL, GET_LOCAL, ADD
+    def link_local_local_binary(self, left, right, operate, parts, after):
+        def local_local_binary(stack, values, frame):
+            lvalue = values[left]
+            rvalue = values[right]
+            if type(lvalue) in number_types and type(rvalue) in number_types:
+                stack.append(operate(lvalue, rvalue))
+                return after
+            return run_parts(parts, stack, values, frame)
+        return local_local_binary
+
+    # GET_LOCAL, ADD, with the left side already on the stack
+    def link_binary_local(self, offset, operate, parts, after):
+        def binary_local(stack, values, frame):
+            lvalue = stack[-1]
+            rvalue = values[offset]
+            if type(lvalue) in number_types and type(rvalue) in number_types:
+                stack[-1] = operate(lvalue, rvalue)
+                return after
+            return run_parts(parts, stack, values, frame)
+        return binary_local
+
+    # CONST, ADD, with the left side already on the stack
+    def link_binary_constant(self, constant, operate, node, after):
+        eval_binary = self.engine.eval_binary
+
+        def binary_constant(stack, values, frame):
+            lvalue = stack[-1]
+            if type(lvalue) in number_types:
+                stack[-1] = operate(lvalue, constant)
+            else:
+                stack[-1] = eval_binary(node, lvalue, constant)
+            return after
+        return binary_constant
+
+    # CHECK_INDEXABLE, GET_LOCAL, INDEX, with the list already on the stack
+    def link_index_local(self, offset, parts, after):
+        def index_local(stack, values, frame):
+            lst = stack[-1]
+            i = values[offset]
+            if type(lst) is list and type(i) is int and i < len(lst):
+                stack[-1] = lst[i]
+                return after
+            return run_parts(parts, stack, values, frame)
+        return index_local
+
+    # GET_LOCAL, CHECK_INDEXABLE, GET_LOCAL, INDEX
+    def link_local_index_local(self, list_offset, offset, parts, after):
+        def local_index_local(stack, values, frame):
+            lst = values[list_offset]
+            i = values[offset]
+            if type(lst) is list and type(i) is int and i < len(lst):
+                stack.append(lst[i])
+                return after
+            return run_parts(parts, stack, values, frame)
+        return local_index_local
+
+    # GET_LOCAL, LESS, JUMP_IF_FALSE, with the left side already on the stack
+    def link_compare_jump_local(self, offset, op, if_true, if_false, parts):
+        if op in equality_operators:
+            operate = equality_operators[op]
+
+            def equality_jump_local(stack, values, frame):
+                rvalue = values[offset]
+                if rvalue is not UNDEFINED:
+                    return if_true if operate(stack.pop(), rvalue) else if_false
+                return run_parts(parts, stack, values, frame)
+            return equality_jump_local
+
+        operate = number_operators[op]
+
+        def compare_jump_local(stack, values, frame):
+            lvalue = stack[-1]
+            rvalue = values[offset]
+            if type(lvalue) in number_types and type(rvalue) in number_types:
+                stack.pop()
+                return if_true if operate(lvalue, rvalue) else if_false
+            return run_parts(parts, stack, values, frame)
+        return compare_jump_local
+
+    # GET_LOCAL, RETURN
+    def link_return_local(self, offset, parts):
+        def return_local(stack, values, frame):
+            value = values[offset]
+            if value is not UNDEFINED:
+                stack.append(value)
+                return 0
+            return run_parts(parts, stack, values, frame)
+        return return_local
+
+    # CONST, DECLARE_LOCAL
+    def link_declare_constant(self, constant, offset, node, after):
+        report_redeclared = self.engine.report_redeclared
+
+        def declare_constant(stack, values, frame):
+            if values[offset] is not UNDEFINED:
+                report_redeclared(node)
+            values[offset] = constant
+            return after
+        return declare_constant
+
+    # GET_GLOBAL, CHECK_CALL
+    def link_get_callee(self, name, node, count, call, after):
+        variables = self.engine.global_env.variable_map
+        report_undefined = self.engine.report_undefined
+        check_call = self.engine.check_call
+        checked = UNDEFINED
+
+        def get_callee(stack, values, frame):
+            nonlocal checked
+            if name in variables:
+                callee = variables[name]
+            else:
+                report_undefined(node)
+            if callee is not checked:
+                check_call(call, callee)
+                checked = callee
+            stack.append(callee)
+            return after
+        return get_callee
+
+    # LESS, JUMP_IF_FALSE
+    def link_compare_jump(self, op, node, if_true, if_false):
+        eval_binary = self.engine.eval_binary
+
+        if op in equality_operators:
+            operate = equality_operators[op]
+
+            def equality_jump(stack, values, frame):
+                rvalue = stack.pop()
+                return if_true if operate(stack.pop(), rvalue) else if_false
+            return equality_jump
+
+        operate = number_operators[op]
+
+        def compare_jump(stack, values, frame):
+            rvalue = stack.pop()
+            lvalue = stack.pop()
+            if type(lvalue) in number_types and type(rvalue) in number_types:
+                return if_true if operate(lvalue, rvalue) else if_false
+            return if_true if to_bool(eval_binary(node, lvalue, rvalue)) else if_false
+        return compare_jump
+
+    # ADD, SET_LOCAL
+    def link_binary_set_local(self, operate, node, offset, set_node, after):
+        joins = operate is operator.add
+        eval_binary = self.engine.eval_binary
+        set_by_name = self.engine.set_by_name
+        name = set_node.name
+
+        def binary_set_local(stack, values, frame):
+            rvalue = stack.pop()
+            lvalue = stack.pop()
+            if type(lvalue) in number_types and type(rvalue) in number_types:
+                value = operate(lvalue, rvalue)
+            elif joins and type(lvalue) is SILString and type(rvalue) is SILString:
+                value = lvalue + rvalue
+            else:
+                value = eval_binary(node, lvalue, rvalue)
+
+            if values[offset] is not UNDEFINED:
+                values[offset] = value
+            else:
+                set_by_name(frame, name, value, set_node)
+            return after
+        return binary_set_local
+
+    # ADD, SET_GLOBAL
+    def link_binary_set_global(self, operate, node, name, set_node, after):
+        joins = operate is operator.add
+        eval_binary = self.engine.eval_binary
+        report_unset = self.engine.report_unset
+        variables = self.engine.global_env.variable_map
+
+        def binary_set_global(stack, values, frame):
+            rvalue = stack.pop()
+            lvalue = stack.pop()
+            if type(lvalue) in number_types and type(rvalue) in number_types:
+                value = operate(lvalue, rvalue)
+            elif joins and type(lvalue) is SILString and type(rvalue) is SILString:
+                value = lvalue + rvalue
+            else:
+                value = eval_binary(node, lvalue, rvalue)
+
+            if name in variables:
+                variables[name] = value
+            else:
+                report_unset(set_node)
+            return after
+        return binary_set_global
+
+
+# the handlers a conditional jump goes to when its condition is true and when it is false
+def branches(op, operand, after):
+    target = operand // 2 + 1
+    return (after, target) if op == JUMP_IF_FALSE else (target, after)
+
+
+# runs the handlers of a run of instructions one by one, giving the index of the handler after the last of them
+def run_parts(parts, stack, values, frame):
+    after = None
+    for part in parts:
+        after = part(stack, values, frame)
+    return after
+
+
+# stack based virtual machine which runs the bytecode from the compiler, once it is linked into handlers.
+# it is a tree walker underneath, so builtins, error messages and the slow paths of the operators are shared
+class VM(TreeWalker):
+
+    def run(self, stmts):
+        chunk = Compiler().compile(stmts)
+        Linker(self).link(chunk)
+        frame = FrameEnvironment(chunk.frame_names, [UNDEFINED] * chunk.frame_size, self.global_env)
+        self.run_guarded(self.execute, chunk, frame)
+
+    def call_compiled(self, func: CompiledFunction, args, env):
+        chunk = func.chunk
+        if func.unique_params:
+            return self.execute(chunk, FrameEnvironment(chunk.frame_names, args + func.locals, env))
+
+        # parameters with the same name are declared one by one, so the error stays the same
+        values = [UNDEFINED] * chunk.frame_size
+        for i, param in enumerate(func.params):
+            slot = func.scope.slots[param]
+            if values[slot] is not UNDEFINED:
+                raise VarException()
+            values[slot] = args[i]
+        return self.execute(chunk, FrameEnvironment(chunk.frame_names, values, env))
+
+    def profile_node(self, frame):
+        if frame.f_code is not VM.execute.__code__:
+            return TreeWalker.profile_node(self, frame)
+
+        # the frame might not have got as far as setting pc yet
+        pc = frame.f_locals.get("pc")
+        return frame.f_locals["chunk"].nodes[pc - 1] if pc else None
+
+    def execute(self, chunk: Chunk, frame: FrameEnvironment):
+        code = chunk.linked
+        stack = []
+        values = frame.values
+        pc = 1
+        while pc:
+            pc = code[pc](stack, values, frame)
+        return stack[-1]